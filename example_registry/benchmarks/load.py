@@ -0,0 +1,244 @@
+"""
+End-to-end load benchmark for the registry API
+
+Drives the API with concurrent clients and reports throughput and latency
+percentiles per scenario:
+
+- catalog: function listings, a category and a single function
+- search: ranked keyword search and semantic retrieval
+- execute: a mix of slack_send_message, github_commit_file,
+  salesforce_query and add_to_mailing_list calls
+
+By default the app from main.py is served in-process over the ASGI
+transport, which measures the registry without a network or server loop.
+Pass --url to load a running server instead (e.g. `uvicorn main:app`).
+
+Results are written as JSON. Given a previous result file as --baseline, the
+run is compared against it and the script exits with status 1 when a
+scenario's throughput drops, or its p50/p99 latency grows, by more than
+--tolerance.
+
+Run from example_registry/:
+
+    python benchmarks/load.py --concurrency 32 --requests 2000 --output load.json
+    python benchmarks/load.py --baseline load.json
+    python benchmarks/load.py --url http://localhost:8000 --scenario execute
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+# A request is (label, method, path, json body or None); builders get a
+# sequence number so writes don't all hit the same key
+Request = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+
+def catalog_requests(n: int) -> Request:
+    return [
+        ("list_functions", "GET", "/functions", None),
+        ("list_categories", "GET", "/categories", None),
+        ("category_slack", "GET", "/functions/category/slack", None),
+        ("function_info", "GET", "/functions/github_commit_file", None),
+    ][n % 4]
+
+
+def search_requests(n: int) -> Request:
+    queries = ["send message", "github branch", "mailing list", "salesforce contact", "spreadsheet"]
+    query = queries[n % len(queries)]
+    if n % 2:
+        return ("retrieve", "GET", f"/functions/retrieve?q={query}&k=5", None)
+    return ("search", "GET", f"/search?q={query}", None)
+
+
+def execute_requests(n: int) -> Request:
+    kind = n % 4
+    if kind == 0:
+        return ("slack_send_message", "POST", "/slack/slack_send_message",
+                {"channel_id": "C001", "text": f"load test message {n}"})
+    if kind == 1:
+        return ("github_commit_file", "POST", "/github/github_commit_file", {
+            "owner": "myorg", "repo": "main-app", "branch": "develop",
+            "path": f"load/{n % 100}.txt", "content": f"revision {n}", "message": f"load test {n}"
+        })
+    if kind == 2:
+        return ("salesforce_query", "POST", "/salesforce/salesforce_query",
+                {"query": "SELECT * FROM Account WHERE Industry = 'Technology'"})
+    return ("add_to_mailing_list", "POST", "/mailing_list/add_to_mailing_list",
+            {"list_name": "member", "email": f"user{n}@example.com"})
+
+
+SCENARIOS: Dict[str, Callable[[int], Request]] = {
+    "catalog": catalog_requests,
+    "search": search_requests,
+    "execute": execute_requests,
+}
+
+# Metrics compared against the baseline, and whether higher is better
+HIGHER_IS_BETTER = {"throughput_rps": True, "p50_ms": False, "p99_ms": False}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    build: Callable[[int], Request],
+    requests: int,
+    concurrency: int,
+    warmup: int
+) -> Dict[str, Any]:
+    """Send `requests` requests from `concurrency` workers and summarise them"""
+    for n in range(warmup):
+        _, method, path, body = build(n)
+        await client.request(method, path, json=body)
+
+    counter = itertools.count(warmup)
+    latencies: List[float] = []
+    per_label: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+
+    async def worker():
+        while True:
+            n = next(counter)
+            if n >= warmup + requests:
+                return
+            label, method, path, body = build(n)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                failed = response.status_code >= 400
+                reason = str(response.status_code)
+            except httpx.HTTPError as e:
+                failed = True
+                reason = type(e).__name__
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            per_label.setdefault(label, []).append(elapsed)
+            if failed:
+                errors[reason] = errors.get(reason, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        **latency_summary(latencies),
+        "endpoints": {label: latency_summary(sorted(values)) for label, values in sorted(per_label.items())}
+    }
+
+
+def latency_summary(sorted_values: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": round(sum(sorted_values) / len(sorted_values) * 1000, 3) if sorted_values else 0.0,
+        "p50_ms": round(percentile(sorted_values, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(sorted_values, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(sorted_values, 0.99) * 1000, 3),
+        "max_ms": round(sorted_values[-1] * 1000, 3) if sorted_values else 0.0,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print a comparison table and return the regressions found"""
+    regressions = []
+    print(f"\n{'scenario':<12}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            print(f"{name:<12}(not in baseline)")
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            before, after = previous[metric], current[metric]
+            change = (after - before) / before if before else 0.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{name} {metric}: {before} -> {after} ({change:+.1%})")
+            print(f"{name:<12}{metric:<16}{before:>12}{after:>12}{change:>+10.1%}{flag}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.0)
+        target = args.url
+    else:
+        import main
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+        target = "asgi"
+
+    results: Dict[str, Any] = {
+        "target": target,
+        "concurrency": args.concurrency,
+        "requests_per_scenario": args.requests,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": time.time(),
+        "scenarios": {}
+    }
+    async with client:
+        for name in args.scenario or list(SCENARIOS):
+            summary = await run_scenario(client, SCENARIOS[name], args.requests, args.concurrency, args.warmup)
+            results["scenarios"][name] = summary
+            print(
+                f"{name:<10}{summary['throughput_rps']:>10.1f} req/s"
+                f"  p50 {summary['p50_ms']:.2f}ms  p90 {summary['p90_ms']:.2f}ms"
+                f"  p99 {summary['p99_ms']:.2f}ms  errors {sum(summary['errors'].values())}"
+            )
+    return results
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", help="base URL of a running server (default: in-process ASGI)")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="scenario to run; repeat for several (default: all)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="untimed requests per scenario")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="relative change treated as a regression (default 0.15)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main_cli()
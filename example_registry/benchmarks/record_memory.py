@@ -0,0 +1,158 @@
+"""
+Memory benchmark for the compact record classes in functions/records.py
+
+Builds the same records twice, once as the plain dicts the stores used to
+hold and once as record objects, and reports for each record type:
+
+- bytes held per record in memory (tracemalloc)
+- bytes per record when pickled one by one, as SQLite rows and journal
+  records are, and as one list, as in a journal snapshot
+
+Field values are decoded from a JSON payload per record, the way the API
+receives them, so repeated strings such as statuses and roles start out as
+separate objects, as they do in a running service.
+
+Run from example_registry/:
+
+    python benchmarks/record_memory.py
+    python benchmarks/record_memory.py --records 200000 --output records.json
+"""
+import argparse
+import gc
+import json
+import os
+import pickle
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.records import Email, Invitation, SalesforceRecord, SlackMessage
+
+
+# Each builder returns record i as a plain dict, or with compact=True as a
+# record object
+
+def slack_message(i: int, compact: bool) -> Any:
+    payload = json.loads(json.dumps({"channel_id": "C001", "text": f"deploy {i} finished"}))
+    ts = f"{1700000000 + i / 1000:.6f}"
+    if compact:
+        return SlackMessage(ts=ts, user="U001", text=payload["text"])
+    return {"ts": ts, "user": "U001", "text": payload["text"]}
+
+
+def invitation(i: int, compact: bool) -> Any:
+    payload = json.loads(json.dumps({"email": f"user{i}@example.com", "name": f"User {i}", "role": "Technical"}))
+    fields = {
+        "email": payload["email"], "name": payload["name"], "role": payload["role"],
+        "invited_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1700000000 + i)),
+        "status": "pending", "invitation_link": f"https://memberdesk.cncf.io/invite/{i % 1000000}"
+    }
+    return Invitation(**fields) if compact else fields
+
+
+def salesforce_record(i: int, compact: bool) -> Any:
+    payload = json.loads(json.dumps({
+        "FirstName": f"First{i}", "LastName": f"Last{i}", "Company": f"Company {i % 500}",
+        "Email": f"lead{i}@example.com", "Status": "Open", "LeadSource": "Web"
+    }))
+    fields = {"Id": f"{i:015d}AAA", **payload}
+    return SalesforceRecord(fields) if compact else fields
+
+
+def email(i: int, compact: bool) -> Any:
+    payload = json.loads(json.dumps({
+        "to": f"member{i}@example.com", "subject": "Welcome to the foundation",
+        "body": f"Hello member {i}, welcome aboard.", "cc": ["membership@example.com"]
+    }))
+    fields = {
+        "to": payload["to"], "subject": payload["subject"], "body": payload["body"],
+        "cc": payload["cc"] or [], "attachments": None
+    }
+    return Email(**fields) if compact else fields
+
+
+RECORD_TYPES: Dict[str, Callable[[int, bool], Any]] = {
+    "slack_message": slack_message,
+    "invitation": invitation,
+    "salesforce_record": salesforce_record,
+    "email": email,
+}
+
+
+def held_bytes(build: Callable[[int], Any], n: int) -> float:
+    """Bytes per record still allocated once n records are built and kept"""
+    gc.collect()
+    tracemalloc.start()
+    kept: List[Any] = [None] * n
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        kept[i] = build(i)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del kept
+    return held / n
+
+
+def pickled_bytes(records: List[Any]) -> Tuple[float, float]:
+    """Bytes per record pickled one by one (SQLite rows, WAL records) and as
+    one list (snapshots, where repeated strings and classes are written once)"""
+    single = sum(len(pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL)) for r in records) / len(records)
+    batch = len(pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL)) / len(records)
+    return round(single, 1), round(batch, 1)
+
+
+def measure(name: str, n: int) -> Dict[str, Any]:
+    build = RECORD_TYPES[name]
+    dict_bytes = held_bytes(lambda i: build(i, False), n)
+    record_bytes = held_bytes(lambda i: build(i, True), n)
+    sample = range(min(n, 1000))
+    dict_single, dict_batch = pickled_bytes([build(i, False) for i in sample])
+    record_single, record_batch = pickled_bytes([build(i, True) for i in sample])
+    return {
+        "dict_bytes": round(dict_bytes, 1),
+        "record_bytes": round(record_bytes, 1),
+        "reduction": round(1 - record_bytes / dict_bytes, 3),
+        "dict_pickled": dict_single,
+        "record_pickled": record_single,
+        "dict_pickled_batch": dict_batch,
+        "record_pickled_batch": record_batch,
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--records", type=int, default=50_000, help="records built per type")
+    parser.add_argument("--type", action="append", choices=list(RECORD_TYPES),
+                        help="record type to measure; repeat for several (default: all)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "records": args.records,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "types": {}
+    }
+    print(f"{'':<20}{'in memory, B/record':^34}{'pickled, B/record':^42}")
+    print(f"{'type':<20}{'dict':>10}{'record':>10}{'saved':>14}{'dict':>12}{'record':>10}{'list dict/record':>20}")
+    for name in args.type or list(RECORD_TYPES):
+        result = results["types"][name] = measure(name, args.records)
+        print(
+            f"{name:<20}{result['dict_bytes']:>10.1f}{result['record_bytes']:>10.1f}{result['reduction']:>14.1%}"
+            f"{result['dict_pickled']:>12.1f}{result['record_pickled']:>10.1f}"
+            f"{result['dict_pickled_batch']:>12.1f} / {result['record_pickled_batch']:.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,108 @@
+"""
+Per-call overhead of the execution endpoints
+
+Measures, in-process and without a network, how long one function call takes
+through each execution path:
+
+- validation only: the old `json.loads` + `model_validate` + `.dict()` path
+  against `model_validate_json` + `model_dump`
+- HTTP: the typed FastAPI endpoint against the `/raw` Starlette endpoint
+
+Run from example_registry/:
+
+    python benchmarks/request_overhead.py [--calls N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from dispatcher import validate_json
+from function_discovery import DISCOVERED_FUNCTIONS
+import main
+
+
+# (category, function, params): a flat call and one with nested list params
+CASES = [
+    ("mailing_list", "get_mailing_list", {"list_name": "engineering"}),
+    ("google_services", "google_sheets_read", {"sheet_id": "sheet1", "range": "A1:B2"}),
+    ("slack", "slack_invite_to_channel", {"channel_id": "C001", "user_ids": ["U001", "U002", "U003"]}),
+]
+
+
+def per_call_us(fn, calls: int, repeats: int = 5) -> float:
+    """Best-of-`repeats` mean time per call, in microseconds"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        timings.append((time.perf_counter() - started) / calls)
+    return min(timings) * 1e6
+
+
+async def per_request_us(client: httpx.AsyncClient, path: str, body: bytes, calls: int, repeats: int = 5) -> float:
+    headers = {"content-type": "application/json"}
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(calls):
+            response = await client.post(path, content=body, headers=headers)
+            response.raise_for_status()
+        timings.append((time.perf_counter() - started) / calls)
+    return min(timings) * 1e6
+
+
+def bench_validation(calls: int) -> None:
+    print(f"{'validation':<28}{'legacy':>12}{'fast path':>12}{'speedup':>10}")
+    for _, func_name, params in CASES:
+        func_info = DISCOVERED_FUNCTIONS[func_name]
+        model = func_info['request_model']
+        body = json.dumps(params).encode()
+
+        def legacy():
+            return model.model_validate(json.loads(body)).dict(exclude_none=True)
+
+        def fast():
+            return validate_json(func_info, body)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            before = per_call_us(legacy, calls)
+        after = per_call_us(fast, calls)
+        print(f"{func_name:<28}{before:>10.2f}us{after:>10.2f}us{before / after:>9.2f}x")
+
+
+async def bench_http(calls: int) -> None:
+    print(f"\n{'http round trip':<28}{'typed':>12}{'raw':>12}{'speedup':>10}")
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for category, func_name, params in CASES:
+            body = json.dumps(params).encode()
+            path = f"/{category}/{func_name}"
+            # Warm up both routes (and, in lazy mode, the category)
+            await per_request_us(client, path, body, 10, repeats=1)
+            await per_request_us(client, path + "/raw", body, 10, repeats=1)
+            typed = await per_request_us(client, path, body, calls)
+            raw = await per_request_us(client, path + "/raw", body, calls)
+            print(f"{func_name:<28}{typed:>10.1f}us{raw:>10.1f}us{typed / raw:>9.2f}x")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--calls", type=int, default=2000, help="calls per timing run")
+    args = parser.parse_args()
+
+    bench_validation(args.calls * 10)
+    asyncio.run(bench_http(args.calls))
+
+
+if __name__ == "__main__":
+    main_cli()
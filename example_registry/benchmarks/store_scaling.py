@@ -0,0 +1,408 @@
+"""
+Scaling micro-benchmarks for the in-memory stores behind functions/
+
+Seeds each store with 10^3 .. 10^6 records and measures, for its core
+calls, the per-operation latency and the memory allocated per operation,
+plus the memory the seeded store holds per record. Calls go straight to the
+function implementations, without HTTP or the dispatcher, against fresh
+stores of the chosen state backend (--backend memory, sqlite or shm).
+
+For every case a log-log fit of latency against store size gives the
+scaling exponent: about 0 for constant-time operations, 1 for a full scan or
+copy. Each case declares the exponent it should have; cases above it by more
+than --slope-tolerance are reported as over budget (and fail the run with
+--strict). Given a previous result file as --baseline, a case whose exponent
+grew by more than --slope-tolerance is a regression and the script exits
+with status 1.
+
+Run from example_registry/:
+
+    python benchmarks/store_scaling.py --output scaling.json
+    python benchmarks/store_scaling.py --max-size 100000 --baseline scaling.json
+    python benchmarks/store_scaling.py --backend sqlite --max-size 100000
+    python benchmarks/store_scaling.py --case member_desk_invite --case salesforce_query_by_id
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import github, mailing_list, member_desk, salesforce, slack
+from functions.records import Invitation, SalesforceRecord, SlackMessage
+from functions.state import MemoryBackend, SharedMemoryBackend, SQLiteBackend, StateBackend, SHM_DIR
+
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Operations timed even past the time budget, so that a one-off cost (the
+# first insert into a million-entry dict resizes it) can't be the median
+MIN_OPS = 25
+
+
+class Case:
+    """One operation measured against a store seeded at increasing sizes
+
+    `seed(backend, n)` fills fresh stores from `backend` with n records and
+    installs them in place of the module's stores, which are listed in
+    `stores` as (module, attribute) pairs. `op(i)` performs the i-th
+    operation. `expected` is the scaling exponent the operation should have;
+    `max_size` caps sizes whose seeding alone is too heavy.
+    """
+
+    def __init__(self, name: str, stores: List[Tuple[Any, str]], seed: Callable[[StateBackend, int], None],
+                 op: Callable[[int], Any], expected: float, max_size: Optional[int] = None):
+        self.name = name
+        self.stores = stores
+        self.seed = seed
+        self.op = op
+        self.expected = expected
+        self.max_size = max_size
+
+
+# member_desk
+
+# Seeded record counts, so operations can target the newest record without
+# asking the store (counting is itself a scan in SQLite)
+SEEDED: Dict[str, int] = {}
+
+
+def seed_invitations(backend: StateBackend, n: int) -> None:
+    SEEDED["invitations"] = n
+    store = backend.mapping("member_desk.invitations")
+    store.seed({
+        f"user{i}@example.com": Invitation(
+            email=f"user{i}@example.com", name=f"User {i}", role="Technical",
+            invited_at="2024-01-01T00:00:00Z", status="pending",
+            invitation_link=f"https://memberdesk.cncf.io/invite/{i}"
+        )
+        for i in range(n)
+    })
+    member_desk._invitations = store
+
+
+# salesforce
+
+def seed_accounts(backend: StateBackend, n: int) -> None:
+    records = [
+        SalesforceRecord({"Id": f"001{i:012d}AAG", "Name": f"Account {i}", "Industry": "Technology", "AnnualRevenue": i})
+        for i in range(n)
+    ]
+    store = backend.sequence("salesforce.records")
+    store.seed({"Account": records})
+    salesforce._records = store
+    salesforce._records_by_id = backend.mapping("salesforce.records_by_id")
+    salesforce._records_by_id.seed({f"Account/{record['Id']}": record for record in records})
+    salesforce._record_ids = backend.counter("salesforce.record_id", start=n + 1)
+
+
+# github
+
+REPO = "myorg/main-app"
+_COMMIT_AUTHOR = {"name": "Admin", "email": "admin@example.com"}
+
+
+def _seed_repo(backend: StateBackend, branch_count: int, prs: List[Dict[str, Any]] = ()) -> Dict[str, Dict[str, Any]]:
+    branches = {
+        f"feature/{i}": {
+            "name": f"feature/{i}",
+            "commit": {"sha": f"{i:012x}", "message": "seed", "author": _COMMIT_AUTHOR,
+                       "date": "2024-01-01T00:00:00Z"},
+            "protected": False
+        }
+        for i in range(branch_count)
+    }
+    github._repos = backend.mapping("github.repos")
+    github._repos.seed({REPO: {"owner": "myorg", "name": "main-app", "full_name": REPO,
+                               "default_branch": "feature/0", "description": ""}})
+    github._branches = backend.mapping("github.branch_data")
+    github._branches.seed({f"{REPO}:{name}": branch for name, branch in branches.items()})
+    github._branch_names = backend.sequence("github.branch_names")
+    github._branch_names.seed({REPO: list(branches)})
+    github._prs = backend.mapping("github.pr_data")
+    github._prs.seed({f"{REPO}#{pr['number']}": pr for pr in prs})
+    github._pr_list = backend.sequence("github.pr_list")
+    github._pr_list.seed({REPO: [pr["number"] for pr in prs]})
+    github._pr_numbers = backend.counter("github.pr_number")
+    github._branch_heads = backend.mapping("github.branch_heads")
+    github._branch_heads.seed({f"{REPO}@{branch['commit']['sha']}": name for name, branch in branches.items()})
+    return branches
+
+
+def _seed_files(backend: StateBackend, files: Dict[str, Dict[str, str]]) -> None:
+    """Seed {branch_name: {path: content}} as the repo's files"""
+    github._files = backend.mapping("github.file_contents")
+    github._files.seed({
+        f"{REPO}:{branch}:{path}": content for branch, paths in files.items() for path, content in paths.items()
+    })
+    github._file_paths = backend.sequence("github.file_paths")
+    github._file_paths.seed({f"{REPO}:{branch}": list(paths) for branch, paths in files.items()})
+
+
+def seed_branches(backend: StateBackend, n: int) -> None:
+    SEEDED["branches"] = n
+    branches = _seed_repo(backend, n)
+    _seed_files(backend, {name: {"README.md": "# seed"} for name in branches})
+
+
+def seed_files(backend: StateBackend, n: int) -> None:
+    SEEDED["files"] = n
+    _seed_repo(backend, 1)
+    _seed_files(backend, {"feature/0": {f"docs/{i}.md": f"file {i}" for i in range(n)}})
+
+
+def seed_prs(backend: StateBackend, n: int) -> None:
+    SEEDED["prs"] = n
+    _seed_repo(backend, 2, [
+        {"number": i, "state": "open", "title": f"PR {i}", "head": "feature/1", "base": "feature/0",
+         "body": "", "author": "seed", "created_at": "2024-01-01T00:00:00Z",
+         "updated_at": "2024-01-01T00:00:00Z"}
+        for i in range(n)
+    ])
+    _seed_files(backend, {"feature/0": {}, "feature/1": {"README.md": "# seed"}})
+
+
+# slack
+
+def seed_messages(backend: StateBackend, n: int) -> None:
+    slack._channels = backend.mapping("slack.channels")
+    slack._channels.seed({"C001": {"id": "C001", "name": "general", "is_private": False, "topic": "",
+                                   "members": ["U001"], "created": 1609459200}})
+    slack._messages = backend.sequence("slack.messages")
+    slack._messages.seed({"C001": [
+        SlackMessage(ts=f"{1609459200 + i}.000100", user="U001", text=f"message {i}") for i in range(n)
+    ]})
+
+
+# mailing_list
+
+def seed_mailing_list(backend: StateBackend, n: int) -> None:
+    store = backend.mapping("mailing_lists")
+    store.seed({"member": {f"user{i}@example.com" for i in range(n)}})
+    mailing_list._mailing_lists = store
+
+
+GITHUB_STORES = [
+    (github, name)
+    for name in ("_repos", "_branches", "_branch_names", "_files", "_file_paths", "_prs", "_pr_list",
+                 "_pr_numbers", "_branch_heads")
+]
+SALESFORCE_STORES = [(salesforce, name) for name in ("_records", "_record_ids", "_records_by_id")]
+
+CASES = [
+    Case("member_desk_invite", [(member_desk, "_invitations")], seed_invitations,
+         lambda i: member_desk.member_desk_invite(f"new{i}@example.com", "New", "Technical"), 0.0),
+    Case("member_desk_get_invitation_status", [(member_desk, "_invitations")], seed_invitations,
+         # The most recently invited contact: the worst case for a scan
+         lambda i: member_desk.member_desk_get_invitation_status(
+             f"user{SEEDED['invitations'] - 1}@example.com"), 0.0),
+    Case("salesforce_query_by_id", SALESFORCE_STORES, seed_accounts,
+         lambda i: salesforce.salesforce_query("SELECT * FROM Account WHERE Id = '001000000000000AAG'"), 0.0),
+    Case("salesforce_create", SALESFORCE_STORES, seed_accounts,
+         lambda i: salesforce.salesforce_create("Account", {"Name": f"New {i}"}), 0.0),
+    Case("github_create_branch", GITHUB_STORES, seed_branches,
+         # Branch from the newest branch's SHA: the worst case for a scan
+         lambda i: github.github_create_branch(
+             "myorg", "main-app", f"bench/{i}", f"{SEEDED['branches'] - 1:012x}"),
+         0.0, max_size=100_000),
+    Case("github_create_branch_files", GITHUB_STORES, seed_files,
+         # Branching copies the base branch's files, so this one is expected to scale with them
+         lambda i: github.github_create_branch("myorg", "main-app", f"bench/{i}", f"{0:012x}"),
+         1.0, max_size=100_000),
+    Case("github_commit_file", GITHUB_STORES, seed_files,
+         lambda i: github.github_commit_file("myorg", "main-app", f"new/{i}.md", "x", "bench", "feature/0"), 0.0),
+    Case("github_get_file", GITHUB_STORES, seed_files,
+         # One file of a large repository: must not copy the others
+         lambda i: github.github_get_file("myorg", "main-app", f"docs/{SEEDED['files'] - 1}.md", "feature/0"), 0.0),
+    Case("github_merge_pr", GITHUB_STORES, seed_prs,
+         # Merge from the newest PR backwards, so each call merges an open PR
+         lambda i: github.github_merge_pr("myorg", "main-app", SEEDED["prs"] - 1 - i),
+         0.0, max_size=100_000),
+    Case("slack_send_message", [(slack, "_channels"), (slack, "_messages")], seed_messages,
+         lambda i: slack.slack_send_message("C001", f"bench {i}"), 0.0),
+    Case("slack_list_messages", [(slack, "_channels"), (slack, "_messages")], seed_messages,
+         lambda i: slack.slack_list_messages("C001", limit=10), 0.0),
+    Case("add_to_mailing_list", [(mailing_list, "_mailing_lists")], seed_mailing_list,
+         lambda i: mailing_list.add_to_mailing_list("member", f"new{i}@example.com"), 0.0),
+    Case("list_all_mailing_lists", [(mailing_list, "_mailing_lists")], seed_mailing_list,
+         # Counts the members of a large list without copying them
+         lambda i: mailing_list.list_all_mailing_lists(), 0.0),
+]
+
+
+def fresh_backend(kind: str, directory: str) -> StateBackend:
+    """An empty backend of `kind`; SQLite files go in `directory`"""
+    if kind == "memory":
+        return MemoryBackend()
+    path = os.path.join(directory, f"state-{time.perf_counter_ns()}.db")
+    return SQLiteBackend(path) if kind == "sqlite" else SharedMemoryBackend(path)
+
+
+def time_op(op: Callable[[int], Any], budget: float, max_ops: int) -> Dict[str, Any]:
+    """Median per-op latency over up to `max_ops` calls or `budget` seconds (at least MIN_OPS calls)"""
+    timings = []
+    deadline = time.perf_counter() + budget
+    i = 0
+    while i < max_ops and (i < MIN_OPS or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        op(i)
+        timings.append(time.perf_counter() - started)
+        i += 1
+    timings.sort()
+    return {"ops": i, "median_us": round(timings[len(timings) // 2] * 1e6, 3)}
+
+
+def measure(case: Case, backend: StateBackend, size: int, budget: float, max_ops: int) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    case.seed(backend, size)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    if isinstance(backend, SQLiteBackend):
+        # The data lives in the database file, not on the Python heap
+        path = backend.db.path
+        store_bytes = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+    # Move the seeded records out of the collector's reach: otherwise the
+    # first full collection scans all of them and lands in the timings of
+    # the largest sizes, whatever the operation costs
+    gc.collect()
+    gc.freeze()
+    try:
+        timing = time_op(case.op, budget, max_ops)
+
+        # Allocation peak of a few more operations (tracing slows them, so separately)
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for i in range(timing["ops"], timing["ops"] + 3):
+            case.op(i)
+        op_peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+    finally:
+        gc.unfreeze()
+
+    return {
+        "size": size,
+        **timing,
+        "store_bytes_per_record": round(store_bytes / size, 1),
+        "op_peak_bytes": op_peak
+    }
+
+
+def slope(points: List[Dict[str, Any]]) -> float:
+    """Least-squares exponent k of latency ~ size^k"""
+    xs = [math.log(p["size"]) for p in points]
+    ys = [math.log(max(p["median_us"], 1e-3)) for p in points]
+    if len(xs) < 2:
+        return 0.0
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def run_case(case: Case, kind: str, sizes: List[int], budget: float, max_ops: int) -> Dict[str, Any]:
+    saved = [(module, attribute, getattr(module, attribute)) for module, attribute in case.stores]
+    directory = SHM_DIR if kind == "shm" else None
+    try:
+        points = []
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            for size in sizes:
+                if case.max_size is not None and size > case.max_size:
+                    continue
+                point = measure(case, fresh_backend(kind, tmp), size, budget, max_ops)
+                points.append(point)
+                print(
+                    f"  {size:>9,}  {point['median_us']:>10.2f}us/op"
+                    f"  {point['store_bytes_per_record']:>8.1f} B/record"
+                    f"  {point['op_peak_bytes']:>12,} B/op peak"
+                )
+    finally:
+        for module, attribute, store in saved:
+            setattr(module, attribute, store)
+    exponent = round(slope(points), 3)
+    return {"expected_slope": case.expected, "slope": exponent, "points": points}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    print(f"\n{'case':<36}{'baseline':>10}{'current':>10}")
+    for name, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        flag = ""
+        if current["slope"] - previous["slope"] > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(f"{name}: slope {previous['slope']} -> {current['slope']}")
+        print(f"{name:<36}{previous['slope']:>10.2f}{current['slope']:>10.2f}{flag}")
+    return regressions
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--case", action="append", choices=[case.name for case in CASES],
+                        help="case to run; repeat for several (default: all)")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "shm"], default="memory",
+                        help="state backend to seed (default: memory)")
+    parser.add_argument("--max-size", type=int, default=SIZES[-1], help="largest store size")
+    parser.add_argument("--budget", type=float, default=0.2, help="seconds of timing per size")
+    parser.add_argument("--max-ops", type=int, default=500, help="operations timed per size")
+    parser.add_argument("--slope-tolerance", type=float, default=0.3,
+                        help="exponent increase treated as a regression (default 0.3)")
+    parser.add_argument("--strict", action="store_true", help="fail when a case is over its budget")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    args = parser.parse_args()
+
+    sizes = [size for size in SIZES if size <= args.max_size]
+    results: Dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": time.time(),
+        "backend": args.backend,
+        "sizes": sizes,
+        "cases": {}
+    }
+    over_budget = []
+    for case in CASES:
+        if args.case and case.name not in args.case:
+            continue
+        print(case.name)
+        result = run_case(case, args.backend, sizes, args.budget, args.max_ops)
+        results["cases"][case.name] = result
+        over = result["slope"] - case.expected > args.slope_tolerance
+        if over:
+            over_budget.append(case.name)
+        print(f"  slope {result['slope']:.2f} (expected {case.expected:.0f}){'  OVER BUDGET' if over else ''}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    failed = False
+    if over_budget:
+        print("\nOver budget: " + ", ".join(over_budget))
+        failed = args.strict
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.slope_tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,228 @@
+"""
+Concurrency stress test for the service stores behind functions/
+
+Many threads (and, with a shared backend, several processes) call the write
+functions at once, all against the same channel, mailing list, repository,
+sheet and object type, so every call contends with the others. Afterwards
+the state is checked for lost updates:
+
+- every message, lead, sheet row, mailing list member and invitation written
+  is there, exactly once
+- PR numbers and record IDs are unique
+- every committed file is on its branch, and every created branch has both
+  its branch entry and its copied files (a change spanning two stores)
+- every accepted invitation is marked accepted
+
+Calls go straight to the function implementations, without HTTP or the
+dispatcher. The script prints throughput and exits with status 1 if any
+check fails.
+
+Run from example_registry/:
+
+    python benchmarks/stress.py --threads 32 --ops 500
+    python benchmarks/stress.py --backend sqlite --processes 4 --threads 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# Operations per worker iteration; branch creation copies the branch's files,
+# so it only runs every BRANCH_EVERY iterations
+OPS_PER_ITERATION = 8
+BRANCH_EVERY = 25
+
+
+def worker(tag: str, worker_id: str, ops: int, errors: List[str]) -> Dict[str, List[Any]]:
+    """Run `ops` iterations of the write mix and return what was written"""
+    from functions import (
+        add_to_mailing_list, github_commit_file, github_create_branch, github_create_pr, github_list_branches,
+        google_sheets_append, member_desk_accept_invitation, member_desk_invite, salesforce_create,
+        slack_send_message
+    )
+
+    # New branches start from main, and get a copy of its files
+    main_sha = next(
+        b["commit"]["sha"] for b in github_list_branches(owner="myorg", repo="main-app")["branches"]
+        if b["name"] == "main"
+    )
+    written: Dict[str, List[Any]] = {"prs": [], "records": [], "branches": []}
+    for i in range(ops):
+        key = f"{worker_id}-{i}"
+        try:
+            slack_send_message(channel_id="C001", text=f"stress {tag} {key}")
+            add_to_mailing_list(list_name=f"stress-{tag}", email=f"{key}@stress.test")
+            github_commit_file(
+                owner="myorg", repo="main-app", path=f"stress-{tag}/{key}.txt",
+                content=key, message=f"stress {key}", branch="develop"
+            )
+            written["prs"].append(github_create_pr(
+                owner="myorg", repo="main-app", title=f"stress {tag} {key}",
+                head="develop", base="main", body=""
+            )["number"])
+            written["records"].append(salesforce_create(object_type=f"Stress{tag}", data={"Key": key})["id"])
+            google_sheets_append(sheet_id=f"stress-{tag}", range="A1", values=[[key]])
+            member_desk_invite(email=f"{key}@stress.test", name=key, role="Technical")
+            member_desk_accept_invitation(email=f"{key}@stress.test")
+            if i % BRANCH_EVERY == 0:
+                branch = f"stress-{tag}-{key}"
+                github_create_branch(owner="myorg", repo="main-app", branch_name=branch, base_sha=main_sha)
+                written["branches"].append(branch)
+        except Exception as e:
+            errors.append(f"{key}: {type(e).__name__}: {e}")
+    return written
+
+
+def run_threads(tag: str, prefix: str, threads: int, ops: int) -> Dict[str, Any]:
+    errors: List[str] = []
+    results: List[Dict[str, List[Any]]] = []
+
+    def run(worker_id):
+        results.append(worker(tag, worker_id, ops, errors))
+
+    pool = [threading.Thread(target=run, args=(f"{prefix}t{n}",)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    merged: Dict[str, Any] = {"errors": errors}
+    for key in ("prs", "records", "branches"):
+        merged[key] = [value for result in results for value in result[key]]
+    return merged
+
+
+def process_main(tag: str, prefix: str, threads: int, ops: int, queue) -> None:
+    queue.put(run_threads(tag, prefix, threads, ops))
+
+
+def verify(tag: str, keys: List[str], written: Dict[str, Any]) -> List[str]:
+    """Check that everything the workers wrote is in the stores, once"""
+    from functions import (
+        get_mailing_list, github_get_file, github_list_branches, github_list_prs, google_sheets_read,
+        member_desk_get_invitation_status, salesforce_query, slack_list_messages
+    )
+
+    failures = list(written["errors"][:10])
+    if len(written["errors"]) > 10:
+        failures.append(f"... and {len(written['errors']) - 10} more call errors")
+
+    def expect(name: str, found: List[Any], expected: List[Any]) -> None:
+        missing = set(expected) - set(found)
+        duplicates = len(found) - len(set(found))
+        if missing or duplicates or len(found) != len(expected):
+            failures.append(
+                f"{name}: expected {len(expected)}, found {len(found)}"
+                f" ({len(missing)} missing, {duplicates} duplicated)"
+            )
+
+    messages = slack_list_messages(channel_id="C001", limit=10**9)["messages"]
+    prefix = f"stress {tag} "
+    expect("slack messages", [m["text"][len(prefix):] for m in messages if m["text"].startswith(prefix)], keys)
+
+    members = get_mailing_list(list_name=f"stress-{tag}")["members"]
+    expect("mailing list members", [m.split("@")[0] for m in members], keys)
+
+    prs = [pr for pr in github_list_prs(owner="myorg", repo="main-app", state="all")["pull_requests"]
+           if pr["title"].startswith(prefix)]
+    expect("pull requests", [pr["title"][len(prefix):] for pr in prs], keys)
+    expect("pull request numbers", [pr["number"] for pr in prs], written["prs"])
+
+    records = salesforce_query(query=f"SELECT * FROM Stress{tag}")["records"]
+    expect("salesforce records", [r["Key"] for r in records], keys)
+    expect("salesforce record ids", [r["Id"] for r in records], written["records"])
+
+    rows = google_sheets_read(sheet_id=f"stress-{tag}", range="A1")
+    expect("sheet rows", [row[0] for row in rows], keys)
+
+    not_accepted = [
+        key for key in keys
+        if member_desk_get_invitation_status(email=f"{key}@stress.test").get("invitation", {}).get("status") != "accepted"
+    ]
+    if not_accepted:
+        failures.append(f"invitations: {len(not_accepted)} of {len(keys)} not accepted")
+
+    missing_files = [
+        key for key in keys
+        if not github_get_file(owner="myorg", repo="main-app", path=f"stress-{tag}/{key}.txt", branch="develop")["ok"]
+    ]
+    if missing_files:
+        failures.append(f"committed files: {len(missing_files)} of {len(keys)} missing")
+
+    branches = {b["name"] for b in github_list_branches(owner="myorg", repo="main-app")["branches"]}
+    expect("branches", [b for b in branches if b.startswith(f"stress-{tag}-")], written["branches"])
+    without_files = [
+        branch for branch in written["branches"]
+        if not github_get_file(owner="myorg", repo="main-app", path="README.md", branch=branch)["ok"]
+    ]
+    if without_files:
+        failures.append(f"branches: {len(without_files)} created without their files")
+    return failures
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--threads", type=int, default=16, help="threads per process")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes; more than 1 needs --backend sqlite or shm")
+    parser.add_argument("--ops", type=int, default=200, help="iterations of the write mix per thread")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "shm"], default="memory")
+    args = parser.parse_args()
+
+    if args.processes > 1 and args.backend == "memory":
+        parser.error("--processes needs a shared backend (--backend sqlite or shm)")
+
+    # Workers and the verifying parent must open the same, fresh, state
+    os.environ["REGISTRY_STATE_BACKEND"] = args.backend
+    os.environ.pop("REGISTRY_STATE_DIR", None)
+    tmpdir = None
+    if args.backend != "memory":
+        tmpdir = tempfile.TemporaryDirectory(dir="/dev/shm" if args.backend == "shm" else None)
+        os.environ["REGISTRY_STATE_PATH"] = os.path.join(tmpdir.name, "stress.db")
+
+    tag = uuid.uuid4().hex[:8]
+    prefixes = [f"p{p}" for p in range(args.processes)]
+    started = time.perf_counter()
+    if args.processes == 1:
+        written = run_threads(tag, prefixes[0], args.threads, args.ops)
+    else:
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        procs = [
+            context.Process(target=process_main, args=(tag, prefix, args.threads, args.ops, queue))
+            for prefix in prefixes
+        ]
+        for proc in procs:
+            proc.start()
+        parts = [queue.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        written = {key: [value for part in parts for value in part[key]]
+                   for key in ("errors", "prs", "records", "branches")}
+    elapsed = time.perf_counter() - started
+
+    calls = args.processes * args.threads * args.ops * OPS_PER_ITERATION
+    print(f"{args.backend}: {args.processes} process(es) x {args.threads} threads x {args.ops} iterations")
+    print(f"{calls} calls in {elapsed:.2f}s ({calls / elapsed:.0f} calls/s)")
+
+    keys = [f"{prefix}t{n}-{i}" for prefix in prefixes for n in range(args.threads) for i in range(args.ops)]
+    failures = verify(tag, keys, written)
+    if tmpdir is not None:
+        tmpdir.cleanup()
+    if failures:
+        print("\nLost updates:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("No lost updates")
+
+
+if __name__ == "__main__":
+    main_cli()
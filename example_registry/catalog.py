@@ -0,0 +1,87 @@
+"""
+Precomputed registry catalog responses
+The catalog is immutable once discovery has run, so the listing, per-category
+and per-function documents are serialized once into bytes with a content hash
+and served with an ETag. Clients that send If-None-Match get a 304.
+"""
+import hashlib
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from json_codec import dumps
+from function_discovery import DISCOVERED_FUNCTIONS, function_summary
+from startup import STARTUP
+
+
+class CachedDocument:
+    """A pre-encoded JSON body and its strong ETag"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, document: Any):
+        self.body = dumps(document)
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=16).hexdigest() + '"'
+
+
+class Catalog:
+    """Serialized views of DISCOVERED_FUNCTIONS
+
+    Call `rebuild()` after the set of discovered functions changes.
+    """
+
+    def __init__(self, functions: Dict[str, Dict[str, Any]]):
+        self._functions = functions
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        summaries = {name: function_summary(name, info) for name, info in self._functions.items()}
+        by_category: Dict[str, list] = {}
+        for summary in summaries.values():
+            by_category.setdefault(summary['category'], []).append(summary)
+
+        self.functions = CachedDocument({
+            "functions": list(summaries.values()),
+            "total": len(summaries)
+        })
+        self.categories = CachedDocument({"categories": sorted(by_category)})
+        self.by_category = {
+            category: CachedDocument({"functions": functions, "total": len(functions)})
+            for category, functions in by_category.items()
+        }
+        self.details = {name: CachedDocument(summary) for name, summary in summaries.items()}
+
+    def category(self, category: str) -> Optional[CachedDocument]:
+        return self.by_category.get(category)
+
+    def detail(self, function_name: str) -> Optional[CachedDocument]:
+        return self.details.get(function_name)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (which may list several tags) against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def document_response(request: Request, document: CachedDocument) -> Response:
+    """Serve a cached document, answering 304 when the client's copy is current"""
+    headers = {"ETag": document.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), document.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(document.body, media_type="application/json", headers=headers)
+
+
+with STARTUP.phase("catalog"):
+    catalog = Catalog(DISCOVERED_FUNCTIONS)
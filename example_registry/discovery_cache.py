@@ -0,0 +1,150 @@
+"""
+Persistent cache of discovered function metadata
+Introspection results (signature, type hints, docstring) are stored per
+function module, keyed by a fingerprint of the module's source file. Warm
+starts reuse the stored metadata and only re-introspect modules whose source
+changed. The cache lives at REGISTRY_DISCOVERY_CACHE (an empty value turns
+it off).
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger("registry.discovery_cache")
+
+# Bump when the shape of cached metadata changes
+CACHE_VERSION = 3
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".discovery_cache.pickle")
+
+
+def cache_path() -> Optional[str]:
+    path = os.environ.get("REGISTRY_DISCOVERY_CACHE", DEFAULT_CACHE_PATH)
+    return path or None
+
+
+def _source_digest(path: str) -> str:
+    with open(path, "rb") as source:
+        return hashlib.sha256(source.read()).hexdigest()
+
+
+class ModuleFingerprint:
+    """Identity of a module's source: cheap stat check, content hash fallback"""
+
+    __slots__ = ("mtime_ns", "size", "digest")
+
+    def __init__(self, mtime_ns: int, size: int, digest: str):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+
+    @classmethod
+    def of(cls, path: str) -> "ModuleFingerprint":
+        stat = os.stat(path)
+        return cls(stat.st_mtime_ns, stat.st_size, _source_digest(path))
+
+    def matches(self, path: str) -> bool:
+        stat = os.stat(path)
+        if stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size:
+            return True
+        # Touched but possibly unchanged (e.g. a fresh checkout)
+        return stat.st_size == self.size and _source_digest(path) == self.digest
+
+
+class DiscoveryCache:
+    """Metadata for each function, grouped by the module that defines it"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._modules: Dict[str, Dict[str, Any]] = {}
+        self._checked: Dict[str, bool] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "DiscoveryCache":
+        """Load the cache file, starting empty if it is missing or unreadable"""
+        cache = cls(path if path is not None else cache_path())
+        if not cache.path or not os.path.exists(cache.path):
+            return cache
+        try:
+            with open(cache.path, "rb") as handle:
+                data = pickle.load(handle)
+            if data.get("version") == CACHE_VERSION and data.get("python") == sys.version:
+                cache._modules = data["modules"]
+        except Exception as e:
+            logger.warning("Ignoring unreadable discovery cache %s: %s", cache.path, e)
+        return cache
+
+    @staticmethod
+    def _module_file(module_name: str) -> Optional[str]:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            return getattr(module, "__file__", None)
+        # Locate the source without importing the module
+        spec = importlib.util.find_spec(module_name)
+        return spec.origin if spec is not None and spec.has_location else None
+
+    def _module_valid(self, module_name: str, path: str) -> bool:
+        if module_name not in self._checked:
+            entry = self._modules.get(module_name)
+            self._checked[module_name] = entry is not None and entry["fingerprint"].matches(path)
+        return self._checked[module_name]
+
+    def lookup(self, func_name: str, module_name: str) -> Optional[Dict[str, Any]]:
+        """Cached metadata (without the function object), or None on a miss
+
+        Validity is checked against the module's source file, which is
+        located without importing the module.
+        """
+        path = self._module_file(module_name)
+        if path and self._module_valid(module_name, path):
+            metadata = self._modules[module_name]["functions"].get(func_name)
+            if metadata is not None:
+                self.hits += 1
+                return dict(metadata)
+        self.misses += 1
+        return None
+
+    def store(self, func_name: str, func: Callable, metadata: Dict[str, Any]) -> None:
+        """Record freshly introspected metadata for a function"""
+        path = self._module_file(func.__module__)
+        if not path:
+            return
+        module_name = func.__module__
+        if not self._module_valid(module_name, path):
+            # Source changed: drop every stale entry for the module
+            self._modules[module_name] = {
+                "fingerprint": ModuleFingerprint.of(path),
+                "functions": {}
+            }
+            self._checked[module_name] = True
+        entry = {k: v for k, v in metadata.items() if k != 'function'}
+        self._modules[module_name]["functions"][func_name] = entry
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache atomically if anything changed"""
+        if not self.path or not self._dirty:
+            return
+        data = {"version": CACHE_VERSION, "python": sys.version, "modules": self._modules}
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.path) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".discovery_cache.")
+            with os.fdopen(fd, "wb") as handle:
+                pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            # A read-only deployment just pays full introspection each start
+            logger.warning("Could not write discovery cache %s: %s", self.path, e)
@@ -0,0 +1,232 @@
+"""
+Shared call path for executing discovered functions
+Every execution surface (per-function endpoints, batch, map) goes through here
+so they all produce the same {function_name, result, success, error} envelope.
+"""
+import asyncio
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from pydantic import TypeAdapter, ValidationError
+
+from executor import execute, ExecutorSaturatedError
+from function_discovery import DISCOVERED_FUNCTIONS
+from limits import limits, RateLimitedError
+from metrics import metrics
+from result_cache import result_cache, MISS
+from single_flight import SingleFlight
+from settings import env_int
+
+
+BATCH_MAX_CONCURRENCY = env_int("REGISTRY_BATCH_CONCURRENCY", 16)
+BATCH_MAX_CALLS = env_int("REGISTRY_BATCH_MAX_CALLS", 1000)
+MAP_MAX_CONCURRENCY = env_int("REGISTRY_MAP_CONCURRENCY", 32)
+MAP_MAX_ITEMS = env_int("REGISTRY_MAP_MAX_ITEMS", 10000)
+
+# Identical concurrent calls to coalescing functions share one execution
+single_flight = SingleFlight()
+
+
+def success_envelope(func_name: str, result: Any) -> Dict[str, Any]:
+    return {
+        "function_name": func_name,
+        "result": result,
+        "success": True
+    }
+
+
+def error_envelope(func_name: str, error: str) -> Dict[str, Any]:
+    return {
+        "function_name": func_name,
+        "result": None,
+        "success": False,
+        "error": error
+    }
+
+
+def validate_params(func_info: Dict[str, Any], raw_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate raw parameters against a function's request model
+
+    Raises pydantic.ValidationError when the parameters don't match.
+    """
+    request = func_info['request_model'].model_validate(raw_params)
+    return request.model_dump(exclude_none=True)
+
+
+def validate_json(func_info: Dict[str, Any], body: Union[bytes, str]) -> Dict[str, Any]:
+    """Validate a raw JSON request body against a function's request model
+
+    Parsing and validation happen in one pass inside pydantic-core, without
+    building an intermediate dict first. Malformed JSON is reported as a
+    ValidationError like any other invalid input.
+    """
+    request = func_info['request_model'].model_validate_json(body or b"{}")
+    return request.model_dump(exclude_none=True)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(func_name: str) -> TypeAdapter:
+    return TypeAdapter(List[DISCOVERED_FUNCTIONS[func_name]['request_model']])
+
+
+def validate_many(
+    func_info: Dict[str, Any],
+    raw_params_list: List[Dict[str, Any]]
+) -> List[Union[Dict[str, Any], ValidationError]]:
+    """Validate many parameter sets for one function in a single pass
+
+    Returns validated params for each item, or the ValidationError for items
+    that don't match. The whole list is validated at once and only falls back
+    to per-item validation when something is invalid.
+    """
+    try:
+        requests = _list_adapter(func_info['name']).validate_python(raw_params_list)
+        return [request.model_dump(exclude_none=True) for request in requests]
+    except ValidationError:
+        pass
+
+    validated = []
+    for raw_params in raw_params_list:
+        try:
+            validated.append(validate_params(func_info, raw_params))
+        except ValidationError as e:
+            validated.append(e)
+    return validated
+
+
+async def _execute_envelope(func_info: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    func_name = func_info['name']
+    is_read = func_info['access'] == 'read'
+    generation = result_cache.generation(func_info['category'])
+    try:
+        async with limits.admit(func_info):
+            result = await execute(func_info, params)
+    except (ExecutorSaturatedError, RateLimitedError):
+        raise
+    except Exception as e:
+        return error_envelope(func_name, str(e))
+
+    if result_cache.enabled:
+        if is_read:
+            result_cache.put(func_info, params, result, generation)
+        else:
+            result_cache.invalidate(func_info, params)
+    return success_envelope(func_name, result)
+
+
+async def _invoke(func_info: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    if func_info['access'] == 'read' and result_cache.enabled:
+        cached = result_cache.get(func_info, params)
+        if cached is not MISS:
+            return success_envelope(func_info['name'], cached)
+
+    if not func_info['coalesce']:
+        return await _execute_envelope(func_info, params)
+    envelope = await single_flight.do(
+        result_cache.key(func_info, params),
+        lambda: _execute_envelope(func_info, params)
+    )
+    # Each caller gets its own envelope; batch and workflow annotate them
+    return dict(envelope)
+
+
+async def invoke(func_info: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a function with already-validated parameters
+
+    Function errors are reported in the envelope; ExecutorSaturatedError and
+    RateLimitedError are propagated so the caller can decide how to shed
+    load. Reads are served
+    from the result cache when possible, and successful writes invalidate it.
+    Identical concurrent calls to coalescing functions run only once. Every
+    call is recorded in the metrics, shed calls as errors.
+    """
+    started = metrics.call_started(func_info)
+    success = False
+    try:
+        envelope = await _invoke(func_info, params)
+        success = envelope['success']
+        return envelope
+    finally:
+        metrics.call_finished(func_info, started, success)
+
+
+async def dispatch(func_name: str, raw_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Look up, validate and execute a single call, never raising
+
+    Lookup, validation, saturation and rate-limit failures all become error
+    envelopes.
+    """
+    func_info = DISCOVERED_FUNCTIONS.get(func_name)
+    if func_info is None:
+        return error_envelope(func_name, f"Function '{func_name}' not found")
+
+    try:
+        params = validate_params(func_info, raw_params)
+    except ValidationError as e:
+        return error_envelope(func_name, f"Invalid parameters: {e}")
+
+    try:
+        return await invoke(func_info, params)
+    except (ExecutorSaturatedError, RateLimitedError) as e:
+        return error_envelope(func_name, str(e))
+
+
+async def dispatch_batch(
+    calls: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Execute independent calls concurrently, returning envelopes in order
+
+    At most `max_concurrency` calls (capped by REGISTRY_BATCH_CONCURRENCY)
+    run at the same time.
+    """
+    limit = min(max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run_one(call: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await dispatch(call['function_name'], call['params'])
+
+    return await asyncio.gather(*(run_one(call) for call in calls))
+
+
+async def dispatch_map(
+    func_info: Dict[str, Any],
+    params_list: List[Union[Dict[str, Any], ValidationError]],
+    max_concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """Apply one function over many parameter sets, yielding as calls finish
+
+    Yields (index, envelope) pairs in completion order. Only `max_concurrency`
+    calls (capped by REGISTRY_MAP_CONCURRENCY) are in flight at a time, so
+    results can be streamed without holding the whole result set.
+    """
+    func_name = func_info['name']
+    limit = max(min(max_concurrency or MAP_MAX_CONCURRENCY, MAP_MAX_CONCURRENCY), 1)
+
+    async def run_one(index: int, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        try:
+            return index, await invoke(func_info, params)
+        except (ExecutorSaturatedError, RateLimitedError) as e:
+            return index, error_envelope(func_name, str(e))
+
+    pending = set()
+    try:
+        for index, params in enumerate(params_list):
+            if isinstance(params, ValidationError):
+                yield index, error_envelope(func_name, f"Invalid parameters: {params}")
+                continue
+            if len(pending) >= limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.create_task(run_one(index, params)))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # The client went away mid-stream: don't start or await the rest
+        for task in pending:
+            task.cancel()
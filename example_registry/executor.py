@@ -0,0 +1,166 @@
+"""
+Managed execution of registry functions off the event loop
+Sync functions run in bounded, per-category thread pools so a slow call
+never stalls the other requests served by the uvicorn worker. Native async
+functions are awaited directly on the loop.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from profiling import current_trace, profiler
+from settings import env_int, env_int_mapping
+
+
+DEFAULT_POOL_SIZE = env_int("REGISTRY_EXECUTOR_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+DEFAULT_QUEUE_LIMIT = env_int("REGISTRY_EXECUTOR_QUEUE", 64)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when a category pool has no free worker and its queue is full"""
+
+    def __init__(self, category: str):
+        super().__init__(f"Executor for category '{category}' is saturated")
+        self.category = category
+
+
+class CategoryPool:
+    """A thread pool plus an admission limit for a single category
+
+    At most `max_workers` calls run at once and at most `max_queue` more wait
+    for a worker; anything beyond that is rejected instead of queued forever.
+    """
+
+    def __init__(self, category: str, max_workers: int, max_queue: int):
+        self.category = category
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"registry-{category}"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    async def run(self, fn: Callable, params: Dict[str, Any]) -> Any:
+        """Run `fn(**params)` on this pool, rejecting when saturated"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturatedError(self.category)
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self.executor.submit(functools.partial(fn, **params))
+        except BaseException:
+            self._release(None)
+            raise
+        # Release the slot when the thread finishes, not when the awaiting
+        # coroutine does: a cancelled request leaves its call still running
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "rejected": self.rejected
+        }
+
+
+class FunctionExecutor:
+    """Dispatches registry functions to per-category pools
+
+    Pool sizes and queue limits default to REGISTRY_EXECUTOR_WORKERS and
+    REGISTRY_EXECUTOR_QUEUE and can be overridden per category with
+    REGISTRY_EXECUTOR_POOL_SIZES / REGISTRY_EXECUTOR_QUEUE_LIMITS
+    (e.g. "salesforce=4,github=8").
+    """
+
+    def __init__(
+        self,
+        default_pool_size: int = DEFAULT_POOL_SIZE,
+        default_queue_limit: int = DEFAULT_QUEUE_LIMIT,
+        pool_sizes: Optional[Dict[str, int]] = None,
+        queue_limits: Optional[Dict[str, int]] = None
+    ):
+        self.default_pool_size = default_pool_size
+        self.default_queue_limit = default_queue_limit
+        self.pool_sizes = pool_sizes or {}
+        self.queue_limits = queue_limits or {}
+        self._pools: Dict[str, CategoryPool] = {}
+        self._lock = threading.Lock()
+
+    def pool_for(self, category: str) -> CategoryPool:
+        """Get (creating on first use) the pool serving a category"""
+        pool = self._pools.get(category)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(category)
+                if pool is None:
+                    pool = CategoryPool(
+                        category,
+                        self.pool_sizes.get(category, self.default_pool_size),
+                        self.queue_limits.get(category, self.default_queue_limit)
+                    )
+                    self._pools[category] = pool
+        return pool
+
+    async def run(self, category: str, fn: Callable, params: Dict[str, Any]) -> Any:
+        """Execute a sync function for a category without blocking the loop"""
+        return await self.pool_for(category).run(fn, params)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {category: pool.stats() for category, pool in sorted(self._pools.items())}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.executor.shutdown(wait=wait)
+
+
+executor = FunctionExecutor(
+    pool_sizes=env_int_mapping("REGISTRY_EXECUTOR_POOL_SIZES"),
+    queue_limits=env_int_mapping("REGISTRY_EXECUTOR_QUEUE_LIMITS")
+)
+
+
+async def execute(func_info: Dict[str, Any], params: Dict[str, Any]) -> Any:
+    """Run a discovered function the cheapest way its kind allows
+
+    Coroutine functions are awaited directly and async generators are drained
+    on the loop (string chunks are joined, anything else is returned as a
+    list); only sync functions take the thread-pool hop.
+    """
+    fn = func_info['function']
+    if profiler.session is not None:
+        trace = current_trace.get()
+        if trace is not None and trace.sampled:
+            if func_info['is_async'] or func_info['is_async_generator']:
+                with trace.sampling_loop():
+                    return await _run(func_info, fn, params)
+            fn = trace.wrap_sync(fn)
+    return await _run(func_info, fn, params)
+
+
+async def _run(func_info: Dict[str, Any], fn: Callable, params: Dict[str, Any]) -> Any:
+    if func_info['is_async_generator']:
+        chunks = [chunk async for chunk in fn(**params)]
+        if all(isinstance(chunk, str) for chunk in chunks):
+            return "".join(chunks)
+        return chunks
+    if func_info['is_async']:
+        return await fn(**params)
+    return await executor.run(func_info['category'], fn, params)
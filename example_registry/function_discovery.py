@@ -3,9 +3,18 @@ Auto-discovery of functions from the functions module
 No manual registry needed!
 """
 import inspect
+import threading
 from typing import get_type_hints, Dict, Any, Callable, Optional, List, Union, get_origin, get_args
+from startup import STARTUP
 from pydantic import create_model, Field
-from functions import FUNCTION_MAP
+from discovery_cache import DiscoveryCache
+from retrieval import VectorIndex
+from search_index import SearchIndex
+from settings import env_bool, env_list
+from functions.access import ACCESS_ATTRIBUTE
+
+with STARTUP.phase("import_functions"):
+    from functions import FUNCTION_MAP
 
 
 def format_type_name(type_obj) -> str:
@@ -50,6 +59,26 @@ def format_type_name(type_obj) -> str:
     return str(type_obj).replace("<class '", "").replace("'>", "")
 
 
+# Name tokens that mark an unannotated function as read-only
+READ_VERBS = frozenset({"get", "list", "read", "query", "search", "retrieve", "fetch"})
+
+
+def function_access(func: Callable) -> tuple:
+    """Classify a function as ('read' | 'write', resource parameter names, coalesce)
+
+    Uses the @reads/@writes annotation when present, otherwise the name: a
+    verb such as get/list/read marks a read. Anything else is treated as a
+    write, so unknown functions are never cached or coalesced.
+    """
+    annotated = getattr(func, ACCESS_ATTRIBUTE, None)
+    if annotated is not None:
+        access, resource_params, coalesce = annotated
+        return access, list(resource_params), coalesce
+    if READ_VERBS.intersection(func.__name__.split('_')):
+        return 'read', [], True
+    return 'write', [], False
+
+
 def get_function_metadata(func: Callable) -> Dict[str, Any]:
     """Extract metadata from a function"""
     sig = inspect.signature(func)
@@ -80,12 +109,24 @@ def get_function_metadata(func: Callable) -> Dict[str, Any]:
     doc = inspect.getdoc(func) or f"Execute {func.__name__}"
     description = doc.split('\n')[0]  # First line
     
+    access, resource_params, coalesce = function_access(func)
+    
     return {
         'name': func.__name__,
         'description': description,
         'category': category,
         'parameters': parameters,
         'required_params': required_params,
+        # Native async implementations are awaited on the event loop
+        # instead of being dispatched to a thread pool
+        'is_async': inspect.iscoroutinefunction(func),
+        'is_async_generator': inspect.isasyncgenfunction(func),
+        # Reads are cached; a successful write invalidates its category's
+        # cached reads (or only those of the same resource)
+        'access': access,
+        'resource_params': resource_params,
+        # Identical concurrent calls share one execution
+        'coalesce': coalesce,
         'function': func
     }
 
@@ -114,37 +155,168 @@ def create_pydantic_model_for_function(func_name: str, metadata: Dict[str, Any])
     return create_model(model_name, **fields)
 
 
+def retrieval_text(func_name: str, metadata: Dict[str, Any]) -> str:
+    """Text embedded for semantic retrieval of a function"""
+    return " ".join([
+        func_name.replace('_', ' '),
+        metadata['category'].replace('_', ' '),
+        metadata['description'],
+        " ".join(name.replace('_', ' ') for name in metadata['parameters'])
+    ])
+
+
+# Build request models and import service modules on first use, per category
+LAZY_LOADING = env_bool("REGISTRY_LAZY_LOADING")
+
+# When set (e.g. "slack,github"), only these categories are served
+ENABLED_CATEGORIES = frozenset(env_list("REGISTRY_CATEGORIES"))
+
+
+class FunctionInfo(dict):
+    """A DISCOVERED_FUNCTIONS entry
+
+    In lazy mode the 'function' and 'request_model' keys are absent until one
+    of them is first read, which materializes the function's whole category.
+    """
+    
+    def __missing__(self, key):
+        if key in ('function', 'request_model'):
+            materialize_category(self['category'])
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+
 # Auto-discover all functions
-DISCOVERED_FUNCTIONS = {}
+DISCOVERED_FUNCTIONS: Dict[str, FunctionInfo] = {}
+
+# Ranked keyword search and semantic retrieval over everything discovered
+SEARCH_INDEX = SearchIndex()
+RETRIEVAL_INDEX = VectorIndex()
+
+# Lazily registered functions not yet materialized, by category
+_UNMATERIALIZED: Dict[str, List[str]] = {}
+_materialize_lock = threading.Lock()
 
-for func_name, func in FUNCTION_MAP.items():
-    metadata = get_function_metadata(func)
-    pydantic_model = create_pydantic_model_for_function(func_name, metadata)
+
+def _add_to_registry(func_name: str, info: FunctionInfo) -> FunctionInfo:
+    if func_name in DISCOVERED_FUNCTIONS:
+        raise ValueError(f"Function '{func_name}' is already registered")
     
-    DISCOVERED_FUNCTIONS[func_name] = {
+    DISCOVERED_FUNCTIONS[func_name] = info
+    with STARTUP.phase("index"):
+        SEARCH_INDEX.add(func_name, info)
+        RETRIEVAL_INDEX.add(func_name, retrieval_text(func_name, info))
+    return info
+
+
+def register_function(
+    func_name: str,
+    func: Callable,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Discover a function and add it to the registry and its indexes
+
+    Pass `metadata` (e.g. from the discovery cache) to skip introspection.
+    """
+    if metadata is None:
+        with STARTUP.phase("introspect"):
+            metadata = get_function_metadata(func)
+    
+    with STARTUP.phase("build_models"):
+        pydantic_model = create_pydantic_model_for_function(func_name, metadata)
+    
+    return _add_to_registry(func_name, FunctionInfo({
         **metadata,
+        'function': func,
         'request_model': pydantic_model
+    }))
+
+
+def register_lazy(func_name: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Add a function from metadata alone, deferring its import and model"""
+    info = FunctionInfo({k: v for k, v in metadata.items() if k != 'function'})
+    _add_to_registry(func_name, info)
+    _UNMATERIALIZED.setdefault(info['category'], []).append(func_name)
+    return info
+
+
+def materialize_category(category: str) -> None:
+    """Import a lazily registered category's module and build its request models"""
+    with _materialize_lock:
+        for func_name in _UNMATERIALIZED.pop(category, []):
+            info = DISCOVERED_FUNCTIONS[func_name]
+            info['function'] = FUNCTION_MAP[func_name]
+            info['request_model'] = create_pydantic_model_for_function(func_name, info)
+
+
+def discover_all(function_map) -> None:
+    """Register every enabled function, reusing cached metadata where valid
+
+    In lazy mode a function whose metadata is cached is registered without
+    importing its module; otherwise the module is imported and introspected.
+    """
+    with STARTUP.phase("load_cache"):
+        cache = DiscoveryCache.load()
+    
+    for func_name in function_map:
+        module_name = function_map.module_of(func_name)
+        category = module_name.split('.')[-1]
+        if ENABLED_CATEGORIES and category not in ENABLED_CATEGORIES:
+            continue
+        
+        metadata = cache.lookup(func_name, module_name)
+        if metadata is None or not LAZY_LOADING:
+            with STARTUP.phase("import_functions"):
+                func = function_map[func_name]
+        if metadata is None:
+            with STARTUP.phase("introspect"):
+                metadata = get_function_metadata(func)
+            cache.store(func_name, func, metadata)
+        
+        if LAZY_LOADING:
+            register_lazy(func_name, metadata)
+        else:
+            register_function(func_name, func, metadata)
+    
+    STARTUP.count("discovery_cache_hits", cache.hits)
+    STARTUP.count("discovery_cache_misses", cache.misses)
+    STARTUP.count("lazy_functions", sum(len(names) for names in _UNMATERIALIZED.values()))
+    with STARTUP.phase("save_cache"):
+        cache.save()
+
+
+discover_all(FUNCTION_MAP)
+
+
+def function_summary(name: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    """Public, JSON-serializable description of a discovered function"""
+    return {
+        'name': name,
+        'description': info['description'],
+        'category': info['category'],
+        'access': info['access'],
+        'parameters': {
+            k: {
+                'type': format_type_name(v['type']),
+                'required': v['required'],
+                'default': v['default']
+            }
+            for k, v in info['parameters'].items()
+        }
     }
 
 
+def request_schema(name: str) -> Dict[str, Any]:
+    """JSON schema of a function's request model (built once per function)"""
+    info = DISCOVERED_FUNCTIONS[name]
+    if 'request_schema' not in info:
+        info['request_schema'] = info['request_model'].model_json_schema()
+    return info['request_schema']
+
+
 def get_all_functions() -> List[Dict[str, Any]]:
     """Get list of all discovered functions"""
-    return [
-        {
-            'name': name,
-            'description': info['description'],
-            'category': info['category'],
-            'parameters': {
-                k: {
-                    'type': format_type_name(v['type']),
-                    'required': v['required'],
-                    'default': v['default']
-                }
-                for k, v in info['parameters'].items()
-            }
-        }
-        for name, info in DISCOVERED_FUNCTIONS.items()
-    ]
+    return [function_summary(name, info) for name, info in DISCOVERED_FUNCTIONS.items()]
 
 
 def get_function_by_name(name: str) -> Optional[Dict[str, Any]]:
@@ -155,19 +327,7 @@ def get_function_by_name(name: str) -> Optional[Dict[str, Any]]:
 def get_functions_by_category(category: str) -> List[Dict[str, Any]]:
     """Get all functions in a category"""
     return [
-        {
-            'name': name,
-            'description': info['description'],
-            'category': info['category'],
-            'parameters': {
-                k: {
-                    'type': format_type_name(v['type']),
-                    'required': v['required'],
-                    'default': v['default']
-                }
-                for k, v in info['parameters'].items()
-            }
-        }
+        function_summary(name, info)
         for name, info in DISCOVERED_FUNCTIONS.items()
         if info['category'] == category
     ]
@@ -178,27 +338,12 @@ def get_all_categories() -> List[str]:
     return sorted(set(info['category'] for info in DISCOVERED_FUNCTIONS.values()))
 
 
-def search_functions(query: str) -> List[Dict[str, Any]]:
-    """Search functions by name or description"""
-    query_lower = query.lower()
-    results = []
-    
-    for name, info in DISCOVERED_FUNCTIONS.items():
-        if (query_lower in name.lower() or 
-            query_lower in info['description'].lower()):
-            results.append({
-                'name': name,
-                'description': info['description'],
-                'category': info['category'],
-                'parameters': {
-                    k: {
-                        'type': format_type_name(v['type']),
-                        'required': v['required'],
-                        'default': v['default']
-                    }
-                    for k, v in info['parameters'].items()
-                }
-            })
-    
-    return results
+def search_functions(query: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Search functions by name, description, category or parameter names
 
+    Results are ranked by relevance, best first.
+    """
+    return [
+        function_summary(name, DISCOVERED_FUNCTIONS[name])
+        for name, _score in SEARCH_INDEX.search(query, category)
+    ]
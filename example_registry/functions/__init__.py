@@ -1,251 +1,148 @@
 """
 Function implementations for the registry.
 All functions are organized by service category.
-"""
-
-# Google Services
-from .google_services import (
-    google_sheets_append,
-    google_sheets_read,
-    google_groups_add_member,
-    google_groups_list_members,
-    gmail_send_email,
-    gmail_list_emails,
-    google_receive_membership_email
-)
-
-# Mailing List
-from .mailing_list import (
-    get_mailing_list,
-    add_to_mailing_list,
-    remove_from_mailing_list,
-    list_all_mailing_lists,
-    create_mailing_list
-)
-
-# Member Desk
-from .member_desk import (
-    member_desk_invite,
-    member_desk_list_invitations,
-    member_desk_accept_invitation,
-    member_desk_get_invitation_status
-)
-
-# Salesforce
-from .salesforce import (
-    salesforce_query,
-    salesforce_create
-)
-
-# Slack
-from .slack import (
-    slack_invite_to_channel,
-    slack_send_message,
-    slack_create_channel,
-    slack_list_channels,
-    slack_get_channel_info,
-    slack_remove_user_from_channel,
-    slack_list_messages,
-    slack_list_users,
-    slack_get_user_info
-)
-
-# GitHub
-from .github import (
-    github_create_branch,
-    github_commit_file,
-    github_create_pr,
-    github_list_branches,
-    github_list_prs,
-    github_get_file,
-    github_merge_pr
-)
-
-# Email (Mailchimp)
-from .email import (
-    mailchimp_add_subscriber,
-    mailchimp_remove_subscriber
-)
-
-# Storage
-from .storage import (
-    fetch_file,
-    upload_file
-)
-
-# Database
-from .database import (
-    postgres_query,
-    postgres_insert
-)
-
-# HTTP
-from .http import (
-    http_request,
-    send_webhook
-)
-
-# Notion
-from .notion import (
-    notion_create_page,
-    notion_query_database,
-    notion_update_page,
-    notion_create_database
-)
-
-# AWS
-from .aws import (
-    aws_s3_upload,
-    aws_s3_download,
-    aws_lambda_invoke,
-    aws_dynamodb_put,
-    aws_dynamodb_query
-)
-
-# Airtable
-from .airtable import (
-    airtable_create_record,
-    airtable_list_records,
-    airtable_update_record
-)
-
-# Web
-from .web import (
-    web_scrape_page,
-    web_screenshot,
-    web_fill_form
-)
 
-# Payment (Stripe)
-from .payment import (
-    stripe_create_charge,
-    stripe_create_customer
-)
-
-# Communication (Twilio)
-from .communication import (
-    twilio_send_sms,
-    twilio_make_call
-)
-
-# AI (OpenAI)
-from .ai import (
-    openai_chat_completion,
-    openai_embeddings
-)
-
-# Support (Zendesk)
-from .support import (
-    zendesk_create_ticket,
-    zendesk_update_ticket
-)
+Service modules are imported on first use: looking a function up in
+FUNCTION_MAP, or importing it by name (`from functions import
+slack_send_message`), loads only the module that defines it.
+"""
+import importlib
+from collections.abc import Mapping
 
 
-# Function mapping - maps function names to actual function objects
-FUNCTION_MAP = {
+# Function mapping - maps function names to the service module defining them
+FUNCTION_MODULES = {
     # Google Services
-    "google_sheets_append": google_sheets_append,
-    "google_sheets_read": google_sheets_read,
-    "google_groups_add_member": google_groups_add_member,
-    "google_groups_list_members": google_groups_list_members,
-    "gmail_send_email": gmail_send_email,
-    "gmail_list_emails": gmail_list_emails,
-    "google_receive_membership_email": google_receive_membership_email,
+    "google_sheets_append": "google_services",
+    "google_sheets_read": "google_services",
+    "google_groups_add_member": "google_services",
+    "google_groups_list_members": "google_services",
+    "gmail_send_email": "google_services",
+    "gmail_list_emails": "google_services",
+    "google_receive_membership_email": "google_services",
     
     # Salesforce
-    "salesforce_query": salesforce_query,
-    "salesforce_create": salesforce_create,
+    "salesforce_query": "salesforce",
+    "salesforce_create": "salesforce",
     
     # Mailing List
-    "get_mailing_list": get_mailing_list,
-    "add_to_mailing_list": add_to_mailing_list,
-    "remove_from_mailing_list": remove_from_mailing_list,
-    "list_all_mailing_lists": list_all_mailing_lists,
-    "create_mailing_list": create_mailing_list,
+    "get_mailing_list": "mailing_list",
+    "add_to_mailing_list": "mailing_list",
+    "remove_from_mailing_list": "mailing_list",
+    "list_all_mailing_lists": "mailing_list",
+    "create_mailing_list": "mailing_list",
     
     # Member Desk
-    "member_desk_invite": member_desk_invite,
-    "member_desk_list_invitations": member_desk_list_invitations,
-    "member_desk_accept_invitation": member_desk_accept_invitation,
-    "member_desk_get_invitation_status": member_desk_get_invitation_status,
+    "member_desk_invite": "member_desk",
+    "member_desk_list_invitations": "member_desk",
+    "member_desk_accept_invitation": "member_desk",
+    "member_desk_get_invitation_status": "member_desk",
     
     # Slack
-    "slack_invite_to_channel": slack_invite_to_channel,
-    "slack_send_message": slack_send_message,
-    "slack_create_channel": slack_create_channel,
-    "slack_list_channels": slack_list_channels,
-    "slack_get_channel_info": slack_get_channel_info,
-    "slack_remove_user_from_channel": slack_remove_user_from_channel,
-    "slack_list_messages": slack_list_messages,
-    "slack_list_users": slack_list_users,
-    "slack_get_user_info": slack_get_user_info,
+    "slack_invite_to_channel": "slack",
+    "slack_send_message": "slack",
+    "slack_create_channel": "slack",
+    "slack_list_channels": "slack",
+    "slack_get_channel_info": "slack",
+    "slack_remove_user_from_channel": "slack",
+    "slack_list_messages": "slack",
+    "slack_list_users": "slack",
+    "slack_get_user_info": "slack",
     
     # GitHub
-    "github_create_branch": github_create_branch,
-    "github_commit_file": github_commit_file,
-    "github_create_pr": github_create_pr,
-    "github_list_branches": github_list_branches,
-    "github_list_prs": github_list_prs,
-    "github_get_file": github_get_file,
-    "github_merge_pr": github_merge_pr,
+    "github_create_branch": "github",
+    "github_commit_file": "github",
+    "github_create_pr": "github",
+    "github_list_branches": "github",
+    "github_list_prs": "github",
+    "github_get_file": "github",
+    "github_merge_pr": "github",
     
     # Email
-    "mailchimp_add_subscriber": mailchimp_add_subscriber,
-    "mailchimp_remove_subscriber": mailchimp_remove_subscriber,
+    "mailchimp_add_subscriber": "email",
+    "mailchimp_remove_subscriber": "email",
     
     # Storage
-    "fetch_file": fetch_file,
-    "upload_file": upload_file,
+    "fetch_file": "storage",
+    "upload_file": "storage",
     
     # Database
-    "postgres_query": postgres_query,
-    "postgres_insert": postgres_insert,
+    "postgres_query": "database",
+    "postgres_insert": "database",
     
     # HTTP
-    "http_request": http_request,
-    "send_webhook": send_webhook,
+    "http_request": "http",
+    "send_webhook": "http",
     
     # Notion
-    "notion_create_page": notion_create_page,
-    "notion_query_database": notion_query_database,
-    "notion_update_page": notion_update_page,
-    "notion_create_database": notion_create_database,
+    "notion_create_page": "notion",
+    "notion_query_database": "notion",
+    "notion_update_page": "notion",
+    "notion_create_database": "notion",
     
     # AWS
-    "aws_s3_upload": aws_s3_upload,
-    "aws_s3_download": aws_s3_download,
-    "aws_lambda_invoke": aws_lambda_invoke,
-    "aws_dynamodb_put": aws_dynamodb_put,
-    "aws_dynamodb_query": aws_dynamodb_query,
+    "aws_s3_upload": "aws",
+    "aws_s3_download": "aws",
+    "aws_lambda_invoke": "aws",
+    "aws_dynamodb_put": "aws",
+    "aws_dynamodb_query": "aws",
     
     # Airtable
-    "airtable_create_record": airtable_create_record,
-    "airtable_list_records": airtable_list_records,
-    "airtable_update_record": airtable_update_record,
+    "airtable_create_record": "airtable",
+    "airtable_list_records": "airtable",
+    "airtable_update_record": "airtable",
     
     # Web
-    "web_scrape_page": web_scrape_page,
-    "web_screenshot": web_screenshot,
-    "web_fill_form": web_fill_form,
+    "web_scrape_page": "web",
+    "web_screenshot": "web",
+    "web_fill_form": "web",
     
     # Payment
-    "stripe_create_charge": stripe_create_charge,
-    "stripe_create_customer": stripe_create_customer,
+    "stripe_create_charge": "payment",
+    "stripe_create_customer": "payment",
     
     # Communication
-    "twilio_send_sms": twilio_send_sms,
-    "twilio_make_call": twilio_make_call,
+    "twilio_send_sms": "communication",
+    "twilio_make_call": "communication",
     
     # AI
-    "openai_chat_completion": openai_chat_completion,
-    "openai_embeddings": openai_embeddings,
+    "openai_chat_completion": "ai",
+    "openai_embeddings": "ai",
     
     # Support
-    "zendesk_create_ticket": zendesk_create_ticket,
-    "zendesk_update_ticket": zendesk_update_ticket,
+    "zendesk_create_ticket": "support",
+    "zendesk_update_ticket": "support",
 }
 
 
+class LazyFunctionMap(Mapping):
+    """Maps function names to function objects, importing modules on demand"""
+    
+    def __init__(self, modules):
+        self._modules = modules
+        self._loaded = {}
+    
+    def __getitem__(self, function_name):
+        func = self._loaded.get(function_name)
+        if func is None:
+            module = importlib.import_module(self.module_of(function_name))
+            func = self._loaded[function_name] = getattr(module, function_name)
+        return func
+    
+    def __iter__(self):
+        return iter(self._modules)
+    
+    def __len__(self):
+        return len(self._modules)
+    
+    def module_of(self, function_name):
+        """Fully qualified name of the module defining a function"""
+        return f"{__name__}.{self._modules[function_name]}"
+
+
+FUNCTION_MAP = LazyFunctionMap(FUNCTION_MODULES)
+
+
 def get_function(function_name: str):
     """
     Get a function by name
@@ -259,6 +156,13 @@ def get_function(function_name: str):
     return FUNCTION_MAP.get(function_name)
 
 
+def __getattr__(name):
+    # Lets `from functions import slack_send_message` import just that module
+    if name in FUNCTION_MODULES:
+        return FUNCTION_MAP[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     # Google Services
     "google_sheets_append",
@@ -363,6 +267,7 @@ __all__ = [
     
     # Utilities
     "FUNCTION_MAP",
+    "FUNCTION_MODULES",
     "get_function",
 ]
 
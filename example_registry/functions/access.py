@@ -0,0 +1,42 @@
+"""
+Read/write annotations for function implementations
+The registry caches results of read functions and invalidates them when a
+write in the same category succeeds. Functions without an annotation are
+classified by name (see function_discovery.function_access).
+
+Resource parameters narrow invalidation. A write to
+`github_commit_file(owner="a", repo="b", ...)` drops the cached reads for
+owner/repo a/b, plus any category-wide reads such as listings. It leaves the
+cached reads of other repositories alone.
+
+Identical concurrent calls are coalesced into one execution for reads, and
+for writes only when they opt in, since e.g. two identical slack_send_message
+calls are meant to send two messages.
+"""
+from typing import Callable
+
+
+ACCESS_ATTRIBUTE = "__registry_access__"
+
+
+def reads(*resource_params: str, coalesce: bool = True) -> Callable[[Callable], Callable]:
+    """Mark a function as read-only (its results may be cached)
+
+    Pass coalesce=False if identical concurrent calls must each execute.
+    """
+    def decorate(func: Callable) -> Callable:
+        setattr(func, ACCESS_ATTRIBUTE, ("read", resource_params, coalesce))
+        return func
+    return decorate
+
+
+def writes(*resource_params: str, coalesce: bool = False) -> Callable[[Callable], Callable]:
+    """Mark a function as changing state (never cached; invalidates reads)
+
+    Pass coalesce=True for idempotent writes, whose identical concurrent
+    calls can safely share one execution.
+    """
+    def decorate(func: Callable) -> Callable:
+        setattr(func, ACCESS_ATTRIBUTE, ("write", resource_params, coalesce))
+        return func
+    return decorate
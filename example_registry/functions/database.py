@@ -1,6 +1,8 @@
 """Database function implementations"""
+from .access import writes
 
 
+@writes()
 def postgres_query(query: str, params: dict = None) -> str:
     """Execute a PostgreSQL query"""
     return ""
@@ -1,10 +1,14 @@
 """GitHub function implementations"""
+import functools
 import json
 import hashlib
 import time
+from .access import reads, writes
+from .state import backend
 
-# In-memory mock of GitHub repositories
-_mock_repos = {
+# Mock GitHub repositories, kept in the configured state backend
+_repos = backend.mapping("github.repos")
+_repos.seed({
     "myorg/main-app": {
         "owner": "myorg",
         "name": "main-app",
@@ -19,10 +23,15 @@ _mock_repos = {
         "default_branch": "main",
         "description": "Documentation repository"
     }
-}
+})
 
-# Branches: {repo_full_name: {branch_name: {sha, ref, ...}}}
-_mock_branches = {
+# Branches and files are stored one per key, so reading or changing one
+# doesn't copy (or rewrite) the rest of the repository.
+# Branches: {"<repo_full_name>:<branch_name>": {name, commit, protected}}
+# Branch names: {repo_full_name: [branch_name, ...]}, in creation order
+_branches = backend.mapping("github.branch_data")
+_branch_names = backend.sequence("github.branch_names")
+_SEED_BRANCHES = {
     "myorg/main-app": {
         "main": {
             "name": "main",
@@ -58,9 +67,18 @@ _mock_branches = {
         }
     }
 }
+_branches.seed({
+    f"{repo_full_name}:{branch_name}": branch_data
+    for repo_full_name, branches in _SEED_BRANCHES.items()
+    for branch_name, branch_data in branches.items()
+})
+_branch_names.seed({repo_full_name: list(branches) for repo_full_name, branches in _SEED_BRANCHES.items()})
 
-# Files: {repo_full_name: {branch_name: {file_path: content}}}
-_mock_files = {
+# Files: {"<repo_full_name>:<branch_name>:<file_path>": content}
+# File paths: {"<repo_full_name>:<branch_name>": [file_path, ...]}
+_files = backend.mapping("github.file_contents")
+_file_paths = backend.sequence("github.file_paths")
+_SEED_FILES = {
     "myorg/main-app": {
         "main": {
             "README.md": "# Main App\nWelcome to the main application.",
@@ -78,9 +96,23 @@ _mock_files = {
         }
     }
 }
+_files.seed({
+    f"{repo_full_name}:{branch_name}:{path}": content
+    for repo_full_name, branches in _SEED_FILES.items()
+    for branch_name, files in branches.items()
+    for path, content in files.items()
+})
+_file_paths.seed({
+    f"{repo_full_name}:{branch_name}": list(files)
+    for repo_full_name, branches in _SEED_FILES.items()
+    for branch_name, files in branches.items()
+})
 
-# Pull Requests: {repo_full_name: [pr_objects]}
-_mock_prs = {
+# Pull Requests, one per key: {"<repo_full_name>#<number>": pr_object}
+# PR numbers: {repo_full_name: [number, ...]}, in creation order
+_prs = backend.mapping("github.pr_data")
+_pr_list = backend.sequence("github.pr_list")
+_SEED_PRS = {
     "myorg/main-app": [
         {
             "number": 1,
@@ -96,8 +128,24 @@ _mock_prs = {
     ],
     "myorg/docs": []
 }
+_prs.seed({
+    f"{repo_full_name}#{pr['number']}": pr
+    for repo_full_name, prs in _SEED_PRS.items()
+    for pr in prs
+})
+_pr_list.seed({repo_full_name: [pr["number"] for pr in prs] for repo_full_name, prs in _SEED_PRS.items()})
+
+_pr_numbers = backend.counter("github.pr_number", start=2)
 
-_pr_counter = 2
+# Index, so a branch is found by its head SHA without scanning a repo.
+# Seeded from the store above (which may hold recovered data), then kept
+# up to date by the functions that move branch heads.
+# Branch heads: {"<repo_full_name>@<sha>": branch_name}
+_branch_heads = backend.mapping("github.branch_heads")
+_branch_heads.seed({
+    f"{key.split(':', 1)[0]}@{branch_data['commit']['sha']}": branch_data["name"]
+    for key, branch_data in _branches.items()
+})
 
 
 def _generate_sha(content: str) -> str:
@@ -105,37 +153,71 @@ def _generate_sha(content: str) -> str:
     return hashlib.sha1(content.encode()).hexdigest()[:12]
 
 
-def github_create_branch(owner: str, repo: str, branch_name: str, base_sha: str) -> str:
+def _move_head(repo_full_name: str, branch: str, old_sha: str, new_sha: str) -> None:
+    """Point the branch-head index at a branch's new commit"""
+    old_key = f"{repo_full_name}@{old_sha}"
+    if _branch_heads.get(old_key) == branch:
+        _branch_heads.delete(old_key)
+    _branch_heads.set(f"{repo_full_name}@{new_sha}", branch)
+
+
+def _write_file(repo_full_name: str, branch: str, path: str, content: str) -> None:
+    """Store a file's content, listing the path under its branch if it is new"""
+    key = f"{repo_full_name}:{branch}:{path}"
+    if _files.add(key, content):
+        _file_paths.append(f"{repo_full_name}:{branch}", path)
+    else:
+        _files.set(key, content)
+
+
+def _repo_locked(func):
+    """Hold the repository's lock for the whole call
+
+    Branches, files and PRs live in separate stores; calls that change more
+    than one of them must not interleave with other writes to the same repo.
+    """
+    @functools.wraps(func)
+    def wrapper(owner: str, repo: str, *args, **kwargs):
+        with backend.lock(f"github:{owner}/{repo}"):
+            return func(owner, repo, *args, **kwargs)
+    return wrapper
+
+
+@writes("owner", "repo")
+@_repo_locked
+def github_create_branch(owner: str, repo: str, branch_name: str, base_sha: str) -> dict:
     """Create a new branch in a GitHub repository"""
     repo_full_name = f"{owner}/{repo}"
     
-    if repo_full_name not in _mock_repos:
-        return json.dumps({"ok": False, "error": "repository_not_found"})
+    repo_info = _repos.get(repo_full_name)
+    if repo_info is None:
+        return {"ok": False, "error": "repository_not_found"}
     
-    if repo_full_name not in _mock_branches:
-        _mock_branches[repo_full_name] = {}
-    
-    if branch_name in _mock_branches[repo_full_name]:
-        return json.dumps({"ok": False, "error": "branch_already_exists"})
+    if f"{repo_full_name}:{branch_name}" in _branches:
+        return {"ok": False, "error": "branch_already_exists"}
     
     # Find base branch by SHA or use default
-    base_branch = None
-    for branch_data in _mock_branches[repo_full_name].values():
-        if branch_data["commit"]["sha"] == base_sha:
-            base_branch = branch_data
-            break
-    
-    if not base_branch:
+    source_branch = _branch_heads.get(f"{repo_full_name}@{base_sha}")
+    base_branch = _branches.get(f"{repo_full_name}:{source_branch}") if source_branch is not None else None
+    if base_branch is None or base_branch["commit"]["sha"] != base_sha:
+        source_branch = None
         # Use main/master as default
-        default = _mock_repos[repo_full_name]["default_branch"]
-        if default in _mock_branches[repo_full_name]:
-            base_branch = _mock_branches[repo_full_name][default]
-        else:
-            return json.dumps({"ok": False, "error": "base_branch_not_found"})
+        base_branch = _branches.get(f"{repo_full_name}:{repo_info['default_branch']}")
+        if base_branch is None:
+            return {"ok": False, "error": "base_branch_not_found"}
+    
+    # Copy files from base branch, before the branch becomes visible
+    if source_branch is not None:
+        paths = _file_paths.items(f"{repo_full_name}:{source_branch}")
+        _files.set_many({
+            f"{repo_full_name}:{branch_name}:{path}": _files.get(f"{repo_full_name}:{source_branch}:{path}")
+            for path in paths
+        })
+        _file_paths.extend(f"{repo_full_name}:{branch_name}", paths)
     
     # Create new branch
     new_sha = _generate_sha(f"{branch_name}{time.time()}")
-    _mock_branches[repo_full_name][branch_name] = {
+    _branches.set(f"{repo_full_name}:{branch_name}", {
         "name": branch_name,
         "commit": {
             "sha": new_sha,
@@ -144,23 +226,11 @@ def github_create_branch(owner: str, repo: str, branch_name: str, base_sha: str)
             "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
         },
         "protected": False
-    }
+    })
+    _branch_names.append(repo_full_name, branch_name)
+    _branch_heads.set(f"{repo_full_name}@{new_sha}", branch_name)
     
-    # Copy files from base branch
-    if repo_full_name in _mock_files:
-        # Find source branch name
-        source_branch = None
-        for br_name, br_data in _mock_branches[repo_full_name].items():
-            if br_data["commit"]["sha"] == base_sha:
-                source_branch = br_name
-                break
-        
-        if source_branch and source_branch in _mock_files[repo_full_name]:
-            _mock_files[repo_full_name][branch_name] = _mock_files[repo_full_name][source_branch].copy()
-        else:
-            _mock_files[repo_full_name][branch_name] = {}
-    
-    return json.dumps({
+    return {
         "ok": True,
         "ref": f"refs/heads/{branch_name}",
         "sha": new_sha,
@@ -168,38 +238,40 @@ def github_create_branch(owner: str, repo: str, branch_name: str, base_sha: str)
             "sha": new_sha,
             "type": "commit"
         }
-    })
+    }
 
 
-def github_commit_file(owner: str, repo: str, path: str, content: str, message: str, branch: str) -> str:
+@writes("owner", "repo")
+@_repo_locked
+def github_commit_file(owner: str, repo: str, path: str, content: str, message: str, branch: str) -> dict:
     """Commit a file to a GitHub repository"""
     repo_full_name = f"{owner}/{repo}"
     
-    if repo_full_name not in _mock_repos:
-        return json.dumps({"ok": False, "error": "repository_not_found"})
+    if repo_full_name not in _repos:
+        return {"ok": False, "error": "repository_not_found"}
     
-    if repo_full_name not in _mock_branches or branch not in _mock_branches[repo_full_name]:
-        return json.dumps({"ok": False, "error": "branch_not_found"})
-    
-    # Initialize files storage if needed
-    if repo_full_name not in _mock_files:
-        _mock_files[repo_full_name] = {}
-    if branch not in _mock_files[repo_full_name]:
-        _mock_files[repo_full_name][branch] = {}
+    if f"{repo_full_name}:{branch}" not in _branches:
+        return {"ok": False, "error": "branch_not_found"}
     
     # Commit the file
-    _mock_files[repo_full_name][branch][path] = content
+    _write_file(repo_full_name, branch, path, content)
     
     # Update branch SHA
     new_sha = _generate_sha(f"{path}{content}{time.time()}")
-    _mock_branches[repo_full_name][branch]["commit"] = {
-        "sha": new_sha,
-        "message": message,
-        "author": {"name": "System", "email": "system@example.com"},
-        "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-    }
     
-    return json.dumps({
+    def update_head(branch_data):
+        old_sha = branch_data["commit"]["sha"]
+        branch_data["commit"] = {
+            "sha": new_sha,
+            "message": message,
+            "author": {"name": "System", "email": "system@example.com"},
+            "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        }
+        return old_sha
+    old_sha = _branches.mutate(f"{repo_full_name}:{branch}", update_head)
+    _move_head(repo_full_name, branch, old_sha, new_sha)
+    
+    return {
         "ok": True,
         "content": {
             "name": path.split("/")[-1],
@@ -212,30 +284,30 @@ def github_commit_file(owner: str, repo: str, path: str, content: str, message:
             "message": message,
             "author": {"name": "System", "email": "system@example.com"}
         }
-    })
+    }
 
 
-def github_create_pr(owner: str, repo: str, title: str, head: str, base: str, body: str) -> str:
+@writes("owner", "repo")
+def github_create_pr(owner: str, repo: str, title: str, head: str, base: str, body: str) -> dict:
     """Create a pull request in GitHub"""
-    global _pr_counter
-    
     repo_full_name = f"{owner}/{repo}"
     
-    if repo_full_name not in _mock_repos:
-        return json.dumps({"ok": False, "error": "repository_not_found"})
+    if repo_full_name not in _repos:
+        return {"ok": False, "error": "repository_not_found"}
     
-    if repo_full_name not in _mock_branches:
-        return json.dumps({"ok": False, "error": "no_branches_found"})
+    if not _branch_names.length(repo_full_name):
+        return {"ok": False, "error": "no_branches_found"}
     
-    if head not in _mock_branches[repo_full_name]:
-        return json.dumps({"ok": False, "error": "head_branch_not_found"})
+    head_branch = _branches.get(f"{repo_full_name}:{head}")
+    if head_branch is None:
+        return {"ok": False, "error": "head_branch_not_found"}
     
-    if base not in _mock_branches[repo_full_name]:
-        return json.dumps({"ok": False, "error": "base_branch_not_found"})
+    base_branch = _branches.get(f"{repo_full_name}:{base}")
+    if base_branch is None:
+        return {"ok": False, "error": "base_branch_not_found"}
     
     # Create PR
-    pr_number = _pr_counter
-    _pr_counter += 1
+    pr_number = _pr_numbers.next()
     
     pr = {
         "number": pr_number,
@@ -251,83 +323,80 @@ def github_create_pr(owner: str, repo: str, title: str, head: str, base: str, bo
         "merged": False
     }
     
-    if repo_full_name not in _mock_prs:
-        _mock_prs[repo_full_name] = []
-    
-    _mock_prs[repo_full_name].append(pr)
+    _prs.set(f"{repo_full_name}#{pr_number}", pr)
+    _pr_list.append(repo_full_name, pr_number)
     
-    return json.dumps({
+    return {
         "ok": True,
         "number": pr_number,
         "state": "open",
         "title": title,
         "html_url": f"https://github.com/{repo_full_name}/pull/{pr_number}",
         "user": {"login": "system"},
-        "head": {"ref": head, "sha": _mock_branches[repo_full_name][head]["commit"]["sha"]},
-        "base": {"ref": base, "sha": _mock_branches[repo_full_name][base]["commit"]["sha"]},
+        "head": {"ref": head, "sha": head_branch["commit"]["sha"]},
+        "base": {"ref": base, "sha": base_branch["commit"]["sha"]},
         "body": body,
         "created_at": pr["created_at"],
         "updated_at": pr["updated_at"]
-    })
+    }
 
 
-def github_list_branches(owner: str, repo: str) -> str:
+@reads("owner", "repo")
+def github_list_branches(owner: str, repo: str) -> dict:
     """List all branches in a GitHub repository"""
     repo_full_name = f"{owner}/{repo}"
     
-    if repo_full_name not in _mock_repos:
-        return json.dumps({"ok": False, "error": "repository_not_found"})
+    if repo_full_name not in _repos:
+        return {"ok": False, "error": "repository_not_found"}
     
     branches = []
-    if repo_full_name in _mock_branches:
-        for branch_name, branch_data in _mock_branches[repo_full_name].items():
-            branches.append({
-                "name": branch_name,
-                "commit": {
-                    "sha": branch_data["commit"]["sha"],
-                    "url": f"https://api.github.com/repos/{repo_full_name}/commits/{branch_data['commit']['sha']}"
-                },
-                "protected": branch_data.get("protected", False)
-            })
-    
-    return json.dumps({"ok": True, "branches": branches})
+    for branch_name in _branch_names.items(repo_full_name):
+        branch_data = _branches[f"{repo_full_name}:{branch_name}"]
+        branches.append({
+            "name": branch_name,
+            "commit": {
+                "sha": branch_data["commit"]["sha"],
+                "url": f"https://api.github.com/repos/{repo_full_name}/commits/{branch_data['commit']['sha']}"
+            },
+            "protected": branch_data.get("protected", False)
+        })
+    
+    return {"ok": True, "branches": branches}
 
 
-def github_list_prs(owner: str, repo: str, state: str = "open") -> str:
+@reads("owner", "repo")
+def github_list_prs(owner: str, repo: str, state: str = "open") -> dict:
     """List pull requests in a GitHub repository"""
     repo_full_name = f"{owner}/{repo}"
     
-    if repo_full_name not in _mock_repos:
-        return json.dumps({"ok": False, "error": "repository_not_found"})
+    if repo_full_name not in _repos:
+        return {"ok": False, "error": "repository_not_found"}
     
     prs = []
-    if repo_full_name in _mock_prs:
-        for pr in _mock_prs[repo_full_name]:
-            if state == "all" or pr["state"] == state:
-                prs.append(pr)
+    for pr_number in _pr_list.items(repo_full_name):
+        pr = _prs[f"{repo_full_name}#{pr_number}"]
+        if state == "all" or pr["state"] == state:
+            prs.append(pr)
     
-    return json.dumps({"ok": True, "pull_requests": prs, "total": len(prs)})
+    return {"ok": True, "pull_requests": prs, "total": len(prs)}
 
 
-def github_get_file(owner: str, repo: str, path: str, branch: str) -> str:
+@reads("owner", "repo")
+def github_get_file(owner: str, repo: str, path: str, branch: str) -> dict:
     """Get file content from a GitHub repository"""
     repo_full_name = f"{owner}/{repo}"
     
-    if repo_full_name not in _mock_repos:
-        return json.dumps({"ok": False, "error": "repository_not_found"})
-    
-    if repo_full_name not in _mock_branches or branch not in _mock_branches[repo_full_name]:
-        return json.dumps({"ok": False, "error": "branch_not_found"})
+    if repo_full_name not in _repos:
+        return {"ok": False, "error": "repository_not_found"}
     
-    if repo_full_name not in _mock_files or branch not in _mock_files[repo_full_name]:
-        return json.dumps({"ok": False, "error": "no_files_in_branch"})
+    if f"{repo_full_name}:{branch}" not in _branches:
+        return {"ok": False, "error": "branch_not_found"}
     
-    if path not in _mock_files[repo_full_name][branch]:
-        return json.dumps({"ok": False, "error": "file_not_found"})
+    content = _files.get(f"{repo_full_name}:{branch}:{path}")
+    if content is None:
+        return {"ok": False, "error": "file_not_found"}
     
-    content = _mock_files[repo_full_name][branch][path]
-    
-    return json.dumps({
+    return {
         "ok": True,
         "name": path.split("/")[-1],
         "path": path,
@@ -335,53 +404,55 @@ def github_get_file(owner: str, repo: str, path: str, branch: str) -> str:
         "size": len(content),
         "content": content,
         "encoding": "utf-8"
-    })
+    }
 
 
-def github_merge_pr(owner: str, repo: str, pr_number: int, commit_message: str = None) -> str:
+@writes("owner", "repo")
+@_repo_locked
+def github_merge_pr(owner: str, repo: str, pr_number: int, commit_message: str = None) -> dict:
     """Merge a pull request"""
     repo_full_name = f"{owner}/{repo}"
     
-    if repo_full_name not in _mock_repos:
-        return json.dumps({"ok": False, "error": "repository_not_found"})
+    if repo_full_name not in _repos:
+        return {"ok": False, "error": "repository_not_found"}
+    
+    # Mark the PR merged; only one concurrent merge can win
+    def merge(pr):
+        if pr["state"] != "open":
+            return "pull_request_not_open", None
+        pr["state"] = "closed"
+        pr["merged"] = True
+        pr["merged_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        return None, pr
+    
+    try:
+        error, pr = _prs.mutate(f"{repo_full_name}#{pr_number}", merge)
+    except KeyError:
+        return {"ok": False, "error": "pull_request_not_found"}
+    if error:
+        return {"ok": False, "error": error}
     
-    if repo_full_name not in _mock_prs:
-        return json.dumps({"ok": False, "error": "pull_request_not_found"})
-    
-    # Find the PR
-    pr = None
-    for p in _mock_prs[repo_full_name]:
-        if p["number"] == pr_number:
-            pr = p
-            break
+    # Copy files from head to base branch
+    head_branch = pr["head"]
+    base_branch = pr["base"]
     
-    if not pr:
-        return json.dumps({"ok": False, "error": "pull_request_not_found"})
+    if f"{repo_full_name}:{head_branch}" in _branches and f"{repo_full_name}:{base_branch}" in _branches:
+        for path in _file_paths.items(f"{repo_full_name}:{head_branch}"):
+            _write_file(repo_full_name, base_branch, path, _files.get(f"{repo_full_name}:{head_branch}:{path}"))
     
-    if pr["state"] != "open":
-        return json.dumps({"ok": False, "error": "pull_request_not_open"})
+        # Update base branch SHA
+        merge_sha = _generate_sha(f"merge-{pr_number}-{time.time()}")
     
-    # Merge the PR (update state)
-    pr["state"] = "closed"
-    pr["merged"] = True
-    pr["merged_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        def update_base(branch_data):
+            old_sha = branch_data["commit"]["sha"]
+            branch_data["commit"]["sha"] = merge_sha
+            return old_sha
+        old_sha = _branches.mutate(f"{repo_full_name}:{base_branch}", update_base)
+        _move_head(repo_full_name, base_branch, old_sha, merge_sha)
     
-    # Copy files from head to base branch
-    if repo_full_name in _mock_files:
-        head_branch = pr["head"]
-        base_branch = pr["base"]
-        
-        if head_branch in _mock_files[repo_full_name] and base_branch in _mock_files[repo_full_name]:
-            # Merge files
-            _mock_files[repo_full_name][base_branch].update(_mock_files[repo_full_name][head_branch])
-            
-            # Update base branch SHA
-            merge_sha = _generate_sha(f"merge-{pr_number}-{time.time()}")
-            _mock_branches[repo_full_name][base_branch]["commit"]["sha"] = merge_sha
-    
-    return json.dumps({
+    return {
         "ok": True,
         "merged": True,
         "message": "Pull request successfully merged",
         "sha": _generate_sha(f"merge-{pr_number}")
-    })
+    }
@@ -1,6 +1,8 @@
 """Google Services function implementations"""
-import json
 import random
+from .access import reads, writes
+from .records import Email
+from .state import backend
 
 def google_receive_membership_email() -> str:
     """Receive a membership email from Google"""
@@ -15,44 +17,31 @@ def google_receive_membership_email() -> str:
     return email_content
 
 
-# In-memory mock of Google Sheets
-# Structure: {sheet_id: {range: [[row1], [row2], ...]}}
-_mock_sheets = {}
+# Mock Google Sheets, kept in the configured state backend; each range is
+# its own append-only list, so an append stores (and logs) only the new rows
+# Structure: {"<sheet_id>!<range>": [[row1], [row2], ...]}
+_sheets = backend.sequence("google.sheet_rows")
 
+@writes("sheet_id")
 def google_sheets_append(sheet_id: str, range: str, values: list) -> str:
     """Append rows to a Google Sheet"""
-    # Initialize sheet if it doesn't exist
-    if sheet_id not in _mock_sheets:
-        _mock_sheets[sheet_id] = {}
-    
-    # Initialize range if it doesn't exist
-    if range not in _mock_sheets[sheet_id]:
-        _mock_sheets[sheet_id][range] = []
-    
-    # Append the values
-    _mock_sheets[sheet_id][range].extend(values)
+    # Initializes the range (and the sheet) if it doesn't exist
+    _sheets.extend(f"{sheet_id}!{range}", values)
     
     return f"Appended {len(values)} rows to {sheet_id}!{range}"
 
 
-def google_sheets_read(sheet_id: str, range: str) -> str:
+@reads("sheet_id")
+def google_sheets_read(sheet_id: str, range: str) -> list:
     """Read data from a Google Sheet"""
-    # Return empty if sheet doesn't exist
-    if sheet_id not in _mock_sheets:
-        return "[]"
-    
-    # Return empty if range doesn't exist
-    if range not in _mock_sheets[sheet_id]:
-        return "[]"
-    
-    # Return the data as JSON string
-    import json
-    return json.dumps(_mock_sheets[sheet_id][range])
+    # Empty if the sheet or range doesn't exist; rows are returned as stored
+    return _sheets.items(f"{sheet_id}!{range}")
 
 
-# In-memory mock of Google Groups
+# Mock Google Groups, kept in the configured state backend
 # Structure: {group_id: {member_email: role}}
-_mock_groups = {
+_groups = backend.mapping("google.groups")
+_groups.seed({
     "group_user1": {
         "admin1@example.com": "admin",
         "member2@example.com": "member",
@@ -63,50 +52,51 @@ _mock_groups = {
         "member5@example.com": "member",
         "member6@example.com": "member"
     }
-}
+})
 
-def google_groups_list_members(group_id: str) -> str:
+def google_groups_list_members(group_id: str) -> dict:
     """List all members of a Google Group"""
-    return json.dumps(_mock_groups[group_id])
+    return dict(_groups[group_id])
 
 def google_groups_add_member(group_id: str, member_email: str, role: str) -> str:
     """Add a new member to a Google Group"""
-    _mock_groups[group_id][member_email] = role
+    _groups.set_field(group_id, member_email, role)
     return f"Added {member_email} to {group_id} as {role}"
 
-# In-memory mock of Gmail emails
-# Structure: [{to: str, subject: str, body: str, cc: list, attachments: list}]
-_mock_emails = [
-    {
-        "from": "admin1@example.com",
-        "to": "member2@example.com",
-        "subject": "Test email",
-        "body": "This is a test email",
-        "cc": [],
-        "attachments": []
-    },
-    {
-        "from": "admin2@example.com",
-        "to": "member3@example.com",
-        "subject": "Test email",
-        "body": "This is a test email",
-        "cc": [],
-        "attachments": []
-    }
-]
+# Mock Gmail mailbox, kept in the configured state backend
+# Structure: [Email(to, subject, body, cc, attachments)]
+_emails = backend.sequence("gmail.emails")
+_emails.seed({"mailbox": [
+    Email(
+        sender="admin1@example.com",
+        to="member2@example.com",
+        subject="Test email",
+        body="This is a test email",
+        cc=[],
+        attachments=[]
+    ),
+    Email(
+        sender="admin2@example.com",
+        to="member3@example.com",
+        subject="Test email",
+        body="This is a test email",
+        cc=[],
+        attachments=[]
+    )
+]})
 
 def gmail_send_email(to: str, subject: str, body: str, cc: list = None, attachments: list = None) -> str:
     """Send an email via Gmail API"""
-    _mock_emails.append({
-        "to": to,
-        "subject": subject,
-        "body": body,
-        "cc": cc or [],
-        "attachments": attachments
-    })
+    _emails.append("mailbox", Email(
+        to=to,
+        subject=subject,
+        body=body,
+        cc=cc or [],
+        attachments=attachments
+    ))
     cc_info = f" (CC: {', '.join(cc)})" if cc else ""
     return f"Sent email to {to}{cc_info} with subject '{subject}'"
 
-def gmail_list_emails() -> str:
+def gmail_list_emails() -> list:
     """List all emails"""
-    return json.dumps(_mock_emails)
\ No newline at end of file
+    return [email.to_dict() for email in _emails.items("mailbox")]
\ No newline at end of file
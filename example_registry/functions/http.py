@@ -1,12 +1,12 @@
 """HTTP and notification function implementations"""
 
 
-def http_request(url: str, method: str, headers: dict = None, body: str = None, params: dict = None) -> str:
+async def http_request(url: str, method: str, headers: dict = None, body: str = None, params: dict = None) -> str:
     """Make a generic HTTP request (use when no specific function exists)"""
     return ""
 
 
-def send_webhook(url: str, payload: dict, headers: dict = None) -> str:
+async def send_webhook(url: str, payload: dict, headers: dict = None) -> str:
     """Send a webhook notification"""
     return ""
 
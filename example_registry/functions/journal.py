@@ -0,0 +1,291 @@
+"""
+Durability for the memory state backend: snapshots plus a write-ahead log
+
+With REGISTRY_STATE_DIR set, every change made through a memory store is
+appended to a write-ahead log (WAL) before the call returns, and the whole
+state is written out as a binary snapshot from time to time. On startup the
+newest snapshot is loaded and only the WAL written after it is replayed, so
+recovery time depends on the snapshot size and the snapshot interval, not
+on the history of the service.
+
+Files in the state directory, numbered by generation:
+
+- snapshot-<gen>.bin: the state when generation <gen> began
+- wal-<gen>.log: changes made during generation <gen>
+
+A snapshot starts a new generation: the WAL is rotated first, then each
+store is pickled under its own lock. A store may already include changes
+that are also in the new WAL, so every record is idempotent (a full value, a
+deletion, a set member added or removed, a dict field set, sequence items
+tagged with their position, a counter high-water mark). Once the snapshot is on disk, older files are removed.
+
+WAL records are framed as <length, crc32, pickle>. A torn record at the end
+of the log (a crash mid-write) is dropped and truncated away on recovery.
+
+REGISTRY_STATE_FSYNC sets when the log is forced to disk:
+
+- always: fsync after every record; nothing acknowledged is lost
+- interval (default): fsync every REGISTRY_STATE_FSYNC_INTERVAL seconds;
+  a power loss can lose that much, a process crash loses nothing
+- never: leave it to the OS
+"""
+import glob
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+STATE_DIR = os.environ.get("REGISTRY_STATE_DIR", "")
+FSYNC_POLICY = os.environ.get("REGISTRY_STATE_FSYNC", "interval")
+FSYNC_INTERVAL = float(os.environ.get("REGISTRY_STATE_FSYNC_INTERVAL", "1.0"))
+SNAPSHOT_INTERVAL = float(os.environ.get("REGISTRY_STATE_SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_WAL_BYTES = int(os.environ.get("REGISTRY_STATE_SNAPSHOT_WAL_BYTES", str(64 * 1024 * 1024)))
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+SNAPSHOT_MAGIC = b"RGSNAP01"
+_FRAME = struct.Struct("<II")
+_SNAPSHOT_HEADER = struct.Struct("<8sIQ")
+
+
+def _dump(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _generation(path: str) -> int:
+    return int(os.path.basename(path).split("-")[1].split(".")[0])
+
+
+def read_records(path: str) -> Tuple[List[Any], int]:
+    """Records in a WAL file, and the offset where the valid log ends"""
+    records = []
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(pickle.loads(payload))
+        offset = start + length
+    return records, offset
+
+
+class Journal:
+    """Snapshot and WAL files of one state directory"""
+
+    def __init__(
+        self,
+        directory: str,
+        fsync: str = "interval",
+        fsync_interval: float = 1.0,
+        snapshot_interval: float = 300.0,
+        snapshot_wal_bytes: int = 64 * 1024 * 1024
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown REGISTRY_STATE_FSYNC '{fsync}' (expected always, interval or never)")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_wal_bytes = snapshot_wal_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._file = None
+        self._generation = 0
+        self._wal_bytes = 0
+        self._wal_records = 0
+        self._dirty = False
+        self._closed = threading.Event()
+        self._snapshot_due = threading.Event()
+        self._collect: Optional[Callable[[], Dict[str, Any]]] = None
+        self.stats: Dict[str, Any] = {"snapshots": 0, "last_snapshot_seconds": None}
+
+    def _path(self, kind: str, generation: int) -> str:
+        ext = "bin" if kind == "snapshot" else "log"
+        return os.path.join(self.directory, f"{kind}-{generation:08d}.{ext}")
+
+    # Recovery
+
+    def _load_snapshot(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """The newest readable snapshot; a damaged one falls back to an older one"""
+        for path in sorted(glob.glob(os.path.join(self.directory, "snapshot-*.bin")), reverse=True):
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < _SNAPSHOT_HEADER.size:
+                continue
+            magic, crc, length = _SNAPSHOT_HEADER.unpack_from(data)
+            payload = data[_SNAPSHOT_HEADER.size:]
+            if magic != SNAPSHOT_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+                continue
+            return _generation(path), pickle.loads(payload)
+        return 0, None
+
+    def recover(self) -> Tuple[Optional[Dict[str, Any]], Iterator[Any]]:
+        """Load the newest snapshot and return it with the WAL records after it
+
+        The records are yielded lazily; consume them before calling `start`.
+        """
+        started = time.perf_counter()
+        generation, snapshot = self._load_snapshot()
+        wals = sorted(
+            path for path in glob.glob(os.path.join(self.directory, "wal-*.log"))
+            if _generation(path) >= generation
+        )
+        self._generation = max([generation] + [_generation(path) for path in wals])
+        self.stats.update(
+            recovered_generation=generation,
+            recovered_from_snapshot=snapshot is not None,
+            replayed_records=0
+        )
+
+        def replay() -> Iterator[Any]:
+            for path in wals:
+                records, valid = read_records(path)
+                size = os.path.getsize(path)
+                if valid < size:
+                    # Drop the torn tail so new records follow valid ones
+                    with open(path, "r+b") as f:
+                        f.truncate(valid)
+                    self.stats["truncated_bytes"] = self.stats.get("truncated_bytes", 0) + size - valid
+                self.stats["replayed_records"] += len(records)
+                yield from records
+            self.stats["recovery_seconds"] = round(time.perf_counter() - started, 4)
+
+        return snapshot, replay()
+
+    # Writing
+
+    def start(self, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Open the current WAL for appends and start the background threads
+
+        `collect` returns the state to snapshot; it is called without the
+        journal lock held, so writers keep going while it runs.
+        """
+        self._collect = collect
+        path = self._path("wal", self._generation)
+        self._file = open(path, "ab", buffering=0)
+        self._wal_bytes = self._file.tell()
+        self._wal_records = self.stats.get("replayed_records", 0)
+        if self._wal_bytes >= self.snapshot_wal_bytes:
+            self._snapshot_due.set()
+        threading.Thread(target=self._snapshot_loop, name="state-snapshot", daemon=True).start()
+        if self.fsync == "interval":
+            threading.Thread(target=self._fsync_loop, name="state-fsync", daemon=True).start()
+
+    def append(self, record: Any) -> None:
+        """Log one change; callers hold the lock of the store they changed"""
+        payload = _dump(record)
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(frame)
+            self._wal_bytes += len(frame)
+            self._wal_records += 1
+            if self.fsync == "always":
+                os.fsync(self._file.fileno())
+            else:
+                self._dirty = True
+            if self._wal_bytes >= self.snapshot_wal_bytes:
+                self._snapshot_due.set()
+
+    def _fsync_loop(self) -> None:
+        while not self._closed.wait(self.fsync_interval):
+            self.sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._dirty and self._file is not None:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    def _snapshot_loop(self) -> None:
+        while not self._closed.is_set():
+            self._snapshot_due.wait(self.snapshot_interval)
+            self._snapshot_due.clear()
+            if self._closed.is_set():
+                return
+            if self._wal_records:
+                self.snapshot()
+
+    def snapshot(self) -> int:
+        """Write a snapshot, start a new WAL generation and drop older files"""
+        with self._snapshot_lock:
+            started = time.perf_counter()
+            with self._lock:
+                if self._file is None:
+                    return self._generation
+                old = self._file
+                if self.fsync != "never":
+                    os.fsync(old.fileno())
+                self._generation += 1
+                generation = self._generation
+                self._file = open(self._path("wal", generation), "ab", buffering=0)
+                self._wal_bytes = self._wal_records = 0
+                self._dirty = False
+            old.close()
+
+            payload = _dump(self._collect())
+            path = self._path("snapshot", generation)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, zlib.crc32(payload), len(payload)))
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            _fsync_dir(self.directory)
+
+            for stale in glob.glob(os.path.join(self.directory, "snapshot-*.bin")) + \
+                    glob.glob(os.path.join(self.directory, "wal-*.log")):
+                if _generation(stale) < generation:
+                    os.remove(stale)
+
+            self.stats["snapshots"] += 1
+            self.stats["last_snapshot_seconds"] = round(time.perf_counter() - started, 4)
+            self.stats["last_snapshot_bytes"] = len(payload)
+            return generation
+
+    def close(self) -> None:
+        """Flush the WAL to disk and stop the background threads"""
+        self._closed.set()
+        self._snapshot_due.set()
+        with self._lock:
+            if self._file is not None:
+                if self.fsync != "never":
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "fsync": self.fsync,
+            "generation": self._generation,
+            "wal_bytes": self._wal_bytes,
+            "wal_records": self._wal_records,
+            **self.stats
+        }
+
+
+def journal_from_env() -> Optional[Journal]:
+    if not STATE_DIR:
+        return None
+    return Journal(STATE_DIR, FSYNC_POLICY, FSYNC_INTERVAL, SNAPSHOT_INTERVAL, SNAPSHOT_WAL_BYTES)
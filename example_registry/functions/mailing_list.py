@@ -1,72 +1,77 @@
 """Mailing list management functions"""
-import json
+from typing import Union
+from .access import reads, writes
+from .state import backend
 
-# In-memory mock of multiple mailing lists
+# Mock mailing lists, kept in the configured state backend
 # Structure: {list_name: set of emails}
-_mailing_lists = {
+_mailing_lists = backend.mapping("mailing_lists")
+_mailing_lists.seed({
     "member": set(),
     "toc": set(),
     "marketing": set(),
     "chinese_member": set(),
     "end_user": set(),
-}
+})
 
-def get_mailing_list(list_name: str) -> str:
+@reads("list_name")
+def get_mailing_list(list_name: str) -> dict:
     """Get the members of a specific mailing list"""
-    if list_name not in _mailing_lists:
-        return json.dumps({"ok": False, "error": f"Mailing list '{list_name}' not found"})
+    members = _mailing_lists.get(list_name)
+    if members is None:
+        return {"ok": False, "error": f"Mailing list '{list_name}' not found"}
     
-    return json.dumps({
+    return {
         "ok": True,
         "list_name": list_name,
-        "members": list(_mailing_lists[list_name])
-    })
+        "members": list(members)
+    }
 
+@writes("list_name", coalesce=True)
 def add_to_mailing_list(list_name: str, email: str) -> str:
     """Add an email to a specific mailing list (idempotent)"""
-    if list_name not in _mailing_lists:
-        # Create new list if it doesn't exist
-        _mailing_lists[list_name] = set()
-    
-    already_exists = email in _mailing_lists[list_name]
-    _mailing_lists[list_name].add(email)
+    # Creates the list if it doesn't exist
+    already_exists = not _mailing_lists.insert(list_name, email, default=set())
     
     if already_exists:
         return f"Email {email} was already in '{list_name}' mailing list"
     else:
         return f"Added {email} to '{list_name}' mailing list"
 
-def remove_from_mailing_list(list_name: str, email: str) -> str:
+@writes("list_name")
+def remove_from_mailing_list(list_name: str, email: str) -> Union[dict, str]:
     """Remove an email from a specific mailing list"""
-    if list_name not in _mailing_lists:
-        return json.dumps({"ok": False, "error": f"Mailing list '{list_name}' not found"})
-    
-    _mailing_lists[list_name].discard(email)
+    try:
+        _mailing_lists.discard(list_name, email)
+    except KeyError:
+        return {"ok": False, "error": f"Mailing list '{list_name}' not found"}
     return f"Removed {email} from '{list_name}' mailing list"
 
-def list_all_mailing_lists() -> str:
+@reads()
+def list_all_mailing_lists() -> dict:
     """List all available mailing lists and their member counts"""
+    # Counted in the store: the member sets themselves are not copied
     lists_info = [
         {
             "name": list_name,
-            "member_count": len(members)
+            "member_count": _mailing_lists.length(list_name)
         }
-        for list_name, members in _mailing_lists.items()
+        for list_name in _mailing_lists.keys()
     ]
     
-    return json.dumps({
+    return {
         "ok": True,
         "mailing_lists": lists_info,
         "total": len(_mailing_lists)
-    })
+    }
 
-def create_mailing_list(list_name: str) -> str:
+@writes("list_name")
+def create_mailing_list(list_name: str) -> dict:
     """Create a new mailing list"""
-    if list_name in _mailing_lists:
-        return json.dumps({"ok": False, "error": f"Mailing list '{list_name}' already exists"})
+    if not _mailing_lists.add(list_name, set()):
+        return {"ok": False, "error": f"Mailing list '{list_name}' already exists"}
     
-    _mailing_lists[list_name] = set()
-    return json.dumps({
+    return {
         "ok": True,
         "message": f"Created mailing list '{list_name}'"
-    })
+    }
@@ -1,12 +1,13 @@
 """Member Desk invitation and management functions"""
-import json
 import time
+from .records import Invitation
+from .state import backend
 
-# In-memory mock of Member Desk invitations
-# Structure: [{email, name, role, invited_at, status}]
-_member_desk_invitations = []
+# Mock Member Desk invitations, kept in the configured state backend
+# Structure: {email: Invitation}, in invitation order
+_invitations = backend.mapping("member_desk.invitations")
 
-def member_desk_invite(email: str, name: str, role: str) -> str:
+def member_desk_invite(email: str, name: str, role: str) -> dict:
     """Invite a contact to CNCF Member Desk
     
     Args:
@@ -14,72 +15,71 @@ def member_desk_invite(email: str, name: str, role: str) -> str:
         name: Contact's full name
         role: Contact's role (Primary, Technical, Marketing)
     """
-    # Check if already invited
-    for invitation in _member_desk_invitations:
-        if invitation["email"] == email:
-            return json.dumps({
-                "ok": True,
-                "already_invited": True,
-                "message": f"{email} was already invited to Member Desk on {invitation['invited_at']}"
-            })
+    invitation = Invitation(
+        email=email,
+        name=name,
+        role=role,
+        invited_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        status="pending",
+        invitation_link=f"https://memberdesk.cncf.io/invite/{hash(email) % 1000000}"
+    )
     
-    # Create invitation
-    invitation = {
-        "email": email,
-        "name": name,
-        "role": role,
-        "invited_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-        "status": "pending",
-        "invitation_link": f"https://memberdesk.cncf.io/invite/{hash(email) % 1000000}"
-    }
-    
-    _member_desk_invitations.append(invitation)
+    # Create the invitation unless the contact was already invited
+    if not _invitations.add(email, invitation):
+        return {
+            "ok": True,
+            "already_invited": True,
+            "message": f"{email} was already invited to Member Desk on {_invitations[email].invited_at}"
+        }
     
-    return json.dumps({
+    return {
         "ok": True,
         "invited": True,
         "email": email,
         "name": name,
         "role": role,
-        "invitation_link": invitation["invitation_link"],
+        "invitation_link": invitation.invitation_link,
         "message": f"Invited {name} ({email}) as {role} contact to Member Desk"
-    })
+    }
 
-def member_desk_list_invitations() -> str:
+def member_desk_list_invitations() -> dict:
     """List all Member Desk invitations"""
-    return json.dumps({
+    return {
         "ok": True,
-        "invitations": _member_desk_invitations,
-        "total": len(_member_desk_invitations)
-    })
+        "invitations": [invitation.to_dict() for invitation in _invitations.values()],
+        "total": len(_invitations)
+    }
 
-def member_desk_accept_invitation(email: str) -> str:
+def member_desk_accept_invitation(email: str) -> dict:
     """Mark a Member Desk invitation as accepted (for testing)"""
-    for invitation in _member_desk_invitations:
-        if invitation["email"] == email:
-            invitation["status"] = "accepted"
-            invitation["accepted_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-            return json.dumps({
-                "ok": True,
-                "message": f"Invitation for {email} marked as accepted"
-            })
+    def accept(invitation):
+        invitation.status = "accepted"
+        invitation.accepted_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    
+    try:
+        _invitations.mutate(email, accept)
+    except KeyError:
+        return {
+            "ok": False,
+            "error": "Invitation not found"
+        }
     
-    return json.dumps({
-        "ok": False,
-        "error": "Invitation not found"
-    })
+    return {
+        "ok": True,
+        "message": f"Invitation for {email} marked as accepted"
+    }
 
-def member_desk_get_invitation_status(email: str) -> str:
+def member_desk_get_invitation_status(email: str) -> dict:
     """Get the status of a Member Desk invitation"""
-    for invitation in _member_desk_invitations:
-        if invitation["email"] == email:
-            return json.dumps({
-                "ok": True,
-                "invitation": invitation
-            })
+    invitation = _invitations.get(email)
+    if invitation is None:
+        return {
+            "ok": False,
+            "error": "Invitation not found"
+        }
     
-    return json.dumps({
-        "ok": False,
-        "error": "Invitation not found"
-    })
+    return {
+        "ok": True,
+        "invitation": invitation.to_dict()
+    }
 
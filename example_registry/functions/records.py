@@ -0,0 +1,214 @@
+"""
+Compact records for the large stores of the service mocks
+
+Messages, invitations, Salesforce records and emails can reach millions of
+entries. As plain dicts each one carries its own hash table. These classes
+keep the fields in `__slots__` instead, and share one copy of the strings
+that repeat across records (statuses, roles, user ids, field names).
+
+Records are internal: function implementations return `to_dict()`, which is
+the same dict the API has always returned. They pickle as a short class
+code and their field values, without field names, for the SQLite backend
+and the journal; repeated strings are interned again when they are loaded.
+"""
+import copyreg
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class Record:
+    """A fixed set of fields, stored in __slots__
+
+    Subclasses take their fields in __init__ (in slot order) and intern the
+    ones whose values repeat; assign such fields only shared strings (e.g.
+    literals) afterwards. OPTIONAL fields are left out of `to_dict()` while
+    they are None, the way the dicts these records replace only had such
+    keys once set. LISTS are stored as tuples and returned as lists. KEYS
+    renames fields whose dict key is not an identifier.
+    """
+
+    __slots__ = ()
+    OPTIONAL: Tuple[str, ...] = ()
+    LISTS: Tuple[str, ...] = ()
+    KEYS: Dict[str, str] = {}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Record":
+        fields = {key: field for field, key in cls.KEYS.items()}
+        return cls(**{fields.get(key, key): value for key, value in data.items()})
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is None and name in self.OPTIONAL:
+                continue
+            if name in self.LISTS and value is not None:
+                value = list(value)
+            result[self.KEYS.get(name, name)] = value
+        return result
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self.__reduce__() == other.__reduce__()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class SlackMessage(Record):
+    __slots__ = ("ts", "user", "text", "blocks")
+    OPTIONAL = ("blocks",)
+
+    def __init__(self, ts: str, user: str, text: str, blocks: Optional[dict] = None):
+        self.ts = ts
+        self.user = _intern(user)
+        self.text = text
+        self.blocks = blocks
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Written out: messages are listed far more often than other records
+        message = {"ts": self.ts, "user": self.user, "text": self.text}
+        if self.blocks is not None:
+            message["blocks"] = self.blocks
+        return message
+
+
+class Invitation(Record):
+    __slots__ = ("email", "name", "role", "invited_at", "status", "invitation_link", "accepted_at")
+    OPTIONAL = ("accepted_at",)
+
+    def __init__(self, email: str, name: str, role: str, invited_at: str, status: str,
+                 invitation_link: str, accepted_at: Optional[str] = None):
+        self.email = email
+        self.name = name
+        self.role = _intern(role)
+        self.invited_at = invited_at
+        self.status = _intern(status)
+        self.invitation_link = invitation_link
+        self.accepted_at = accepted_at
+
+
+class Email(Record):
+    __slots__ = ("sender", "to", "subject", "body", "cc", "attachments")
+    OPTIONAL = ("sender",)
+    LISTS = ("cc", "attachments")
+    KEYS = {"sender": "from"}
+
+    def __init__(self, sender: Optional[str] = None, to: str = "", subject: str = "", body: str = "",
+                 cc: Iterable[str] = (), attachments: Optional[Iterable[Any]] = None):
+        self.sender = _intern(sender)
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.cc = tuple(cc)
+        self.attachments = tuple(attachments) if attachments is not None else None
+
+
+# Field sets whose schema is shared. Field names come from clients, so past
+# this many distinct sets a record gets a schema of its own, which goes away
+# with it, instead of growing the shared cache without bound
+MAX_SHARED_SCHEMAS = 1024
+
+
+class _Schema:
+    """Field names shared by every Salesforce record with those fields"""
+
+    __slots__ = ("names", "positions")
+
+    def __init__(self, names: Tuple[str, ...], shared: bool = True):
+        self.names = tuple(sys.intern(name) for name in names) if shared else tuple(names)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+
+class SalesforceRecord:
+    """A Salesforce record: a tuple of field values and a shared schema
+
+    Objects have open-ended fields, so there is no fixed class per object
+    type. Records created with the same fields, in the same order, share one
+    schema and hold only their values, for up to MAX_SHARED_SCHEMAS field
+    sets. Any other record carries its own schema, at about the cost of a
+    dict.
+    """
+
+    __slots__ = ("_schema", "_values")
+
+    # Picklist-like fields whose values repeat across records
+    INTERNED_FIELDS = frozenset({
+        "Status", "Industry", "StageName", "Type", "Rating", "LeadSource", "AccountId", "OwnerId"
+    })
+
+    _schemas: Dict[Tuple[str, ...], _Schema] = {}
+
+    def __init__(self, fields: Mapping[str, Any]):
+        self._set(tuple(fields), fields.values())
+
+    def _set(self, names: Tuple[str, ...], values: Iterable[Any]) -> None:
+        schema = self._schemas.get(names)
+        if schema is None:
+            if len(self._schemas) < MAX_SHARED_SCHEMAS:
+                schema = self._schemas.setdefault(names, _Schema(names))
+            else:
+                schema = _Schema(names, shared=False)
+        self._schema = schema
+        self._values = tuple(
+            _intern(value) if name in self.INTERNED_FIELDS else value
+            for name, value in zip(schema.names, values)
+        )
+
+    def get(self, field: str, default: Any = None) -> Any:
+        position = self._schema.positions.get(field)
+        return default if position is None else self._values[position]
+
+    def __getitem__(self, field: str) -> Any:
+        return self._values[self._schema.positions[field]]
+
+    @staticmethod
+    def where(records: Iterable["SalesforceRecord"], field: str, value: str) -> List["SalesforceRecord"]:
+        """Records whose `field`, as a string, equals `value` (a missing field reads as "")
+
+        Looks the field's position up once per schema rather than per record.
+        """
+        matched = []
+        schema = position = None
+        for record in records:
+            if record._schema is not schema:
+                schema = record._schema
+                position = schema.positions.get(field)
+            if str(record._values[position] if position is not None else "") == value:
+                matched.append(record)
+        return matched
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._schema.names)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._schema.names, self._values))
+
+    def __reduce__(self):
+        return _load_salesforce_record, (self._schema.names, self._values)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is SalesforceRecord and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"SalesforceRecord({self.to_dict()!r})"
+
+
+def _load_salesforce_record(names: Tuple[str, ...], values: Tuple[Any, ...]) -> SalesforceRecord:
+    record = SalesforceRecord.__new__(SalesforceRecord)
+    record._set(names, values)
+    return record
+
+
+# Pickle the record classes as two-byte extension codes (the private-use
+# range, 240-255) instead of spelling out their module and name in every
+# SQLite row and journal record
+for _code, _obj in enumerate((SlackMessage, Invitation, Email, _load_salesforce_record), start=240):
+    copyreg.add_extension(__name__, _obj.__name__, _code)
@@ -1,9 +1,11 @@
 """Salesforce function implementations"""
-import json
+from .records import SalesforceRecord
+from .state import backend
 
-# In-memory mock of Salesforce objects
-# Structure: {object_type: [{id: str, ...fields}]}
-_mock_salesforce = {
+# Mock Salesforce objects, kept in the configured state backend
+# Structure: one sequence of SalesforceRecord({Id: str, ...fields}) per object_type
+_records = backend.sequence("salesforce.records")
+_records.seed({object_type: [SalesforceRecord(fields) for fields in records] for object_type, records in {
     "Account": [
         {"Id": "001xx000003DGb0AAG", "Name": "Acme Corporation", "Industry": "Technology", "AnnualRevenue": 5000000},
         {"Id": "001xx000003DGb1AAG", "Name": "Global Industries", "Industry": "Manufacturing", "AnnualRevenue": 12000000},
@@ -22,11 +24,21 @@ _mock_salesforce = {
         {"Id": "00Qxx000001aBcDEAM", "FirstName": "Alice", "LastName": "Williams", "Company": "New Startup", "Email": "alice@newstartup.com", "Status": "Open"},
         {"Id": "00Qxx000001aBcEEAM", "FirstName": "Charlie", "LastName": "Brown", "Company": "Another Co", "Email": "charlie@another.com", "Status": "Contacted"},
     ]
-}
+}.items()})
 
-_id_counter = 1000
+_record_ids = backend.counter("salesforce.record_id", start=1001)
 
-def salesforce_query(query: str) -> str:
+# Index, so a WHERE Id = ... query doesn't scan the object's records.
+# Structure: {"<object_type>/<Id>": SalesforceRecord}, seeded from the
+# records above (which may hold recovered data)
+_records_by_id = backend.mapping("salesforce.records_by_id")
+_records_by_id.seed({
+    f"{object_type}/{record['Id']}": record
+    for object_type in _records.keys()
+    for record in _records.items(object_type)
+})
+
+def salesforce_query(query: str) -> dict:
     """Execute a SOQL query in Salesforce
     
     Supports basic SOQL syntax:
@@ -38,26 +50,26 @@ def salesforce_query(query: str) -> str:
     
     # Simple SOQL parser (very basic)
     if "FROM" not in query.upper():
-        return json.dumps({"error": "Invalid SOQL query"})
+        return {"error": "Invalid SOQL query"}
     
     # Extract object type
     parts = query.upper().split("FROM")
     if len(parts) < 2:
-        return json.dumps({"error": "Invalid SOQL query"})
+        return {"error": "Invalid SOQL query"}
     
     object_part = parts[1].strip().split()[0]
     
     # Find the actual object type (case-insensitive)
     object_type = None
-    for obj in _mock_salesforce.keys():
+    for obj in _records.keys():
         if obj.upper() == object_part.upper():
             object_type = obj
             break
     
-    if not object_type or object_type not in _mock_salesforce:
-        return json.dumps({"error": f"Object type '{object_part}' not found"})
+    if not object_type:
+        return {"error": f"Object type '{object_part}' not found"}
     
-    records = _mock_salesforce[object_type].copy()
+    records = None
     
     # Handle WHERE clause (very basic)
     if "WHERE" in query.upper():
@@ -68,34 +80,46 @@ def salesforce_query(query: str) -> str:
             field = field.strip()
             value = value.strip().strip("'\"")
             
-            records = [r for r in records if str(r.get(field, "")) == value]
+            if field == "Id":
+                # Every record is indexed before it is stored, so a miss means no record
+                indexed = _records_by_id.get(f"{object_type}/{value}")
+                records = [indexed] if indexed is not None else []
+            else:
+                records = SalesforceRecord.where(_records.items(object_type), field, value)
+    
+    if records is None:
+        records = _records.items(object_type)
     
-    return json.dumps({
+    return {
         "totalSize": len(records),
         "done": True,
-        "records": records
-    })
+        "records": [record.to_dict() for record in records]
+    }
 
 
-def salesforce_create(object_type: str, data: dict) -> str:
+def salesforce_create(object_type: str, data: dict) -> dict:
     """Create a new record in Salesforce"""
-    global _id_counter
-    
-    # Initialize object type if it doesn't exist
-    if object_type not in _mock_salesforce:
-        _mock_salesforce[object_type] = []
-    
     # Generate a new ID
-    _id_counter += 1
-    record_id = f"{_id_counter:015d}AAA"
+    record_id = f"{_record_ids.next():015d}AAA"
     
-    # Create the record
-    record = {"Id": record_id, **data}
-    _mock_salesforce[object_type].append(record)
+    # Create the record (and the object type, if it doesn't exist). Ids are
+    # unique per object type: data naming an Id already in use is rejected
+    record = SalesforceRecord({"Id": record_id, **data})
+    if not _records_by_id.add(f"{object_type}/{record['Id']}", record):
+        return {
+            "id": None,
+            "success": False,
+            "errors": [{
+                "statusCode": "DUPLICATE_VALUE",
+                "message": f"duplicate value found: Id duplicates value on record with id: {record['Id']}",
+                "fields": ["Id"]
+            }]
+        }
+    _records.append(object_type, record)
     
-    return json.dumps({
+    return {
         "id": record_id,
         "success": True,
         "errors": []
-    })
+    }
 
@@ -1,18 +1,22 @@
 """Slack function implementations"""
-import json
 import time
-
-# In-memory mock of Slack workspaces
-# Users
-_mock_users = {
+from .access import reads, writes
+from .records import SlackMessage
+from .state import backend
+
+# Mock Slack workspace, kept in the configured state backend
+# Users: {user_id: user}
+_users = backend.mapping("slack.users")
+_users.seed({
     "U001": {"id": "U001", "name": "alice", "real_name": "Alice Johnson", "email": "alice@company.com", "is_admin": True},
     "U002": {"id": "U002", "name": "bob", "real_name": "Bob Smith", "email": "bob@company.com", "is_admin": False},
     "U003": {"id": "U003", "name": "charlie", "real_name": "Charlie Brown", "email": "charlie@company.com", "is_admin": False},
     "U004": {"id": "U004", "name": "diana", "real_name": "Diana Prince", "email": "diana@company.com", "is_admin": False},
-}
+})
 
-# Channels
-_mock_channels = {
+# Channels: {channel_id: channel}
+_channels = backend.mapping("slack.channels")
+_channels.seed({
     "C001": {
         "id": "C001",
         "name": "general",
@@ -37,38 +41,46 @@ _mock_channels = {
         "members": ["U001"],
         "created": 1609632000
     }
-}
+})
+
+# Channel names: {name: channel_id}, so a name can only be claimed once
+_channel_names = backend.mapping("slack.channel_names")
+_channel_names.seed({"general": "C001", "engineering": "C002", "leadership": "C003"})
 
-# Messages
-_mock_messages = {
+# Messages: one sequence of SlackMessage records per channel_id
+_messages = backend.sequence("slack.messages")
+_messages.seed({
     "C001": [
-        {"ts": "1609459201.000100", "user": "U001", "text": "Welcome to the team!"},
-        {"ts": "1609459202.000200", "user": "U002", "text": "Thanks! Happy to be here."},
+        SlackMessage(ts="1609459201.000100", user="U001", text="Welcome to the team!"),
+        SlackMessage(ts="1609459202.000200", user="U002", text="Thanks! Happy to be here."),
     ],
     "C002": [
-        {"ts": "1609545601.000100", "user": "U001", "text": "Let's discuss the new feature."},
-        {"ts": "1609545602.000200", "user": "U003", "text": "I have some ideas about the API design."},
+        SlackMessage(ts="1609545601.000100", user="U001", text="Let's discuss the new feature."),
+        SlackMessage(ts="1609545602.000200", user="U003", text="I have some ideas about the API design."),
     ],
     "C003": []
-}
+})
+
+_channel_ids = backend.counter("slack.channel_id", start=4)
 
-_channel_counter = 4
-_user_counter = 5
 
+def _channel_snapshot(channel: dict) -> dict:
+    """Copy of a channel that later invites/removals won't mutate"""
+    return {**channel, "members": list(channel["members"])}
 
-def slack_create_channel(name: str, is_private: bool) -> str:
+
+@writes()
+def slack_create_channel(name: str, is_private: bool) -> dict:
     """Create a new Slack channel"""
-    global _channel_counter
-    
-    # Check if channel name already exists
-    for channel in _mock_channels.values():
-        if channel["name"] == name:
-            return json.dumps({"ok": False, "error": "name_taken"})
-    
-    channel_id = f"C{_channel_counter:03d}"
-    _channel_counter += 1
-    
-    _mock_channels[channel_id] = {
+    # Check the name before allocating an ID, under the name's lock, so a
+    # rejected duplicate doesn't use up a channel ID
+    with backend.lock(f"slack:channel-name:{name}"):
+        if name in _channel_names:
+            return {"ok": False, "error": "name_taken"}
+        channel_id = f"C{_channel_ids.next():03d}"
+        _channel_names.set(name, channel_id)
+    
+    channel = {
         "id": channel_id,
         "name": name,
         "is_private": is_private,
@@ -76,15 +88,17 @@ def slack_create_channel(name: str, is_private: bool) -> str:
         "members": [],
         "created": int(time.time())
     }
-    _mock_messages[channel_id] = []
+    _channels.set(channel_id, channel)
+    _messages.extend(channel_id, [])
     
-    return json.dumps({
+    return {
         "ok": True,
-        "channel": _mock_channels[channel_id]
-    })
+        "channel": _channel_snapshot(channel)
+    }
 
 
-def slack_list_channels() -> str:
+@reads()
+def slack_list_channels() -> dict:
     """List all Slack channels"""
     channels = [
         {
@@ -93,116 +107,137 @@ def slack_list_channels() -> str:
             "is_private": ch["is_private"],
             "num_members": len(ch["members"])
         }
-        for ch in _mock_channels.values()
+        for ch in _channels.values()
     ]
-    return json.dumps({"ok": True, "channels": channels})
+    return {"ok": True, "channels": channels}
 
 
-def slack_get_channel_info(channel_id: str) -> str:
+@reads("channel_id")
+def slack_get_channel_info(channel_id: str) -> dict:
     """Get detailed information about a Slack channel"""
-    if channel_id not in _mock_channels:
-        return json.dumps({"ok": False, "error": "channel_not_found"})
+    channel = _channels.get(channel_id)
+    if channel is None:
+        return {"ok": False, "error": "channel_not_found"}
     
-    return json.dumps({
+    return {
         "ok": True,
-        "channel": _mock_channels[channel_id]
-    })
+        "channel": _channel_snapshot(channel)
+    }
 
 
-def slack_invite_to_channel(channel_id: str, user_ids: list) -> str:
+@writes("channel_id")
+def slack_invite_to_channel(channel_id: str, user_ids: list) -> dict:
     """Invite users to a Slack channel"""
-    if channel_id not in _mock_channels:
-        return json.dumps({"ok": False, "error": "channel_not_found"})
-    
-    channel = _mock_channels[channel_id]
     invited = []
     already_in = []
-    not_found = []
-    
-    for user_id in user_ids:
-        if user_id not in _mock_users:
-            not_found.append(user_id)
-        elif user_id in channel["members"]:
-            already_in.append(user_id)
-        else:
-            channel["members"].append(user_id)
-            invited.append(user_id)
-    
-    return json.dumps({
+    not_found = [user_id for user_id in user_ids if user_id not in _users]
+    
+    def invite(channel):
+        for user_id in user_ids:
+            if user_id in not_found:
+                continue
+            if user_id in channel["members"]:
+                already_in.append(user_id)
+            else:
+                channel["members"].append(user_id)
+                invited.append(user_id)
+    
+    try:
+        _channels.mutate(channel_id, invite)
+    except KeyError:
+        return {"ok": False, "error": "channel_not_found"}
+    
+    return {
         "ok": True,
         "invited": invited,
         "already_in_channel": already_in,
         "not_found": not_found
-    })
+    }
 
 
-def slack_remove_user_from_channel(channel_id: str, user_id: str) -> str:
+@writes("channel_id")
+def slack_remove_user_from_channel(channel_id: str, user_id: str) -> dict:
     """Remove a user from a Slack channel"""
-    if channel_id not in _mock_channels:
-        return json.dumps({"ok": False, "error": "channel_not_found"})
-    
-    channel = _mock_channels[channel_id]
-    if user_id in channel["members"]:
+    def remove(channel):
+        if user_id not in channel["members"]:
+            return False
         channel["members"].remove(user_id)
-        return json.dumps({"ok": True})
+        return True
+    
+    try:
+        removed = _channels.mutate(channel_id, remove)
+    except KeyError:
+        return {"ok": False, "error": "channel_not_found"}
+    
+    if removed:
+        return {"ok": True}
     else:
-        return json.dumps({"ok": False, "error": "not_in_channel"})
+        return {"ok": False, "error": "not_in_channel"}
 
 
-def slack_send_message(channel_id: str, text: str, blocks: dict = None) -> str:
+@writes("channel_id")
+def slack_send_message(channel_id: str, text: str, blocks: dict = None) -> dict:
     """Send a message to a Slack channel"""
-    if channel_id not in _mock_channels:
-        return json.dumps({"ok": False, "error": "channel_not_found"})
+    if channel_id not in _channels:
+        return {"ok": False, "error": "channel_not_found"}
     
     timestamp = f"{time.time():.6f}"
-    message = {
-        "ts": timestamp,
-        "user": "U001",  # Default to first user
-        "text": text
-    }
+    message = SlackMessage(
+        ts=timestamp,
+        user="U001",  # Default to first user
+        text=text,
+        blocks=blocks or None
+    )
     
-    if blocks:
-        message["blocks"] = blocks
+    _messages.append(channel_id, message)
     
-    _mock_messages[channel_id].append(message)
-    
-    return json.dumps({
+    return {
         "ok": True,
         "channel": channel_id,
         "ts": timestamp,
-        "message": message
-    })
+        "message": message.to_dict()
+    }
 
 
-def slack_list_messages(channel_id: str, limit: int = 10) -> str:
+@reads("channel_id")
+def slack_list_messages(channel_id: str, limit: int = 10) -> dict:
     """List recent messages in a Slack channel"""
-    if channel_id not in _mock_channels:
-        return json.dumps({"ok": False, "error": "channel_not_found"})
+    if channel_id not in _channels:
+        return {"ok": False, "error": "channel_not_found"}
+    
+    # Rejected rather than answered: slicing the whole list by a limit of 0
+    # returned every message, while a tail of 0 messages is empty
+    if limit < 1:
+        return {"ok": False, "error": "invalid_limit"}
     
-    messages = _mock_messages[channel_id][-limit:]
+    # One extra message tells whether there are more, without counting them all
+    messages = _messages.tail(channel_id, limit + 1)
     
-    return json.dumps({
+    return {
         "ok": True,
-        "messages": messages,
-        "has_more": len(_mock_messages[channel_id]) > limit
-    })
+        "messages": [message.to_dict() for message in messages[-limit:]],
+        "has_more": len(messages) > limit
+    }
 
 
-def slack_list_users() -> str:
+@reads()
+def slack_list_users() -> dict:
     """List all users in the Slack workspace"""
-    users = list(_mock_users.values())
-    return json.dumps({
+    users = _users.values()
+    return {
         "ok": True,
         "members": users
-    })
+    }
 
 
-def slack_get_user_info(user_id: str) -> str:
+@reads()
+def slack_get_user_info(user_id: str) -> dict:
     """Get detailed information about a Slack user"""
-    if user_id not in _mock_users:
-        return json.dumps({"ok": False, "error": "user_not_found"})
+    user = _users.get(user_id)
+    if user is None:
+        return {"ok": False, "error": "user_not_found"}
     
-    return json.dumps({
+    return {
         "ok": True,
-        "user": _mock_users[user_id]
-    })
+        "user": user
+    }
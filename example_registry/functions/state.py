@@ -0,0 +1,880 @@
+"""
+State backends for the service mocks
+Every function module keeps its data in stores obtained from `backend`
+instead of in module globals, so the data can be shared by several uvicorn
+workers. Select the backend with REGISTRY_STATE_BACKEND:
+
+- memory (default): plain dicts in this process; each worker has its own data.
+  Set REGISTRY_STATE_DIR to keep it across restarts with snapshots and a
+  write-ahead log (see functions/journal.py)
+- sqlite: a SQLite file in WAL mode (REGISTRY_STATE_PATH, default
+  registry_state.db) shared by every worker that opens it
+- shm: the same SQLite store, kept on the /dev/shm tmpfs. Workers on one box
+  share it at memory speed, and it is gone after a reboot
+
+Three kinds of store are available:
+
+- mapping: key -> value, with an atomic read-modify-write (`mutate`) and an
+  atomic insert-if-absent (`add`)
+- sequence: append-only lists, one per key (messages, records, emails)
+- counter: an atomic ID allocator
+
+Values must be picklable. A value returned by `get` or `items` is a snapshot:
+change stored data only through `set`, `add` or `mutate`, never by mutating a
+value you read.
+
+Every store call is atomic on its own, and stores lock per key (striped over
+REGISTRY_STATE_LOCK_STRIPES locks), so calls on different channels, repos or
+lists don't wait for each other. A change spanning several stores holds
+`backend.lock(resource)` for the resource it belongs to.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: resource locks only cover this process
+    fcntl = None
+
+from . import records  # Registers the record pickle codes before any state is loaded
+from .journal import Journal, journal_from_env
+
+
+STATE_BACKEND = os.environ.get("REGISTRY_STATE_BACKEND", "memory")
+STATE_PATH = os.environ.get("REGISTRY_STATE_PATH", "")
+LOCK_STRIPES = int(os.environ.get("REGISTRY_STATE_LOCK_STRIPES", "64"))
+
+SHM_DIR = "/dev/shm"
+
+MISSING = object()
+
+
+class StripedLock:
+    """A fixed set of locks shared out by key
+
+    A key always maps to the same lock, so operations on one key are
+    serialized while different keys rarely contend, without keeping a lock
+    per key.
+    """
+
+    def __init__(self, stripes: int = LOCK_STRIPES):
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+
+    def index(self, key: str) -> int:
+        # crc32 rather than hash(): stable across processes
+        return zlib.crc32(key.encode()) % len(self._locks)
+
+    def __call__(self, key: str) -> threading.RLock:
+        return self._locks[self.index(key)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @contextmanager
+    def all(self) -> Iterator[None]:
+        """Hold every stripe, for whole-store operations"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+
+class MappingStore(ABC):
+    """Key -> value store"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        ...
+
+    def set_many(self, entries: Mapping[str, Any]) -> None:
+        """Store several entries; each is atomic on its own, not the batch"""
+        for key, value in entries.items():
+            self.set(key, value)
+
+    @abstractmethod
+    def add(self, key: str, value: Any) -> bool:
+        """Store `value` only if `key` is absent; return whether it was stored"""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def mutate(self, key: str, fn: Callable[[Any], Any], default: Any = MISSING) -> Any:
+        """Atomically apply `fn` to the value of `key` and store the result
+
+        `fn` changes the value in place and returns what the caller needs
+        back. A missing key starts from `default`, or raises KeyError when
+        no default is given.
+        """
+
+    def insert(self, key: str, member: Any, default: Any = MISSING) -> bool:
+        """Add `member` to the set stored at `key`; return whether it was new
+
+        A missing key starts from `default` (or raises KeyError), as in `mutate`.
+        """
+        def insert(members):
+            is_new = member not in members
+            members.add(member)
+            return is_new
+        return self.mutate(key, insert, default)
+
+    def discard(self, key: str, member: Any) -> bool:
+        """Remove `member` from the set stored at `key`; return whether it was there"""
+        def discard(members):
+            was_member = member in members
+            members.discard(member)
+            return was_member
+        return self.mutate(key, discard)
+
+    def set_field(self, key: str, field: str, value: Any, default: Any = MISSING) -> None:
+        """Set one field of the dict stored at `key`"""
+        def set_field(fields):
+            fields[field] = value
+        self.mutate(key, set_field, default)
+
+    @abstractmethod
+    def items(self) -> List[Tuple[str, Any]]:
+        """All entries, in insertion order"""
+
+    def keys(self) -> List[str]:
+        return [key for key, _ in self.items()]
+
+    def values(self) -> List[Any]:
+        return [value for _, value in self.items()]
+
+    def length(self, key: str) -> int:
+        """len() of the value of `key` (0 when absent), e.g. a set's member count"""
+        return len(self.get(key, ()))
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def seed(self, initial: Mapping[str, Any]) -> None:
+        """Load the initial data, once per backend (not once per worker)"""
+
+
+class SequenceStore(ABC):
+    """Append-only lists, one per key"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def extend(self, key: str, items: Iterable[Any]) -> None:
+        ...
+
+    def append(self, key: str, item: Any) -> None:
+        self.extend(key, [item])
+
+    @abstractmethod
+    def items(self, key: str) -> List[Any]:
+        ...
+
+    @abstractmethod
+    def tail(self, key: str, count: int) -> List[Any]:
+        """The last `count` items, oldest first"""
+
+    @abstractmethod
+    def length(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        """Keys that have had items or been seeded, in creation order"""
+
+    @abstractmethod
+    def seed(self, initial: Mapping[str, List[Any]]) -> None:
+        """Load the initial data, once per backend (not once per worker)"""
+
+
+class Counter(ABC):
+    """Atomic ID allocator"""
+
+    def __init__(self, name: str, start: int):
+        self.name = name
+        self.start = start
+
+    @abstractmethod
+    def next(self) -> int:
+        """Allocate the next value; the first call returns `start`"""
+
+
+class StateBackend(ABC):
+    """Factory for the stores of one state location"""
+
+    kind = ""
+
+    def __init__(self):
+        self._stores: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._resource_locks = StripedLock()
+
+    def recover(self) -> None:
+        """Load persisted state, if the backend keeps any in this process
+
+        Runs at most once: explicitly at startup, so its cost is reported on
+        its own, or else before the first store is opened.
+        """
+
+    def _get_or_create(self, name: str, create: Callable[[], Any]) -> Any:
+        self.recover()
+        with self._lock:
+            store = self._stores.get(name)
+            if store is None:
+                store = self._stores[name] = create()
+            return store
+
+    def mapping(self, name: str) -> MappingStore:
+        return self._get_or_create(name, lambda: self._mapping(name))
+
+    def sequence(self, name: str) -> SequenceStore:
+        return self._get_or_create(name, lambda: self._sequence(name))
+
+    def counter(self, name: str, start: int = 1) -> Counter:
+        return self._get_or_create(name, lambda: self._counter(name, start))
+
+    @abstractmethod
+    def _mapping(self, name: str) -> MappingStore:
+        ...
+
+    @abstractmethod
+    def _sequence(self, name: str) -> SequenceStore:
+        ...
+
+    @abstractmethod
+    def _counter(self, name: str, start: int) -> Counter:
+        ...
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.kind, "stores": sorted(self._stores)}
+
+    def lock(self, resource: str) -> ContextManager:
+        """Exclusive lock on a named resource, e.g. "github:myorg/main-app"
+
+        Hold it around a change that spans several stores so that it applies
+        as one; each store call on its own is already atomic.
+        """
+        return self._resource_locks(resource)
+
+    def close(self) -> None:
+        """Flush anything buffered before the process exits"""
+
+
+def _dump(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# Values that can be handed out without copying (a SalesforceRecord's
+# values are a tuple, fixed once the record is built)
+_IMMUTABLE = (str, int, float, bool, bytes, type(None), records.SalesforceRecord)
+
+
+def _copy(value: Any) -> Any:
+    """A private deep copy of a stored value (a pickle round trip beats copy.deepcopy)"""
+    if isinstance(value, _IMMUTABLE):
+        return value
+    return pickle.loads(_dump(value))
+
+
+# In-process backend
+
+class MemoryMapping(MappingStore):
+    """Dict-backed store, locked per key
+
+    Writers lock only the stripe of the key they change, so calls for
+    different channels, repos or lists run in parallel. Values are changed in
+    place by `mutate`, so readers get a copy taken under the key's lock
+    rather than the live value.
+    """
+
+    def __init__(self, name: str, journal: Optional[Journal] = None, state: Optional[list] = None):
+        super().__init__(name)
+        self._seeded, self._data = state or (False, {})
+        self._locks = StripedLock()
+        self._journal = journal
+
+    def _log(self, *record: Any) -> None:
+        if self._journal is not None:
+            self._journal.append(record)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._locks(key):
+            value = self._data.get(key, MISSING)
+            return default if value is MISSING else _copy(value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def set(self, key: str, value: Any) -> None:
+        with self._locks(key):
+            self._data[key] = value
+            self._log("set", self.name, key, value)
+
+    def add(self, key: str, value: Any) -> bool:
+        with self._locks(key):
+            if key in self._data:
+                return False
+            self._data[key] = value
+            self._log("set", self.name, key, value)
+            return True
+
+    def delete(self, key: str) -> bool:
+        with self._locks(key):
+            if self._data.pop(key, MISSING) is MISSING:
+                return False
+            self._log("delete", self.name, key)
+            return True
+
+    def mutate(self, key: str, fn: Callable[[Any], Any], default: Any = MISSING) -> Any:
+        with self._locks(key):
+            value = self._data.get(key, MISSING)
+            if value is MISSING:
+                if default is MISSING:
+                    raise KeyError(key)
+                value = default
+            result = fn(value)
+            self._data[key] = value
+            self._log("set", self.name, key, value)
+            return result
+
+    # Set and dict changes are logged as the change alone, not the whole
+    # value: a member added to a large list is a small WAL record
+
+    def _change(self, key: str, default: Any, change: Callable[[Any], Optional[tuple]]) -> Optional[tuple]:
+        """Apply `change` to the value of `key` and log the delta it returns
+
+        A value just created from `default` is logged whole instead, since
+        replay can't know the default.
+        """
+        with self._locks(key):
+            value = self._data.get(key, MISSING)
+            created = value is MISSING
+            if created:
+                if default is MISSING:
+                    raise KeyError(key)
+                value = self._data[key] = default
+            delta = change(value)
+            if created:
+                self._log("set", self.name, key, value)
+            elif delta is not None:
+                self._log(delta[0], self.name, key, *delta[1:])
+            return delta
+
+    def insert(self, key: str, member: Any, default: Any = MISSING) -> bool:
+        def insert(members):
+            if member not in members:
+                members.add(member)
+                return ("insert", member)
+        return self._change(key, default, insert) is not None
+
+    def discard(self, key: str, member: Any) -> bool:
+        def discard(members):
+            if member in members:
+                members.discard(member)
+                return ("discard", member)
+        return self._change(key, MISSING, discard) is not None
+
+    def set_field(self, key: str, field: str, value: Any, default: Any = MISSING) -> None:
+        def set_field(fields):
+            fields[field] = value
+            return ("set_field", field, value)
+        self._change(key, default, set_field)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        # Copying the dict is atomic; each value is then copied under its key's lock
+        entries = []
+        for key in list(self._data):
+            with self._locks(key):
+                value = self._data.get(key, MISSING)
+                if value is not MISSING:
+                    entries.append((key, _copy(value)))
+        return entries
+
+    def keys(self) -> List[str]:
+        return list(self._data)
+
+    def length(self, key: str) -> int:
+        # Measured in place: no copy of a value that may be large
+        with self._locks(key):
+            return len(self._data.get(key, ()))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def seed(self, initial: Mapping[str, Any]) -> None:
+        with self._locks.all():
+            if not self._seeded:
+                self._data.update(initial)
+                self._seeded = True
+                self._log("seed", self.name, dict(initial))
+
+    def dump(self) -> bytes:
+        with self._locks.all():
+            return _dump((self._seeded, self._data))
+
+
+class MemorySequence(SequenceStore):
+    """Lists locked per key; stored items are never changed, so reads don't lock"""
+
+    def __init__(self, name: str, journal: Optional[Journal] = None, state: Optional[list] = None):
+        super().__init__(name)
+        self._seeded, self._data = state or (False, {})
+        self._locks = StripedLock()
+        self._journal = journal
+
+    def extend(self, key: str, items: Iterable[Any]) -> None:
+        with self._locks(key):
+            data = self._data.setdefault(key, [])
+            position = len(data)
+            data.extend(items)
+            if self._journal is not None:
+                self._journal.append(("extend", self.name, key, position, data[position:]))
+
+    def items(self, key: str) -> List[Any]:
+        return list(self._data.get(key, ()))
+
+    def tail(self, key: str, count: int) -> List[Any]:
+        return self._data.get(key, [])[-count:] if count > 0 else []
+
+    def length(self, key: str) -> int:
+        return len(self._data.get(key, ()))
+
+    def keys(self) -> List[str]:
+        return list(self._data)
+
+    def seed(self, initial: Mapping[str, List[Any]]) -> None:
+        with self._locks.all():
+            if not self._seeded:
+                for key, items in initial.items():
+                    self._data.setdefault(key, []).extend(items)
+                self._seeded = True
+                if self._journal is not None:
+                    self._journal.append(("seed_sequence", self.name, {k: list(v) for k, v in initial.items()}))
+
+    def dump(self) -> bytes:
+        with self._locks.all():
+            return _dump((self._seeded, self._data))
+
+
+class MemoryCounter(Counter):
+    def __init__(self, name: str, start: int, journal: Optional[Journal] = None, state: Optional[int] = None):
+        super().__init__(name, start)
+        self._next = max(start, state or start)
+        self._lock = threading.Lock()
+        self._journal = journal
+
+    def next(self) -> int:
+        with self._lock:
+            value = self._next
+            self._next += 1
+            if self._journal is not None:
+                self._journal.append(("counter", self.name, self._next))
+            return value
+
+    def dump(self) -> int:
+        with self._lock:
+            return self._next
+
+
+def _replay(state: Dict[str, Dict[str, Any]], record: tuple) -> None:
+    """Apply one WAL record to recovered, not yet opened, store data
+
+    Records may repeat changes a snapshot already holds, so applying one
+    twice must leave the same result.
+    """
+    op, name = record[0], record[1]
+    if op == "counter":
+        state["counter"][name] = max(state["counter"].get(name, 0), record[2])
+        return
+    kind = "sequence" if op in ("extend", "seed_sequence") else "mapping"
+    seeded, data = state[kind].setdefault(name, [False, {}])
+    if op == "set":
+        data[record[2]] = record[3]
+    elif op == "delete":
+        data.pop(record[2], None)
+    elif op == "insert":
+        data.setdefault(record[2], set()).add(record[3])
+    elif op == "discard":
+        if record[2] in data:
+            data[record[2]].discard(record[3])
+    elif op == "set_field":
+        data.setdefault(record[2], {})[record[3]] = record[4]
+    elif op == "seed":
+        if not seeded:
+            data.update(record[2])
+    elif op == "seed_sequence":
+        if not seeded:
+            for key, items in record[2].items():
+                data.setdefault(key, []).extend(items)
+    elif op == "extend":
+        key, position, items = record[2], record[3], record[4]
+        existing = data.setdefault(key, [])
+        existing.extend(items[max(0, len(existing) - position):])
+    if op in ("seed", "seed_sequence"):
+        state[kind][name][0] = True
+
+
+class MemoryBackend(StateBackend):
+    """Today's behaviour: data lives in this process only
+
+    With a journal, the data is also written to snapshot and WAL files and
+    read back from them by `recover` (see functions/journal.py).
+    """
+
+    kind = "memory"
+
+    def __init__(self, journal: Optional[Journal] = None):
+        super().__init__()
+        self.journal = journal
+        # Recovered data of stores this process hasn't opened yet
+        self._recovered: Dict[str, Dict[str, Any]] = {"mapping": {}, "sequence": {}, "counter": {}}
+        self._recovery_done = journal is None
+
+    def recover(self) -> None:
+        if self._recovery_done:
+            return
+        with self._lock:
+            if not self._recovery_done:
+                self._load()
+                self.journal.start(self._collect)
+                self._recovery_done = True
+
+    def _load(self) -> None:
+        snapshot, records = self.journal.recover()
+        if snapshot is not None:
+            for kind in ("mapping", "sequence"):
+                self._recovered[kind] = {
+                    name: list(pickle.loads(blob)) for name, blob in snapshot[kind].items()
+                }
+            self._recovered["counter"] = dict(snapshot["counter"])
+        for record in records:
+            _replay(self._recovered, record)
+
+    def _collect(self) -> Dict[str, Any]:
+        """State for a snapshot: each store is pickled under its own lock"""
+        with self._lock:
+            stores = list(self._stores.values())
+            state = {
+                "mapping": {name: _dump(value) for name, value in self._recovered["mapping"].items()},
+                "sequence": {name: _dump(value) for name, value in self._recovered["sequence"].items()},
+                "counter": dict(self._recovered["counter"]),
+            }
+        for store in stores:
+            kind = ("counter" if isinstance(store, Counter)
+                    else "sequence" if isinstance(store, SequenceStore) else "mapping")
+            state[kind][store.name] = store.dump()
+        return state
+
+    def _mapping(self, name: str) -> MappingStore:
+        return MemoryMapping(name, self.journal, self._recovered["mapping"].pop(name, None))
+
+    def _sequence(self, name: str) -> SequenceStore:
+        return MemorySequence(name, self.journal, self._recovered["sequence"].pop(name, None))
+
+    def _counter(self, name: str, start: int) -> Counter:
+        return MemoryCounter(name, start, self.journal, self._recovered["counter"].pop(name, None))
+
+    def snapshot(self) -> Optional[int]:
+        """Write a snapshot now; returns its generation, or None without a journal"""
+        if self.journal is None:
+            return None
+        self.recover()
+        return self.journal.snapshot()
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+
+    def describe(self) -> Dict[str, Any]:
+        info = super().describe()
+        if self.journal is not None:
+            info["journal"] = self.journal.describe()
+        return info
+
+
+# SQLite backend
+
+_load = pickle.loads
+
+
+class SQLiteDatabase:
+    """One connection to the state file, serialized by a lock
+
+    Writes run in BEGIN IMMEDIATE transactions, so a read-modify-write in
+    one worker can't interleave with another worker's.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " store TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+            " PRIMARY KEY (store, key));"
+            "CREATE TABLE IF NOT EXISTS seq ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, store TEXT NOT NULL, key TEXT NOT NULL,"
+            " value BLOB NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS seq_by_key ON seq (store, key, id);"
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS seeded (store TEXT PRIMARY KEY);"
+        )
+
+    def transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def seed(self, store: str, load: Callable[[sqlite3.Connection], None]) -> None:
+        def seed_once(conn):
+            if conn.execute("INSERT OR IGNORE INTO seeded (store) VALUES (?)", (store,)).rowcount:
+                load(conn)
+        self.transaction(seed_once)
+
+
+_UPSERT = (
+    "INSERT INTO kv (store, key, value) VALUES (?, ?, ?)"
+    " ON CONFLICT (store, key) DO UPDATE SET value = excluded.value"
+)
+
+
+class SQLiteMapping(MappingStore):
+    def __init__(self, name: str, db: SQLiteDatabase):
+        super().__init__(name)
+        self.db = db
+
+    def get(self, key: str, default: Any = None) -> Any:
+        rows = self.db.query("SELECT value FROM kv WHERE store = ? AND key = ?", (self.name, key))
+        return _load(rows[0][0]) if rows else default
+
+    def set(self, key: str, value: Any) -> None:
+        blob = _dump(value)
+        with self.db.lock:
+            self.db.conn.execute(_UPSERT, (self.name, key, blob))
+
+    def set_many(self, entries: Mapping[str, Any]) -> None:
+        rows = [(self.name, key, _dump(value)) for key, value in entries.items()]
+        self.db.transaction(lambda conn: conn.executemany(_UPSERT, rows))
+
+    def add(self, key: str, value: Any) -> bool:
+        blob = _dump(value)
+        with self.db.lock:
+            cursor = self.db.conn.execute(
+                "INSERT OR IGNORE INTO kv (store, key, value) VALUES (?, ?, ?)", (self.name, key, blob)
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, key: str) -> bool:
+        with self.db.lock:
+            cursor = self.db.conn.execute("DELETE FROM kv WHERE store = ? AND key = ?", (self.name, key))
+            return cursor.rowcount == 1
+
+    def mutate(self, key: str, fn: Callable[[Any], Any], default: Any = MISSING) -> Any:
+        def apply(conn):
+            row = conn.execute("SELECT value FROM kv WHERE store = ? AND key = ?", (self.name, key)).fetchone()
+            if row is not None:
+                value = _load(row[0])
+            elif default is MISSING:
+                raise KeyError(key)
+            else:
+                value = default
+            result = fn(value)
+            conn.execute(_UPSERT, (self.name, key, _dump(value)))
+            return result
+        return self.db.transaction(apply)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        rows = self.db.query("SELECT key, value FROM kv WHERE store = ? ORDER BY rowid", (self.name,))
+        return [(key, _load(blob)) for key, blob in rows]
+
+    def keys(self) -> List[str]:
+        return [key for (key,) in self.db.query("SELECT key FROM kv WHERE store = ? ORDER BY rowid", (self.name,))]
+
+    def __len__(self) -> int:
+        return self.db.query("SELECT COUNT(*) FROM kv WHERE store = ?", (self.name,))[0][0]
+
+    def seed(self, initial: Mapping[str, Any]) -> None:
+        self.db.seed(self.name, lambda conn: conn.executemany(
+            "INSERT OR IGNORE INTO kv (store, key, value) VALUES (?, ?, ?)",
+            [(self.name, key, _dump(value)) for key, value in initial.items()]
+        ))
+
+
+class SQLiteSequence(SequenceStore):
+    # Marker row that records a key without items (e.g. a new, empty channel)
+    _KEYS = "__keys__"
+
+    def __init__(self, name: str, db: SQLiteDatabase):
+        super().__init__(name)
+        self.db = db
+
+    def _register(self, conn: sqlite3.Connection, key: str) -> None:
+        conn.execute(
+            "INSERT OR IGNORE INTO kv (store, key, value) VALUES (?, ?, ?)",
+            (f"{self.name}/{self._KEYS}", key, b"")
+        )
+
+    def extend(self, key: str, items: Iterable[Any]) -> None:
+        rows = [(self.name, key, _dump(item)) for item in items]
+
+        def insert(conn):
+            self._register(conn, key)
+            conn.executemany("INSERT INTO seq (store, key, value) VALUES (?, ?, ?)", rows)
+        self.db.transaction(insert)
+
+    def items(self, key: str) -> List[Any]:
+        rows = self.db.query("SELECT value FROM seq WHERE store = ? AND key = ? ORDER BY id", (self.name, key))
+        return [_load(blob) for (blob,) in rows]
+
+    def tail(self, key: str, count: int) -> List[Any]:
+        if count <= 0:
+            return []
+        rows = self.db.query(
+            "SELECT value FROM seq WHERE store = ? AND key = ? ORDER BY id DESC LIMIT ?",
+            (self.name, key, count)
+        )
+        return [_load(blob) for (blob,) in reversed(rows)]
+
+    def length(self, key: str) -> int:
+        return self.db.query("SELECT COUNT(*) FROM seq WHERE store = ? AND key = ?", (self.name, key))[0][0]
+
+    def keys(self) -> List[str]:
+        rows = self.db.query("SELECT key FROM kv WHERE store = ? ORDER BY rowid", (f"{self.name}/{self._KEYS}",))
+        return [key for (key,) in rows]
+
+    def seed(self, initial: Mapping[str, List[Any]]) -> None:
+        def load(conn):
+            for key, items in initial.items():
+                self._register(conn, key)
+                conn.executemany(
+                    "INSERT INTO seq (store, key, value) VALUES (?, ?, ?)",
+                    [(self.name, key, _dump(item)) for item in items]
+                )
+        self.db.seed(self.name, load)
+
+
+class SQLiteCounter(Counter):
+    def __init__(self, name: str, start: int, db: SQLiteDatabase):
+        super().__init__(name, start)
+        self.db = db
+
+    def next(self) -> int:
+        with self.db.lock:
+            (value,) = self.db.conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value",
+                (self.name, self.start)
+            ).fetchone()
+        return value
+
+
+class SQLiteBackend(StateBackend):
+    """Stores in one SQLite file shared by every process that opens it"""
+
+    kind = "sqlite"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.db = SQLiteDatabase(path)
+        # Resource locks are byte-range locks on a side file, one byte per
+        # stripe, so they hold across every worker sharing the database
+        self._lock_file = open(path + ".locks", "a+b") if fcntl is not None else None
+        self._holds = [0] * len(self._resource_locks)
+
+    @contextmanager
+    def lock(self, resource: str) -> Iterator[None]:
+        stripe = self._resource_locks.index(resource)
+        with self._resource_locks(resource):
+            # fcntl locks belong to the process, so only the outermost hold
+            # in this process takes and releases the file lock
+            self._holds[stripe] += 1
+            try:
+                if self._holds[stripe] == 1 and self._lock_file is not None:
+                    fcntl.lockf(self._lock_file, fcntl.LOCK_EX, 1, stripe)
+                yield
+            finally:
+                self._holds[stripe] -= 1
+                if self._holds[stripe] == 0 and self._lock_file is not None:
+                    fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, stripe)
+
+    def _mapping(self, name: str) -> MappingStore:
+        return SQLiteMapping(name, self.db)
+
+    def _sequence(self, name: str) -> SequenceStore:
+        return SQLiteSequence(name, self.db)
+
+    def _counter(self, name: str, start: int) -> Counter:
+        return SQLiteCounter(name, start, self.db)
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "path": self.db.path}
+
+
+class SharedMemoryBackend(SQLiteBackend):
+    """The SQLite backend on the /dev/shm tmpfs
+
+    Page reads and writes never touch a disk, and the WAL index is already
+    shared memory, so workers on one box exchange state at memory speed.
+    """
+
+    kind = "shm"
+
+    def __init__(self, path: str = ""):
+        if not path:
+            if not os.path.isdir(SHM_DIR):
+                raise RuntimeError(f"{SHM_DIR} is not available; use REGISTRY_STATE_BACKEND=sqlite")
+            path = os.path.join(SHM_DIR, "registry_state.db")
+        super().__init__(path)
+
+
+def backend_from_env() -> StateBackend:
+    if STATE_BACKEND == "memory":
+        return MemoryBackend(journal_from_env())
+    if STATE_BACKEND == "sqlite":
+        return SQLiteBackend(STATE_PATH or "registry_state.db")
+    if STATE_BACKEND == "shm":
+        return SharedMemoryBackend(STATE_PATH)
+    raise ValueError(f"Unknown REGISTRY_STATE_BACKEND '{STATE_BACKEND}' (expected memory, sqlite or shm)")
+
+
+backend = backend_from_env()
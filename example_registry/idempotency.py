@@ -0,0 +1,400 @@
+"""
+Idempotency-Key handling for the execution endpoints
+The first response for a key is stored and replayed for retries of the same
+request. Concurrent duplicates wait for the in-flight execution instead of
+running the function again. Stores are pluggable. The default store is an
+in-memory LRU. Setting REGISTRY_IDEMPOTENCY_DB selects a SQLite file, which
+every uvicorn worker on the host can share.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from json_codec import dumps
+from settings import env_float, env_int
+
+
+IDEMPOTENCY_TTL = env_float("REGISTRY_IDEMPOTENCY_TTL", 24 * 3600)
+IDEMPOTENCY_MAX_ENTRIES = env_int("REGISTRY_IDEMPOTENCY_MAX_ENTRIES", 10000)
+IDEMPOTENCY_MAX_BYTES = env_int("REGISTRY_IDEMPOTENCY_MAX_BYTES", 64 * 1024 * 1024)
+# How long a duplicate waits for the original execution to finish
+IDEMPOTENCY_WAIT = env_float("REGISTRY_IDEMPOTENCY_WAIT", 30.0)
+# How long a reservation holds without renewal; the owner renews it every
+# third of this while the call runs, so only a dead worker's key expires
+IDEMPOTENCY_LEASE = env_float("REGISTRY_IDEMPOTENCY_LEASE", 60.0)
+
+MAX_KEY_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+IN_PROGRESS_MESSAGE = "A request with this Idempotency-Key is still in progress"
+
+
+class IdempotencyError(Exception):
+    """A request that can't be served under its Idempotency-Key"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class IdempotencyRecord:
+    """A reserved key: in flight until `body` is set"""
+
+    __slots__ = ("fingerprint", "status_code", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, expires_at: float,
+                 status_code: Optional[int] = None, body: Optional[bytes] = None):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.status_code = status_code
+        self.body = body
+
+    @property
+    def completed(self) -> bool:
+        return self.body is not None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) if self.body is not None else 0
+
+
+class IdempotencyStore(ABC):
+    """Storage for idempotency records
+
+    `reserve` must be atomic across every process sharing the store: exactly
+    one caller gets to execute a given key. Stores that block on I/O set
+    `blocking`, and their methods are then called from a worker thread.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def reserve(self, key: str, fingerprint: str, lease: float) -> Optional[IdempotencyRecord]:
+        """Claim `key` for `lease` seconds
+
+        Returns None when the caller now owns the key, otherwise the existing
+        record (in flight or completed).
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        """The current record for `key`, if any"""
+
+    @abstractmethod
+    def renew(self, key: str, lease: float) -> None:
+        """Extend the reservation of an owned, in-flight key by `lease` seconds"""
+
+    @abstractmethod
+    def complete(self, key: str, status_code: int, body: bytes) -> None:
+        """Store the response for an owned key"""
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """Give up an owned key without storing a response"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Per-process LRU store with a TTL, an entry limit and a byte budget"""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+                 max_bytes: int = IDEMPOTENCY_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._records: "OrderedDict[str, IdempotencyRecord]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def _live(self, key: str) -> Optional[IdempotencyRecord]:
+        record = self._records.get(key)
+        if record is not None and record.expires_at <= time.monotonic():
+            self._discard(key)
+            return None
+        return record
+
+    def _discard(self, key: str) -> None:
+        record = self._records.pop(key, None)
+        if record is not None:
+            self._bytes -= record.size
+
+    def _evict(self) -> None:
+        while self._records and (len(self._records) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._records))
+            self._discard(key)
+            self.evictions += 1
+
+    def reserve(self, key: str, fingerprint: str, lease: float) -> Optional[IdempotencyRecord]:
+        record = self._live(key)
+        if record is not None:
+            self._records.move_to_end(key)
+            return record
+        self._records[key] = IdempotencyRecord(fingerprint, time.monotonic() + lease)
+        self._evict()
+        return None
+
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        return self._live(key)
+
+    def renew(self, key: str, lease: float) -> None:
+        record = self._records.get(key)
+        if record is not None and not record.completed:
+            record.expires_at = time.monotonic() + lease
+
+    def complete(self, key: str, status_code: int, body: bytes) -> None:
+        record = self._records.get(key)
+        if record is None:
+            # Evicted while running; nothing to replay from
+            return
+        record.status_code = status_code
+        record.body = body
+        record.expires_at = time.monotonic() + self.ttl
+        self._bytes += record.size
+        self._records.move_to_end(key)
+        self._evict()
+
+    def release(self, key: str) -> None:
+        self._discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._records), "bytes": self._bytes, "evictions": self.evictions}
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Store in a SQLite file, shared by every worker that opens it"""
+
+    # Expired rows are purged every this many reservations
+    PURGE_INTERVAL = 256
+
+    blocking = True
+
+    def __init__(self, path: str, ttl: float = IDEMPOTENCY_TTL, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reservations = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status_code INTEGER,"
+            " body BLOB, expires_at REAL NOT NULL)"
+        )
+
+    def _row(self, key: str, now: float) -> Optional[IdempotencyRecord]:
+        row = self._conn.execute(
+            "SELECT fingerprint, status_code, body, expires_at FROM idempotency"
+            " WHERE key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        fingerprint, status_code, body, expires_at = row
+        return IdempotencyRecord(fingerprint, expires_at, status_code, body)
+
+    def _purge(self, now: float) -> None:
+        self._conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM idempotency WHERE key IN (SELECT key FROM idempotency"
+            " ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def reserve(self, key: str, fingerprint: str, lease: float) -> Optional[IdempotencyRecord]:
+        # Wall-clock time: expiry has to mean the same thing in every process
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                record = self._row(key, now)
+                if record is None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO idempotency (key, fingerprint, status_code, body, expires_at)"
+                        " VALUES (?, ?, NULL, NULL, ?)",
+                        (key, fingerprint, now + lease)
+                    )
+                    self._reservations += 1
+                    if self._reservations % self.PURGE_INTERVAL == 0:
+                        self._purge(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return record
+
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        with self._lock:
+            return self._row(key, time.time())
+
+    def renew(self, key: str, lease: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET expires_at = ? WHERE key = ? AND body IS NULL",
+                (time.time() + lease, key)
+            )
+
+    def complete(self, key: str, status_code: int, body: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET status_code = ?, body = ?, expires_at = ? WHERE key = ?",
+                (status_code, body, time.time() + self.ttl, key)
+            )
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM idempotency").fetchone()
+        return {"entries": entries, "path": self.path}
+
+
+def request_fingerprint(func_name: str, params: Dict[str, Any]) -> str:
+    """Identity of a request, to detect a key reused for a different call"""
+    digest = hashlib.blake2b(func_name.encode(), digest_size=16)
+    digest.update(b"\x00")
+    digest.update(dumps(params))
+    return digest.hexdigest()
+
+
+class Idempotency:
+    """Runs executions at most once per Idempotency-Key
+
+    Duplicates in this process wait on the original's future. Duplicates of
+    an execution in another worker poll the shared store until it completes.
+    Only successful responses are stored: `produce` says whether its
+    response is one. If the original fails, waiting duplicates retry the
+    reservation themselves. The owner renews its reservation while the call
+    runs, so a call slower than the lease is not run twice.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, store: IdempotencyStore, wait_timeout: float = IDEMPOTENCY_WAIT,
+                 lease: float = IDEMPOTENCY_LEASE):
+        self.store = store
+        self.wait_timeout = wait_timeout
+        self.lease = lease
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.conflicts = 0
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Call a store method, off the event loop if the store blocks"""
+        if self.store.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _wait_for_store(self, key: str, deadline: float) -> Optional[IdempotencyRecord]:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.POLL_INTERVAL)
+            record = await self._call(self.store.get, key)
+            if record is None or record.completed:
+                return record
+        raise IdempotencyError(409, IN_PROGRESS_MESSAGE)
+
+    async def _renew(self, key: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await self._call(self.store.renew, key, self.lease)
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        produce: Callable[[], Awaitable[Tuple[int, bytes, bool]]]
+    ) -> Tuple[int, bytes, bool]:
+        """Return (status_code, body, replayed) for the request under `key`
+
+        `produce` returns (status_code, body, succeeded); only succeeded 2xx
+        responses are stored.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        deadline = time.monotonic() + self.wait_timeout
+        loop = asyncio.get_running_loop()
+        while True:
+            future = self._in_flight.get(key)
+            if future is not None:
+                # Shielded: a disconnecting duplicate must not cancel the original
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    raise IdempotencyError(409, IN_PROGRESS_MESSAGE)
+                continue
+
+            # Registered before reserving, so duplicates in this process wait
+            # on it instead of racing the reservation
+            future = self._in_flight[key] = loop.create_future()
+            try:
+                record = await self._call(self.store.reserve, key, fingerprint, self.lease)
+            except BaseException:
+                del self._in_flight[key]
+                future.set_result(None)
+                raise
+            if record is None:
+                break
+            del self._in_flight[key]
+            future.set_result(None)
+            if record.fingerprint != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyError(422, "Idempotency-Key was already used for a different request")
+            if not record.completed:
+                record = await self._wait_for_store(key, deadline)
+                if record is None:
+                    continue
+            self.replayed += 1
+            return record.status_code, record.body, True
+
+        renewal = asyncio.create_task(self._renew(key))
+        try:
+            try:
+                status_code, body, succeeded = await produce()
+            finally:
+                renewal.cancel()
+        except BaseException:
+            await self._call(self.store.release, key)
+            raise
+        else:
+            if succeeded and 200 <= status_code < 300:
+                await self._call(self.store.complete, key, status_code, body)
+            else:
+                await self._call(self.store.release, key)
+            self.executed += 1
+            return status_code, body, False
+        finally:
+            del self._in_flight[key]
+            # Wake duplicates; they re-check the store for the stored response
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "in_flight": len(self._in_flight),
+            "store": self.store.stats()
+        }
+
+
+def default_store() -> IdempotencyStore:
+    path = os.environ.get("REGISTRY_IDEMPOTENCY_DB")
+    if path:
+        return SQLiteIdempotencyStore(path)
+    return MemoryIdempotencyStore()
+
+
+idempotency = Idempotency(default_store())
@@ -0,0 +1,255 @@
+"""
+Background jobs for long-running executions
+A submitted call is queued and returns a job id right away. A pool of worker
+tasks runs queued jobs through the same dispatcher as every other call.
+Clients poll a job or subscribe to its events. Finished jobs are kept for a
+retention period, bounded in number. The workers are started and stopped by
+the app's lifespan.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional
+
+from dispatcher import error_envelope, invoke
+from settings import env_float, env_int
+
+
+JOB_WORKERS = env_int("REGISTRY_JOBS_WORKERS", 8)
+JOB_QUEUE_LIMIT = env_int("REGISTRY_JOBS_QUEUE", 1000)
+JOB_RETENTION = env_float("REGISTRY_JOBS_RETENTION", 3600.0)
+JOB_MAX_RETAINED = env_int("REGISTRY_JOBS_MAX_RETAINED", 10000)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue can't take another job"""
+
+    def __init__(self):
+        super().__init__("Job queue is full")
+
+
+class JobWorkersStoppedError(Exception):
+    """Raised when a job is submitted while the workers aren't running"""
+
+    def __init__(self):
+        super().__init__("Job workers are not running")
+
+
+class Job:
+    """One queued call and its progress"""
+
+    def __init__(self, func_info: Dict[str, Any], params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.func_info = func_info
+        self.params = params
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.envelope: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+        # Bumped on every status change; subscribers wait for it to move
+        self.version = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    async def _set_status(self, status: str) -> None:
+        self.status = status
+        if status == RUNNING:
+            self.started_at = time.time()
+        elif status in FINISHED:
+            self.finished_at = time.time()
+        async with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    async def wait_finished(self, timeout: float) -> bool:
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.finished), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.finished
+
+    async def changes(self, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the job's state now and after every change until it finishes
+
+        Yields None every `heartbeat` seconds without a change, so a stream
+        can keep its connection alive.
+        """
+        seen = -1
+        while True:
+            if self.version != seen:
+                seen = self.version
+                yield self.to_dict()
+                if self.finished:
+                    return
+                continue
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: self.version != seen),
+                        heartbeat
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+
+    def to_dict(self) -> Dict[str, Any]:
+        job = {
+            "job_id": self.id,
+            "function_name": self.func_info['name'],
+            "category": self.func_info['category'],
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.envelope is not None:
+            job["result"] = self.envelope['result']
+            job["success"] = self.envelope['success']
+            if 'error' in self.envelope:
+                job["error"] = self.envelope['error']
+        return job
+
+
+class JobManager:
+    """In-process job queue, worker pool and retention"""
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_queue: int = JOB_QUEUE_LIMIT,
+        retention: float = JOB_RETENTION,
+        max_retained: int = JOB_MAX_RETAINED
+    ):
+        self.worker_count = workers
+        self.retention = retention
+        self.max_retained = max_retained
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_queue = max_queue
+        self._workers = []
+        self._active: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+        self.submitted = 0
+        self.completed = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+
+    def start(self) -> None:
+        """Start the worker pool on the running loop"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(self._max_queue)
+        self._workers = [
+            asyncio.create_task(self._worker(self._queue), name=f"registry-job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+
+    async def shutdown(self) -> None:
+        """Stop the workers and cancel every queued and running job"""
+        self._queue = None
+        running = [job.task for job in self._active.values() if job.task is not None]
+        for task in self._workers + running:
+            task.cancel()
+        await asyncio.gather(*running, *self._workers, return_exceptions=True)
+        self._workers = []
+        for job in list(self._active.values()):
+            await self._finish(job, CANCELLED)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if len(self._finished) <= self.max_retained and job.finished_at > cutoff:
+                break
+            del self._finished[job.id]
+
+    async def _finish(self, job: Job, status: str) -> None:
+        self._active.pop(job.id, None)
+        self._finished[job.id] = job
+        self.completed[status] += 1
+        await job._set_status(status)
+        self._prune()
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            job = await queue.get()
+            try:
+                if job.finished:
+                    # Cancelled while queued
+                    continue
+                # The task exists before the job reads as running, so a
+                # cancel always finds it
+                job.task = asyncio.create_task(invoke(job.func_info, job.params))
+                await job._set_status(RUNNING)
+                try:
+                    job.envelope = await job.task
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling():
+                        # The worker itself is shutting down
+                        raise
+                    await self._finish(job, CANCELLED)
+                    continue
+                except Exception as e:
+                    # Saturation / rate limiting: the call never ran
+                    job.envelope = error_envelope(job.func_info['name'], str(e))
+                await self._finish(job, SUCCEEDED if job.envelope['success'] else FAILED)
+            finally:
+                queue.task_done()
+
+    async def submit(self, func_info: Dict[str, Any], params: Dict[str, Any]) -> Job:
+        """Queue a call, raising JobQueueFullError when the queue is at its limit
+
+        Raises JobWorkersStoppedError outside the app's lifespan.
+        """
+        if self._queue is None:
+            raise JobWorkersStoppedError()
+        job = Job(func_info, params)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError()
+        self._active[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._active.get(job_id) or self._finished.get(job_id)
+
+    async def cancel(self, job: Job) -> None:
+        """Cancel a queued or running job
+
+        A sync function already running in a thread pool can't be
+        interrupted: it runs to completion, but its result is discarded.
+        """
+        if job.finished:
+            return
+        if job.status == QUEUED:
+            await self._finish(job, CANCELLED)
+        elif job.task is not None:
+            job.task.cancel()
+            await job.wait_finished(timeout=1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.worker_count,
+            "queued": sum(1 for job in self._active.values() if job.status == QUEUED),
+            "running": sum(1 for job in self._active.values() if job.status == RUNNING),
+            "retained": len(self._finished),
+            "submitted": self.submitted,
+            "completed": dict(self.completed)
+        }
+
+
+jobs = JobManager()
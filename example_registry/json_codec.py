@@ -0,0 +1,90 @@
+"""
+JSON encoding for responses
+Uses orjson when it is installed (pip install "function-registry[fast]") and
+the standard library otherwise. Function results may be native dicts/lists,
+legacy JSON strings, or RawJSON: already-encoded bytes that are spliced into
+the response as-is instead of being parsed and encoded again.
+"""
+import json
+import secrets
+from typing import Any, Union
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class RawJSON:
+    """A pre-encoded JSON value, embedded verbatim when serialized"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Union[bytes, str]):
+        self.data = data.encode() if isinstance(data, str) else data
+
+    def __repr__(self) -> str:
+        return f"RawJSON({self.data[:40]!r}...)" if len(self.data) > 40 else f"RawJSON({self.data!r})"
+
+
+# RawJSON values are first encoded as a unique placeholder string and then
+# swapped for their bytes, so neither encoder ever re-escapes them
+_PLACEHOLDER_PREFIX = "\x00rawjson:" + secrets.token_hex(8) + ":"
+
+
+class _Splicer:
+    def __init__(self):
+        self.raw = []
+
+    def default(self, value: Any) -> Any:
+        if isinstance(value, RawJSON):
+            self.raw.append(value.data)
+            return f"{_PLACEHOLDER_PREFIX}{len(self.raw) - 1}\x00"
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def splice(self, encoded: bytes) -> bytes:
+        for index, data in enumerate(self.raw):
+            placeholder = _dumps_plain(f"{_PLACEHOLDER_PREFIX}{index}\x00")
+            encoded = encoded.replace(placeholder, data, 1)
+        return encoded
+
+
+def _dumps_plain(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a value to compact JSON bytes, embedding RawJSON verbatim"""
+    splicer = _Splicer()
+    if orjson is not None:
+        encoded = orjson.dumps(value, default=splicer.default)
+    else:
+        encoded = json.dumps(
+            value, separators=(",", ":"), ensure_ascii=False, default=splicer.default
+        ).encode()
+    return splicer.splice(encoded) if splicer.raw else encoded
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class CodecJSONResponse(Response):
+    """JSON response encoded with `dumps`
+
+    Returning one from an endpoint skips FastAPI's jsonable_encoder pass, so
+    native results and RawJSON reach the encoder untouched.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
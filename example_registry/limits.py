@@ -0,0 +1,206 @@
+"""
+Per-category and per-function admission limits
+Each limiter combines a cap on in-flight calls, a token-bucket rate and a
+bounded wait queue with a deadline, so bursts from /map or planners queue
+briefly instead of overrunning a backend's rate limit. Calls that can't be
+admitted in time are shed with RateLimitedError (429 + Retry-After).
+
+Limits are keyed by category or by function name, and a function is subject
+to both its own limiter and its category's:
+
+    REGISTRY_LIMIT_CONCURRENCY="salesforce=4,github_merge_pr=1"
+    REGISTRY_LIMIT_RATE="github=10,slack=1"       # calls per second
+    REGISTRY_LIMIT_BURST="github=20"              # bucket size (default: rate)
+    REGISTRY_LIMIT_QUEUE="github=50"              # waiters before shedding
+    REGISTRY_LIMIT_WAIT="github=2.5"              # seconds a call may wait
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from settings import env_float, env_float_mapping, env_int, env_int_mapping
+
+
+DEFAULT_QUEUE_LIMIT = env_int("REGISTRY_LIMIT_DEFAULT_QUEUE", 100)
+DEFAULT_MAX_WAIT = env_float("REGISTRY_LIMIT_DEFAULT_WAIT", 5.0)
+
+
+class RateLimitedError(Exception):
+    """Raised when a call is shed by a limiter"""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        super().__init__(f"Rate limit for '{name}' exceeded ({reason})")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class Limiter:
+    """In-flight cap + token bucket + bounded, deadline-limited wait queue
+
+    All state is touched only from the event loop thread.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_queue: int = DEFAULT_QUEUE_LIMIT,
+        max_wait: float = DEFAULT_MAX_WAIT
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 0.0, 1.0)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _reserve_token(self, deadline: float) -> float:
+        """Take a token, possibly from the future; return how long to wait for it"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        delay = max(0.0, (1.0 - self._tokens) / self.rate)
+        if now + delay > deadline:
+            raise RateLimitedError(self.name, "rate", delay)
+        # Going negative queues this call behind earlier reservations
+        self._tokens -= 1.0
+        return delay
+
+    def _shed(self, error: RateLimitedError) -> RateLimitedError:
+        self.shed += 1
+        return error
+
+    async def acquire(self) -> None:
+        if self.waiting >= self.max_queue:
+            raise self._shed(RateLimitedError(self.name, "queue full", self.max_wait))
+
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        self.waiting += 1
+        try:
+            if self._slots is not None:
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+                except asyncio.TimeoutError:
+                    raise self._shed(RateLimitedError(self.name, "concurrency", self.max_wait))
+            if self.rate:
+                try:
+                    delay = self._reserve_token(deadline)
+                except RateLimitedError as e:
+                    if self._slots is not None:
+                        self._slots.release()
+                    raise self._shed(e)
+                if delay:
+                    try:
+                        await asyncio.sleep(delay)
+                    except BaseException:
+                        # Cancelled while waiting: the token is forfeit, the slot isn't
+                        if self._slots is not None:
+                            self._slots.release()
+                        raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.admitted += 1
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rate": self.rate,
+            "burst": self.burst if self.rate else None,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.admitted, 6) if self.admitted else 0.0
+        }
+
+
+class Limits:
+    """The configured limiters, looked up by category and function name"""
+
+    def __init__(
+        self,
+        concurrency: Dict[str, int],
+        rates: Dict[str, float],
+        bursts: Dict[str, float],
+        queues: Dict[str, int],
+        waits: Dict[str, float]
+    ):
+        self.limiters: Dict[str, Limiter] = {
+            name: Limiter(
+                name,
+                max_in_flight=concurrency.get(name),
+                rate=rates.get(name),
+                burst=bursts.get(name),
+                max_queue=queues.get(name, DEFAULT_QUEUE_LIMIT),
+                max_wait=waits.get(name, DEFAULT_MAX_WAIT)
+            )
+            for name in set(concurrency) | set(rates)
+        }
+
+    @classmethod
+    def from_env(cls) -> "Limits":
+        return cls(
+            concurrency=env_int_mapping("REGISTRY_LIMIT_CONCURRENCY"),
+            rates=env_float_mapping("REGISTRY_LIMIT_RATE"),
+            bursts=env_float_mapping("REGISTRY_LIMIT_BURST"),
+            queues=env_int_mapping("REGISTRY_LIMIT_QUEUE"),
+            waits=env_float_mapping("REGISTRY_LIMIT_WAIT")
+        )
+
+    def for_call(self, func_info: Dict[str, Any]) -> List[Limiter]:
+        # Function first: its (usually tighter) limit shouldn't hold a category slot
+        return [
+            self.limiters[name]
+            for name in (func_info['name'], func_info['category'])
+            if name in self.limiters
+        ]
+
+    @asynccontextmanager
+    async def admit(self, func_info: Dict[str, Any]) -> AsyncIterator[None]:
+        """Hold every limiter that applies to the call for its duration"""
+        acquired = []
+        try:
+            for limiter in self.for_call(func_info):
+                await limiter.acquire()
+                acquired.append(limiter)
+            yield
+        finally:
+            for limiter in reversed(acquired):
+                limiter.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in sorted(self.limiters.items())}
+
+
+limits = Limits.from_env()
@@ -2,22 +2,66 @@
 FastAPI application with auto-discovered, strongly-typed endpoints
 No manual registry needed - functions are discovered automatically!
 """
-from fastapi import FastAPI, HTTPException
-from typing import Any, Dict
+from startup import STARTUP
+# Before anything imports the service modules, whose stores need the recovered state
+with STARTUP.phase("recover_state"):
+    from functions.state import backend as state_backend
+    state_backend.recover()
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from catalog import catalog, document_response
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union
+from dispatcher import (
+    invoke,
+    single_flight,
+    validate_json,
+    dispatch_batch,
+    dispatch_map,
+    validate_many,
+    BATCH_MAX_CALLS,
+    MAP_MAX_ITEMS
+)
+from executor import executor, ExecutorSaturatedError
 from function_discovery import (
     DISCOVERED_FUNCTIONS,
-    get_all_functions,
+    LAZY_LOADING,
+    SEARCH_INDEX,
+    RETRIEVAL_INDEX,
+    function_summary,
+    request_schema,
     get_function_by_name,
-    get_functions_by_category,
-    get_all_categories,
-    search_functions,
-    format_type_name
+    get_all_categories
 )
+from idempotency import idempotency, request_fingerprint, IdempotencyError, REPLAYED_HEADER
+from jobs import jobs, Job, JobQueueFullError, JobWorkersStoppedError
+from json_codec import CodecJSONResponse, dumps, loads
+from models import BatchCall, ProfileRequest, WorkflowRequest
+from pydantic import ValidationError
+from limits import limits, RateLimitedError
+from metrics import metrics
+from profiling import admin_authorized, current_trace, profiler, CallTrace, SAMPLE_INTERVAL
+from result_cache import result_cache
+from workflow import run_workflow, WorkflowError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.start()
+    yield
+    await jobs.shutdown()
+    # Let in-flight calls finish before the worker exits
+    executor.shutdown(wait=True)
+    state_backend.close()
+
 
 app = FastAPI(
     title="Function Call Registry",
     description="Auto-discovered function registry with strongly-typed endpoints",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 
@@ -39,112 +83,549 @@ async def root():
             "get_function": "/functions/{function_name}",
             "by_category": "/functions/category/{category}",
             "categories": "/categories",
-            "search": "/functions/search?q={query}",
-            "execute": "/{category}/{function_name}"
+            "search": "/search?q={query}",
+            "retrieve": "/functions/retrieve?q={query}&k={k}",
+            "execute": "/{category}/{function_name}",
+            "execute_raw": "/{category}/{function_name}/raw",
+            "batch": "/batch",
+            "workflow": "/workflow",
+            "map": "/map/{category}/{function_name}",
+            "cache": "/cache",
+            "limits": "/limits",
+            "metrics": "/metrics",
+            "jobs": "/jobs/{category}/{function_name}"
         },
         "docs": "/docs"
     }
 
 
 @app.get("/functions")
-async def list_functions():
+async def list_functions(request: Request):
     """List all available functions"""
-    return {
-        "functions": get_all_functions(),
-        "total": len(DISCOVERED_FUNCTIONS)
-    }
+    return document_response(request, catalog.functions)
 
 
 @app.get("/search")
-async def search_functions_endpoint(q: str):
-    """Search functions by name or description"""
-    results = search_functions(q)
-    return {"results": results, "total": len(results), "query": q}
+async def search_functions_endpoint(
+    q: str,
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    """Search functions by name, description, category or parameter names"""
+    matches = SEARCH_INDEX.search(q, category)
+    results = [
+        {**function_summary(name, DISCOVERED_FUNCTIONS[name]), "score": round(score, 4)}
+        for name, score in matches[offset:offset + limit]
+    ]
+    return {"results": results, "total": len(matches), "query": q}
 
 
 @app.get("/functions/category/{category}")
-async def get_category_functions(category: str):
+async def get_category_functions(category: str, request: Request):
     """Get all functions in a category"""
-    functions = get_functions_by_category(category)
-    if not functions:
+    document = catalog.category(category)
+    if document is None:
         raise HTTPException(404, f"No functions found in category '{category}'")
-    return {"functions": functions, "total": len(functions)}
+    return document_response(request, document)
+
+
+@app.get("/functions/retrieve")
+async def retrieve_functions(q: str, k: int = Query(5, ge=1, le=50)):
+    """Find the functions most relevant to a natural-language request
+
+    Returns the top-k functions by semantic similarity, with request schemas,
+    so a planner can prompt with a handful of candidates instead of the full
+    catalog.
+    """
+    results = [
+        {
+            **function_summary(name, DISCOVERED_FUNCTIONS[name]),
+            "schema": request_schema(name),
+            "score": round(score, 4)
+        }
+        for name, score in RETRIEVAL_INDEX.query(q, k)
+    ]
+    return {"results": results, "total": len(results), "query": q}
 
 
 @app.get("/functions/{function_name}")
-async def get_function_info(function_name: str):
+async def get_function_info(function_name: str, request: Request):
     """Get detailed information about a specific function"""
-    func_info = get_function_by_name(function_name)
-    if not func_info:
+    document = catalog.detail(function_name)
+    if document is None:
         raise HTTPException(404, f"Function '{function_name}' not found")
-    
-    return {
-        "name": func_info['name'],
-        "description": func_info['description'],
-        "category": func_info['category'],
-        "parameters": {
-            k: {
-                'type': format_type_name(v['type']),
-                'required': v['required'],
-                'default': v['default']
-            }
-            for k, v in func_info['parameters'].items()
-        }
-    }
+    return document_response(request, document)
 
 
 @app.get("/categories")
-async def list_categories():
+async def list_categories(request: Request):
     """Get all function categories"""
-    return {"categories": get_all_categories()}
+    return document_response(request, catalog.categories)
+
+
+@app.get("/startup")
+async def startup_report():
+    """Where boot time went: per-phase timings and discovery cache hits"""
+    return STARTUP.report()
+
+
+def component_metrics():
+    """Metric families owned by the pools, limiters, caches and job queue"""
+    pools = executor.stats()
+    yield ("registry_executor_pending", "gauge", "Calls running or waiting in a category thread pool",
+           [({"category": c}, s['pending']) for c, s in pools.items()])
+    yield ("registry_executor_rejected_total", "counter", "Calls rejected by a saturated thread pool",
+           [({"category": c}, s['rejected']) for c, s in pools.items()])
+    
+    limiters = limits.stats()
+    yield ("registry_limiter_in_flight", "gauge", "Calls holding a limiter slot",
+           [({"limiter": n}, s['in_flight']) for n, s in limiters.items()])
+    yield ("registry_limiter_queue_depth", "gauge", "Calls waiting for a limiter",
+           [({"limiter": n}, s['queue_depth']) for n, s in limiters.items()])
+    yield ("registry_limiter_admitted_total", "counter", "Calls admitted by a limiter",
+           [({"limiter": n}, s['admitted']) for n, s in limiters.items()])
+    yield ("registry_limiter_shed_total", "counter", "Calls shed by a limiter (429)",
+           [({"limiter": n}, s['shed']) for n, s in limiters.items()])
+    yield ("registry_limiter_wait_seconds_total", "counter", "Time admitted calls spent waiting",
+           [({"limiter": n}, s['wait_seconds_total']) for n, s in limiters.items()])
+    yield ("registry_limiter_wait_seconds_max", "gauge", "Longest wait of an admitted call",
+           [({"limiter": n}, s['wait_seconds_max']) for n, s in limiters.items()])
+    
+    cache = result_cache.stats()
+    for name in ("hits", "misses", "invalidations", "evictions"):
+        yield (f"registry_result_cache_{name}_total", "counter", f"Result cache {name}", [({}, cache[name])])
+    yield ("registry_result_cache_entries", "gauge", "Cached read results", [({}, cache['entries'])])
+    coalescing = single_flight.stats()
+    yield ("registry_coalesced_calls_total", "counter", "Calls that shared an in-flight execution",
+           [({}, coalescing['coalesced'])])
+    
+    job_stats = jobs.stats()
+    yield ("registry_jobs_queued", "gauge", "Jobs waiting for a worker", [({}, job_stats['queued'])])
+    yield ("registry_jobs_running", "gauge", "Jobs being executed", [({}, job_stats['running'])])
+    yield ("registry_jobs_completed_total", "counter", "Finished jobs by final status",
+           [({"status": s}, n) for s, n in job_stats['completed'].items()])
+    
+    replays = idempotency.stats()
+    yield ("registry_idempotent_replays_total", "counter", "Responses replayed for a repeated Idempotency-Key",
+           [({}, replays['replayed'])])
+
+
+metrics.register_collector(component_metrics)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Per-function call metrics and component gauges in the Prometheus text format"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/limits")
+async def limit_stats():
+    """Per-category/function limiter state: in flight, queue depth, wait times, shed calls"""
+    return limits.stats()
+
+
+@app.get("/state")
+async def state_stats():
+    """State backend in use, its open stores and, when journaled, WAL/snapshot state"""
+    return state_backend.describe()
+
+
+@app.get("/cache")
+async def cache_stats():
+    """Result cache hit/miss counters and single-flight coalescing counters"""
+    return {**result_cache.stats(), "single_flight": single_flight.stats()}
+
+
+def require_admin(token: Optional[str]) -> None:
+    """Admin endpoints don't exist without REGISTRY_ADMIN_TOKEN"""
+    if not profiler.enabled:
+        raise HTTPException(404, "Not Found")
+    if not admin_authorized(token):
+        raise HTTPException(403, "Invalid admin token")
+
+
+def profile_session_or_404():
+    if profiler.session is None:
+        raise HTTPException(404, "No profiling session")
+    return profiler.session
+
+
+@app.post("/admin/profile", include_in_schema=False)
+async def start_profile(request: ProfileRequest, x_admin_token: Optional[str] = Header(None)):
+    """Start profiling selected calls, replacing any previous session"""
+    require_admin(x_admin_token)
+    if request.function_name is not None and not get_function_by_name(request.function_name):
+        raise HTTPException(404, f"Function '{request.function_name}' not found")
+    session = profiler.start(
+        request.function_name,
+        request.calls,
+        request.sample_rate,
+        request.interval_ms / 1000 if request.interval_ms else SAMPLE_INTERVAL
+    )
+    return session.summary()
+
+
+@app.get("/admin/profile", include_in_schema=False)
+async def profile_status(x_admin_token: Optional[str] = Header(None)):
+    """Progress of the session, average phase timings and the hottest functions"""
+    require_admin(x_admin_token)
+    # Summaries merge the collected profiles, which is too slow for the loop
+    return await asyncio.to_thread(profile_session_or_404().summary)
+
+
+@app.delete("/admin/profile", include_in_schema=False)
+async def stop_profile(x_admin_token: Optional[str] = Header(None)):
+    """Stop selecting calls; collected results stay downloadable"""
+    require_admin(x_admin_token)
+    profile_session_or_404()
+    return await asyncio.to_thread(profiler.stop().summary)
+
+
+@app.get("/admin/profile/pstats", include_in_schema=False)
+async def download_pstats(x_admin_token: Optional[str] = Header(None)):
+    """Merged cProfile data, loadable with pstats.Stats(path) or snakeviz"""
+    require_admin(x_admin_token)
+    return Response(
+        await asyncio.to_thread(profile_session_or_404().pstats_bytes),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="registry.pstats"'}
+    )
+
+
+@app.get("/admin/profile/collapsed", include_in_schema=False)
+async def download_collapsed(x_admin_token: Optional[str] = Header(None)):
+    """Sampled stacks in collapsed format, for flamegraph.pl or speedscope"""
+    require_admin(x_admin_token)
+    return Response(
+        profile_session_or_404().sampler.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="registry.collapsed"'}
+    )
+
+
+@app.post("/batch")
+async def execute_batch(calls: List[BatchCall], max_concurrency: Optional[int] = None):
+    """Execute several independent function calls in one round trip"""
+    if len(calls) > BATCH_MAX_CALLS:
+        raise HTTPException(413, f"Batch exceeds the limit of {BATCH_MAX_CALLS} calls")
+    
+    results = await dispatch_batch([call.model_dump() for call in calls], max_concurrency)
+    succeeded = sum(1 for r in results if r['success'])
+    return CodecJSONResponse({
+        "results": results,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    })
+
+
+@app.post("/workflow")
+async def execute_workflow(request: WorkflowRequest):
+    """Run a DAG of steps, executing independent steps concurrently"""
+    try:
+        report = await run_workflow(
+            [step.model_dump() for step in request.steps],
+            request.max_concurrency
+        )
+    except WorkflowError as e:
+        raise HTTPException(422, str(e))
+    return CodecJSONResponse(report)
+
+
+@app.post("/map/{category}/{function_name}")
+async def map_function(
+    category: str,
+    function_name: str,
+    items: Union[List[Dict[str, Any]], Dict[str, List[Any]]] = Body(...),
+    max_concurrency: Optional[int] = None
+):
+    """Apply one function over many parameter sets, streaming NDJSON results
+
+    The body is either a list of parameter objects or an object of parallel
+    arrays (one array per parameter). Each output line is a result envelope
+    with the `index` of its parameter set, written as soon as the call finishes.
+    """
+    func_info = get_function_by_name(function_name)
+    if not func_info or func_info['category'] != category:
+        raise HTTPException(404, f"Function '{category}/{function_name}' not found")
+    
+    if isinstance(items, dict):
+        lengths = {len(column) for column in items.values()}
+        if len(lengths) > 1:
+            raise HTTPException(422, "All parameter arrays must have the same length")
+        names = list(items)
+        items = [dict(zip(names, row)) for row in zip(*items.values())]
+    
+    if len(items) > MAP_MAX_ITEMS:
+        raise HTTPException(413, f"Map exceeds the limit of {MAP_MAX_ITEMS} items")
+    
+    params_list = validate_many(func_info, items)
+    
+    async def stream():
+        async for index, envelope in dispatch_map(func_info, params_list, max_concurrency):
+            yield dumps({"index": index, **envelope}) + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def body_errors(e: ValidationError) -> List[Dict[str, Any]]:
+    """A request body's validation errors, located under "body" as typed routes report them"""
+    return [{**error, "loc": ["body", *error["loc"]]} for error in loads(e.json(include_url=False))]
+
+
+async def execute_call(
+    func_info: Dict[str, Any],
+    validate: Callable[[], Dict[str, Any]],
+    headers: Mapping[str, str],
+    request_bytes: Optional[int] = None,
+    traced_validate: Optional[Callable[[], Dict[str, Any]]] = None
+) -> Response:
+    """Validate the parameters, invoke the function and encode its envelope
+
+    `validate` produces the call's parameters (raising pydantic's
+    ValidationError); it runs here so profiled calls can time it. A route
+    whose body was validated before it ran passes `traced_validate`, the
+    full validation, to run in its place when the call is traced.
+    """
+    trace = profiler.begin(func_info['name'], headers) if profiler.enabled else None
+    if trace is None:
+        return await _execute_call(func_info, validate(), headers.get("idempotency-key"), request_bytes)
+    
+    trace.phase("validate")
+    token = current_trace.set(trace)
+    try:
+        params = (traced_validate or validate)()
+        trace.phase("execute")
+        response = await _execute_call(func_info, params, headers.get("idempotency-key"), request_bytes, trace)
+    finally:
+        current_trace.reset(token)
+        trace.finish()
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
+async def _execute_call(
+    func_info: Dict[str, Any],
+    params: Dict[str, Any],
+    idempotency_key: Optional[str] = None,
+    request_bytes: Optional[int] = None,
+    trace: Optional[CallTrace] = None
+) -> Response:
+    """Invoke a function and encode its envelope
+
+    With an Idempotency-Key the first response is stored and replayed for
+    retries, and concurrent duplicates wait for the original execution.
+    """
+    try:
+        if not idempotency_key:
+            envelope = await invoke(func_info, params)
+            if trace is not None:
+                trace.phase("serialize")
+            response = CodecJSONResponse(envelope)
+            metrics.observe_payload(func_info, request_bytes, len(response.body))
+            return response
+        
+        async def produce():
+            envelope = await invoke(func_info, params)
+            if trace is not None:
+                trace.phase("serialize")
+            # A failed call is answered but not stored, so a retry runs it again
+            return 200, dumps(envelope), envelope['success']
+        
+        status_code, body, replayed = await idempotency.run(
+            idempotency_key,
+            request_fingerprint(func_info['name'], params),
+            produce
+        )
+    except ExecutorSaturatedError as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+    except RateLimitedError as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": e.retry_after_header})
+    except IdempotencyError as e:
+        raise HTTPException(e.status_code, str(e))
+    headers = {REPLAYED_HEADER: "true"} if replayed else None
+    metrics.observe_payload(func_info, request_bytes, len(body))
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+@app.post("/jobs/{category}/{function_name}", status_code=202)
+async def submit_job(category: str, function_name: str, request: Request):
+    """Queue a call and return its job id immediately"""
+    func_info = get_function_by_name(function_name)
+    if not func_info or func_info['category'] != category:
+        raise HTTPException(404, f"Function '{category}/{function_name}' not found")
+    
+    try:
+        params = validate_json(func_info, await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(body_errors(e))
+    try:
+        job = await jobs.submit(func_info, params)
+    except (JobQueueFullError, JobWorkersStoppedError) as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+    return CodecJSONResponse(
+        {**job.to_dict(), "links": {"self": f"/jobs/{job.id}", "events": f"/jobs/{job.id}/events"}},
+        status_code=202,
+        headers={"Location": f"/jobs/{job.id}"}
+    )
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Job '{job_id}' not found")
+    return job
+
+
+@app.get("/jobs")
+async def job_stats():
+    """Job queue depth, running jobs and completion counts"""
+    return jobs.stats()
 
 
-# Auto-generate strongly-typed endpoints for each function
-for func_name, func_info in DISCOVERED_FUNCTIONS.items():
-    request_model = func_info['request_model']
-    func = func_info['function']
-    category = func_info['category']
-    description = func_info['description']
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a job, with its result once finished"""
+    return CodecJSONResponse(get_job_or_404(job_id).to_dict())
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: one event per status change, ending when the job finishes"""
+    job = get_job_or_404(job_id)
     
-    # Create endpoint path
-    endpoint_path = f"/{category}/{func_name}"
+    async def stream():
+        async for state in job.changes():
+            if state is None:
+                yield b": keep-alive\n\n"
+            else:
+                yield b"event: " + state['status'].encode() + b"\ndata: " + dumps(state) + b"\n\n"
     
-    # Create the endpoint function with proper typing
-    def create_endpoint(fn=func, fn_name=func_name, req_model=request_model):
-        async def endpoint(request: req_model) -> Dict[str, Any]:
-            """
-            Execute the function with validated parameters
-            """
-            try:
-                # Convert Pydantic model to dict and call function
-                params = request.dict(exclude_none=True)
-                result = fn(**params)
-                
-                return {
-                    "function_name": fn_name,
-                    "result": result,
-                    "success": True
-                }
-            except Exception as e:
-                return {
-                    "function_name": fn_name,
-                    "result": None,
-                    "success": False,
-                    "error": str(e)
-                }
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = get_job_or_404(job_id)
+    await jobs.cancel(job)
+    return CodecJSONResponse(job.to_dict())
+
+
+def register_typed_routes():
+    """Auto-generate strongly-typed endpoints for each function"""
+    for func_name, func_info in DISCOVERED_FUNCTIONS.items():
+        request_model = func_info['request_model']
+        category = func_info['category']
+        description = func_info['description']
         
-        # Set proper metadata
-        endpoint.__name__ = fn_name
-        endpoint.__doc__ = description
-        return endpoint
+        # Create endpoint path
+        endpoint_path = f"/{category}/{func_name}"
+        
+        # Create the endpoint function with proper typing
+        def create_endpoint(fn_info=func_info, fn_name=func_name, req_model=request_model):
+            async def endpoint(
+                request: req_model,
+                http_request: Request,
+                idempotency_key: Optional[str] = Header(None),
+                content_length: Optional[int] = Header(None, include_in_schema=False)
+            ) -> Dict[str, Any]:
+                """
+                Execute the function with validated parameters
+                """
+                # Convert Pydantic model to dict; sync functions run in
+                # their category's thread pool, async ones on the loop.
+                # FastAPI has already validated the body (and kept it), so a
+                # traced call validates it again to time what that costs
+                body = await http_request.body()
+                return await execute_call(
+                    fn_info,
+                    lambda: request.model_dump(exclude_none=True),
+                    http_request.headers,
+                    content_length,
+                    traced_validate=lambda: validate_json(fn_info, body)
+                )
+            
+            # Set proper metadata
+            endpoint.__name__ = fn_name
+            endpoint.__doc__ = description
+            return endpoint
+        
+        # Register the endpoint
+        app.post(
+            endpoint_path,
+            summary=description,
+            tags=[category],
+            name=func_name
+        )(create_endpoint())
+
+
+def register_lazy_route():
+    """Single execution endpoint for lazy mode
+
+    Request models don't exist until a category is first called, so the body
+    is validated here instead of by per-function typed routes.
+    """
+    @app.post("/{category}/{function_name}")
+    async def execute_function(category: str, function_name: str, request: Request) -> Dict[str, Any]:
+        """Execute a function, loading its category on first use"""
+        func_info = get_function_by_name(function_name)
+        if not func_info or func_info['category'] != category:
+            raise HTTPException(404, f"Function '{category}/{function_name}' not found")
+        
+        body = await request.body()
+        try:
+            return await execute_call(
+                func_info, lambda: validate_json(func_info, body), request.headers, len(body)
+            )
+        except ValidationError as e:
+            raise RequestValidationError(body_errors(e))
+
+
+async def execute_raw(request: Request) -> Response:
+    """Execute a function without FastAPI's request handling
+
+    A plain Starlette endpoint: the body is parsed and validated in one
+    pydantic-core pass and no dependency resolution or response-model
+    serialization runs. Responses match the typed endpoints, including the
+    "body" prefix of validation error locations; only the message for
+    malformed JSON is pydantic's rather than FastAPI's.
+    """
+    category = request.path_params['category']
+    function_name = request.path_params['function_name']
+    func_info = DISCOVERED_FUNCTIONS.get(function_name)
+    if func_info is None or func_info['category'] != category:
+        return CodecJSONResponse(
+            {"detail": f"Function '{category}/{function_name}' not found"},
+            status_code=404
+        )
     
-    # Register the endpoint
-    app.post(
-        endpoint_path,
-        summary=description,
-        tags=[category],
-        name=func_name
-    )(create_endpoint())
+    body = await request.body()
+    try:
+        return await execute_call(func_info, lambda: validate_json(func_info, body), request.headers, len(body))
+    except ValidationError as e:
+        return CodecJSONResponse({"detail": body_errors(e)}, status_code=422)
+
+
+with STARTUP.phase("register_routes"):
+    app.add_route(
+        "/{category}/{function_name}/raw",
+        execute_raw,
+        methods=["POST"],
+        include_in_schema=False
+    )
+    if LAZY_LOADING:
+        register_lazy_route()
+    else:
+        register_typed_routes()
+
+STARTUP.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+"""
+Per-function call metrics in the Prometheus text format
+Every dispatched call is recorded with its latency, outcome and in-flight
+count. The execution endpoints also record request/response payload sizes.
+All recording happens on the event loop thread, so the counters are plain
+ints in dicts and need no locks. Gauges owned by other components (thread
+pools, limiters, caches, jobs) are pulled through collectors at scrape time.
+"""
+import bisect
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Seconds; covers cache hits (sub-millisecond) up to slow integrations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Dict[str, str]
+Sample = Tuple[Labels, float]
+
+
+class Histogram:
+    """Fixed-bucket histogram"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One extra bucket for +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                if index == len(self.bounds):
+                    return lower
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+
+class FunctionStats:
+    __slots__ = ("category", "calls", "errors", "in_flight", "latency", "request_bytes", "response_bytes")
+
+    def __init__(self, category: str):
+        self.category = category
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+
+def _histogram_family(lines: List[str], name: str, help_text: str,
+                      series: Iterable[Tuple[Labels, Histogram]]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in series:
+        cumulative = 0
+        for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+
+# A collector returns (name, type, help, samples) families rendered at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]
+
+
+class Metrics:
+    """Registry-wide call metrics, keyed by function name"""
+
+    def __init__(self):
+        self._functions: Dict[str, FunctionStats] = {}
+        self._collectors: List[Collector] = []
+        self.started_at = time.time()
+
+    def _stats(self, func_info: Dict[str, Any]) -> FunctionStats:
+        stats = self._functions.get(func_info['name'])
+        if stats is None:
+            stats = self._functions[func_info['name']] = FunctionStats(func_info['category'])
+        return stats
+
+    def call_started(self, func_info: Dict[str, Any]) -> float:
+        self._stats(func_info).in_flight += 1
+        return time.perf_counter()
+
+    def call_finished(self, func_info: Dict[str, Any], started: float, success: bool) -> None:
+        stats = self._stats(func_info)
+        stats.in_flight -= 1
+        stats.calls += 1
+        if not success:
+            stats.errors += 1
+        stats.latency.observe(time.perf_counter() - started)
+
+    def observe_payload(self, func_info: Dict[str, Any], request_bytes: Optional[int], response_bytes: int) -> None:
+        stats = self._stats(func_info)
+        if request_bytes is not None:
+            stats.request_bytes.observe(request_bytes)
+        stats.response_bytes.observe(response_bytes)
+
+    def register_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)"""
+        series = sorted(self._functions.items())
+
+        def labelled(name: str, stats: FunctionStats) -> Labels:
+            return {"function": name, "category": stats.category}
+
+        lines: List[str] = []
+        _family(lines, "registry_calls_total", "counter", "Function calls dispatched",
+                ((labelled(n, s), s.calls) for n, s in series))
+        _family(lines, "registry_call_errors_total", "counter",
+                "Function calls that returned success=false or were shed",
+                ((labelled(n, s), s.errors) for n, s in series))
+        _family(lines, "registry_calls_in_flight", "gauge", "Function calls currently executing",
+                ((labelled(n, s), s.in_flight) for n, s in series))
+        _histogram_family(lines, "registry_call_duration_seconds", "Function call latency",
+                          ((labelled(n, s), s.latency) for n, s in series))
+        _family(lines, "registry_call_duration_quantile_seconds", "gauge",
+                "Latency quantiles estimated from the histogram buckets",
+                (({**labelled(n, s), "quantile": str(q)}, s.latency.quantile(q))
+                 for n, s in series if s.latency.count for q in QUANTILES))
+        _histogram_family(lines, "registry_request_bytes", "Execution request body size",
+                          ((labelled(n, s), s.request_bytes) for n, s in series if s.request_bytes.count))
+        _histogram_family(lines, "registry_response_bytes", "Execution response body size",
+                          ((labelled(n, s), s.response_bytes) for n, s in series if s.response_bytes.count))
+        _family(lines, "registry_uptime_seconds", "gauge", "Seconds since the registry started",
+                [({}, round(time.time() - self.started_at, 3))])
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                _family(lines, name, kind, help_text, samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -1,5 +1,5 @@
 from typing import Dict, List, Any, Optional, Callable
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Function(BaseModel):
@@ -56,7 +56,44 @@ class FunctionExecuteRequest(BaseModel):
 class FunctionExecuteResponse(BaseModel):
     """Response model for function execution"""
     function_name: str
-    result: str
+    result: Any
     success: bool
     error: Optional[str] = None
 
+
+
+class BatchCall(BaseModel):
+    """A single call inside a batch execution request"""
+    function_name: str
+    params: Dict[str, Any] = {}
+
+
+class WorkflowStep(BaseModel):
+    """A step in a workflow DAG
+
+    Values in `params` may be {"$ref": step_id, "path": "$.json.path"}
+    references to earlier step results; referenced steps are implicit
+    dependencies in addition to `depends_on`.
+    """
+    id: str
+    function_name: str
+    params: Dict[str, Any] = {}
+    depends_on: List[str] = []
+
+
+class WorkflowRequest(BaseModel):
+    """Request model for running a workflow"""
+    steps: List[WorkflowStep]
+    max_concurrency: Optional[int] = None
+
+
+class ProfileRequest(BaseModel):
+    """An on-demand profiling session
+
+    Profiles the next `calls` calls to `function_name` (any function if
+    omitted), or a `sample_rate` fraction of calls until stopped.
+    """
+    function_name: Optional[str] = None
+    calls: Optional[int] = Field(None, ge=1)
+    sample_rate: float = Field(1.0, gt=0.0, le=1.0)
+    interval_ms: Optional[float] = Field(None, ge=0.1, le=1000.0)
@@ -0,0 +1,301 @@
+"""
+On-demand profiling of the execution hot path
+Admin-only (REGISTRY_ADMIN_TOKEN, sent as X-Admin-Token). An admin starts a
+session that selects the next N calls to one function, or a percentage of
+all calls. For each selected call:
+
+- the function body runs under cProfile; results are merged into one
+  pstats dump when they are read, off the event loop
+- a sampler thread records the executing thread's stack every few
+  milliseconds, for a collapsed-stack (flamegraph) export
+- validate / execute / serialize timings go in a Server-Timing header
+
+An admin can also request the Server-Timing header for any single call with
+X-Registry-Debug: timing. With no admin token configured, none of this code
+runs: the hot path checks one module-level flag.
+"""
+import cProfile
+import contextvars
+import hmac
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+from settings import env_float
+
+
+ADMIN_TOKEN = os.environ.get("REGISTRY_ADMIN_TOKEN", "")
+SAMPLE_INTERVAL = env_float("REGISTRY_PROFILE_SAMPLE_INTERVAL", 0.001)
+
+ADMIN_HEADER = "x-admin-token"
+DEBUG_HEADER = "x-registry-debug"
+
+# Trace of the call being executed, read by executor.execute
+current_trace: contextvars.ContextVar[Optional["CallTrace"]] = contextvars.ContextVar(
+    "registry_call_trace", default=None
+)
+
+
+def admin_authorized(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{code.co_name} ({module}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Background thread sampling the stacks of registered threads"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="registry-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Ask the thread to exit; it does so within one interval
+
+        Doesn't wait for it: this is called on the event loop.
+        """
+        self._stop.set()
+
+    @contextmanager
+    def watching(self, thread_id: int) -> Iterator[None]:
+        """Sample `thread_id` for the duration of the block"""
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[thread_id] -= 1
+                if not self._threads[thread_id]:
+                    del self._threads[thread_id]
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                watched = list(self._threads)
+            if not watched:
+                continue
+            frames = sys._current_frames()
+            collected = []
+            for thread_id in watched:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                collected.append(";".join(reversed(stack)))
+            with self._lock:
+                self.stacks.update(collected)
+                self.samples += len(collected)
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        with self._lock:
+            items = sorted(self.stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+
+class CallTrace:
+    """Phase timings (and, for sampled calls, profiles) of one call"""
+
+    __slots__ = ("function_name", "session", "phases", "_phase", "_phase_started", "profile")
+
+    def __init__(self, function_name: str, session: Optional["ProfileSession"]):
+        self.function_name = function_name
+        self.session = session
+        self.phases: Dict[str, float] = {}
+        self._phase: Optional[str] = None
+        self._phase_started = 0.0
+        self.profile: Optional[cProfile.Profile] = None
+
+    @property
+    def sampled(self) -> bool:
+        return self.session is not None
+
+    def phase(self, name: Optional[str]) -> None:
+        """End the current phase and start `name` (None just ends it)"""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + now - self._phase_started
+        self._phase = name
+        self._phase_started = now
+
+    def wrap_sync(self, fn: Callable) -> Callable:
+        """Profile and sample a sync function in whichever thread runs it"""
+        def profiled(**params):
+            profile = cProfile.Profile()
+            with self.session.sampler.watching(threading.get_ident()):
+                try:
+                    return profile.runcall(fn, **params)
+                finally:
+                    self.profile = profile
+        return profiled
+
+    @contextmanager
+    def sampling_loop(self) -> Iterator[None]:
+        """Sample the event loop thread while an async function runs
+
+        Other tasks on the loop show up in these samples too.
+        """
+        with self.session.sampler.watching(threading.get_ident()):
+            yield
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.phases.items())
+
+    def finish(self) -> None:
+        self.phase(None)
+        if self.session is not None:
+            self.session.record(self)
+
+
+class ProfileSession:
+    """Selects calls to profile and accumulates their results"""
+
+    def __init__(self, function_name: Optional[str], calls: Optional[int], sample_rate: float,
+                 interval: float = SAMPLE_INTERVAL):
+        self.function_name = function_name
+        self.remaining = calls
+        self.sample_rate = sample_rate
+        self.sampler = StackSampler(interval)
+        self.started_at = time.time()
+        self.profiled = 0
+        self.phase_totals: Dict[str, float] = {}
+        self._stats: Optional[pstats.Stats] = None
+        # Profiles of recorded calls, merged into _stats when results are read
+        self._pending: List[cProfile.Profile] = []
+        self._merge_lock = threading.Lock()
+        self.active = True
+        self.sampler.start()
+
+    def select(self, function_name: str) -> bool:
+        if not self.active:
+            return False
+        if self.function_name is not None and function_name != self.function_name:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.remaining is not None:
+            self.remaining -= 1
+            if self.remaining <= 0:
+                # Last selected call; results stay available for download
+                self.active = False
+        return True
+
+    def record(self, trace: CallTrace) -> None:
+        """Account for a finished call; runs on the event loop, so stays cheap"""
+        self.profiled += 1
+        for name, seconds in trace.phases.items():
+            self.phase_totals[name] = self.phase_totals.get(name, 0.0) + seconds
+        if trace.profile is not None:
+            with self._merge_lock:
+                self._pending.append(trace.profile)
+        if not self.active and self.remaining is not None:
+            self.sampler.stop()
+
+    def _merged(self) -> Optional[pstats.Stats]:
+        """Merge pending profiles into the session's stats; slow, run it in a thread"""
+        with self._merge_lock:
+            pending, self._pending = self._pending, []
+            for profile in pending:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            return self._stats
+
+    def stop(self) -> None:
+        self.active = False
+        self.sampler.stop()
+
+    def pstats_bytes(self) -> bytes:
+        """Merged profile in the format written by pstats.Stats.dump_stats"""
+        stats = self._merged()
+        return marshal.dumps(stats.stats if stats is not None else {})
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        stats = self._merged()
+        if stats is None:
+            return []
+        rows = []
+        for (filename, line, name), (_cc, calls, tottime, cumtime, _callers) in stats.stats.items():
+            rows.append({
+                "function": f"{name} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3)
+            })
+        rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+        return rows[:limit]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "function_name": self.function_name,
+            "remaining": self.remaining,
+            "sample_rate": self.sample_rate,
+            "started_at": self.started_at,
+            "profiled_calls": self.profiled,
+            "samples": self.sampler.samples,
+            "phase_avg_ms": {
+                name: round(seconds * 1000 / self.profiled, 3)
+                for name, seconds in self.phase_totals.items()
+            } if self.profiled else {},
+            "top": self.top()
+        }
+
+
+class Profiler:
+    """Entry point used by the execution endpoints"""
+
+    def __init__(self, enabled: bool):
+        # False when no admin token is configured: nothing below is reachable
+        self.enabled = enabled
+        self.session: Optional[ProfileSession] = None
+
+    def begin(self, function_name: str, headers: Mapping[str, str]) -> Optional[CallTrace]:
+        """Start a trace if this call is profiled or an admin asked for timings"""
+        session = self.session
+        if session is not None and session.select(function_name):
+            return CallTrace(function_name, session)
+        if headers.get(DEBUG_HEADER) == "timing" and admin_authorized(headers.get(ADMIN_HEADER)):
+            return CallTrace(function_name, None)
+        return None
+
+    def start(self, function_name: Optional[str], calls: Optional[int], sample_rate: float,
+              interval: float = SAMPLE_INTERVAL) -> ProfileSession:
+        if self.session is not None:
+            self.session.stop()
+        self.session = ProfileSession(function_name, calls, sample_rate, interval)
+        return self.session
+
+    def stop(self) -> Optional[ProfileSession]:
+        if self.session is not None:
+            self.session.stop()
+        return self.session
+
+
+profiler = Profiler(enabled=bool(ADMIN_TOKEN))
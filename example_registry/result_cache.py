@@ -0,0 +1,156 @@
+"""
+Read-through cache for the results of read-only functions
+Results are keyed by function name plus validated parameters. Validated
+parameters are normalized: defaults are filled in, None values are dropped
+and keys follow the request model's field order. Entries expire after a TTL,
+and the least recently used entries are evicted beyond a size limit.
+
+Results are stored encoded, and hits return them as RawJSON. Callers may
+mutate the results they get (workflow steps receive parts of them as
+params), and an encoded copy can't be changed through any of them.
+
+A successful write drops the cached reads it could have changed. A write
+with resource parameters (see functions/access.py) drops that resource's
+reads and the category-wide reads. A write without resource parameters drops
+the whole category.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from json_codec import dumps, RawJSON
+from settings import env_float, env_int
+
+
+RESULT_CACHE_TTL = env_float("REGISTRY_RESULT_CACHE_TTL", 30.0)
+# The cache is per process. With a state backend shared by several workers
+# (sqlite, shm) a write in one worker can't invalidate another's entries, so
+# there it is off unless a size is set explicitly. 0 turns the cache off
+SHARED_STATE = os.environ.get("REGISTRY_STATE_BACKEND", "memory") != "memory"
+RESULT_CACHE_SIZE = env_int("REGISTRY_RESULT_CACHE_SIZE", 0 if SHARED_STATE else 1024)
+
+# Returned by `get` on a miss (None is a valid cached result)
+MISS = object()
+
+Bucket = Tuple[str, Optional[tuple]]
+
+
+class _Entry:
+    __slots__ = ("result", "expires_at", "bucket")
+
+    def __init__(self, result: Any, expires_at: float, bucket: Bucket):
+        self.result = result
+        self.expires_at = expires_at
+        self.bucket = bucket
+
+
+def _resource(func_info: Dict[str, Any], params: Dict[str, Any]) -> Optional[tuple]:
+    resource_params = func_info.get('resource_params')
+    if not resource_params:
+        return None
+    return tuple(params.get(name) for name in resource_params)
+
+
+class ResultCache:
+    """LRU + TTL cache of read results, invalidated by writes
+
+    All methods run on the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], _Entry]" = OrderedDict()
+        self._buckets: Dict[Bucket, Set[Tuple[str, bytes]]] = {}
+        # Bumped on every write, so a read that overlapped one isn't stored
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def generation(self, category: str) -> int:
+        return self._generations.get(category, 0)
+
+    @staticmethod
+    def key(func_info: Dict[str, Any], params: Dict[str, Any]) -> Tuple[str, bytes]:
+        return func_info['name'], dumps(params)
+
+    def _discard(self, key: Tuple[str, bytes]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._buckets.get(entry.bucket)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._buckets[entry.bucket]
+
+    def get(self, func_info: Dict[str, Any], params: Dict[str, Any]) -> Any:
+        """The cached result as RawJSON, or MISS"""
+        key = self.key(func_info, params)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return MISS
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.result
+
+    def put(self, func_info: Dict[str, Any], params: Dict[str, Any], result: Any, generation: int) -> None:
+        """Store a read result computed while `generation` was current"""
+        category = func_info['category']
+        if generation != self.generation(category):
+            return
+        key = self.key(func_info, params)
+        self._discard(key)
+        bucket = (category, _resource(func_info, params))
+        if not isinstance(result, RawJSON):
+            result = RawJSON(dumps(result))
+        self._entries[key] = _Entry(result, time.monotonic() + self.ttl, bucket)
+        self._buckets.setdefault(bucket, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, func_info: Dict[str, Any], params: Dict[str, Any]) -> None:
+        """Drop the cached reads a successful write may have changed"""
+        category = func_info['category']
+        self._generations[category] = self.generation(category) + 1
+        resource = _resource(func_info, params)
+        if resource is None:
+            buckets = [bucket for bucket in self._buckets if bucket[0] == category]
+        else:
+            buckets = [(category, resource), (category, None)]
+        for bucket in buckets:
+            for key in list(self._buckets.get(bucket, ())):
+                self._discard(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions
+        }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,118 @@
+"""
+Local semantic retrieval over function descriptions
+Each function is embedded as a sparse TF-IDF vector of hashed features (whole
+words plus character trigrams, so "invite" and "invitation" overlap) and
+queries are ranked by cosine similarity. Everything is computed in-process
+with no model download, and functions can be added at any time.
+"""
+import heapq
+import math
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+
+# Size of the hashed feature space; collisions are rare at registry scale
+FEATURE_SPACE = 1 << 20
+
+WORD_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _feature(kind: str, text: str) -> int:
+    # crc32 rather than hash(): stable across processes and restarts
+    return zlib.crc32(f"{kind}:{text}".encode()) % FEATURE_SPACE
+
+
+def embed_text(text: str) -> Dict[int, float]:
+    """Term-frequency vector of hashed word and character-trigram features"""
+    vector: Dict[int, float] = {}
+    for word in _WORD.findall(text.lower()):
+        feature = _feature("w", word)
+        vector[feature] = vector.get(feature, 0.0) + WORD_WEIGHT
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            feature = _feature("c", padded[i:i + 3])
+            vector[feature] = vector.get(feature, 0.0) + TRIGRAM_WEIGHT
+    return vector
+
+
+class VectorIndex:
+    """Incrementally updatable TF-IDF index with cosine-similarity queries
+
+    Term frequencies are stored raw and IDF is applied at query time, so
+    adding a document only touches its own features; document norms are
+    refreshed lazily on the next query after the corpus changes.
+    """
+
+    def __init__(self):
+        self._documents: Dict[str, Dict[int, float]] = {}
+        self._postings: Dict[int, Dict[str, float]] = {}
+        self._norms: Dict[str, float] = {}
+        self._stale = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._documents
+
+    def add(self, key: str, text: str) -> None:
+        """Add or replace the document stored under `key`"""
+        if key in self._documents:
+            self.remove(key)
+        vector = embed_text(text)
+        self._documents[key] = vector
+        for feature, weight in vector.items():
+            self._postings.setdefault(feature, {})[key] = weight
+        self._stale = True
+
+    def remove(self, key: str) -> None:
+        vector = self._documents.pop(key, None)
+        if vector is None:
+            return
+        for feature in vector:
+            postings = self._postings[feature]
+            del postings[key]
+            if not postings:
+                del self._postings[feature]
+        self._norms.pop(key, None)
+        self._stale = True
+
+    def _idf(self, feature: int) -> float:
+        return math.log((1 + len(self._documents)) / (1 + len(self._postings[feature]))) + 1.0
+
+    def _refresh_norms(self) -> None:
+        idf = {feature: self._idf(feature) for feature in self._postings}
+        self._norms = {
+            key: math.sqrt(sum((weight * idf[feature]) ** 2 for feature, weight in vector.items()))
+            for key, vector in self._documents.items()
+        }
+        self._stale = False
+
+    def query(self, text: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Return the `k` most similar documents as (key, cosine similarity)"""
+        if self._stale:
+            self._refresh_norms()
+
+        query_vector = {}
+        for feature, weight in embed_text(text).items():
+            if feature in self._postings:
+                query_vector[feature] = weight * self._idf(feature)
+        query_norm = math.sqrt(sum(weight ** 2 for weight in query_vector.values()))
+        if not query_norm:
+            return []
+
+        scores: Dict[str, float] = {}
+        for feature, query_weight in query_vector.items():
+            idf = self._idf(feature)
+            for key, weight in self._postings[feature].items():
+                scores[key] = scores.get(key, 0.0) + query_weight * weight * idf
+
+        return heapq.nsmallest(
+            k,
+            ((key, score / (query_norm * self._norms[key])) for key, score in scores.items()),
+            key=lambda item: (-item[1], item[0])
+        )
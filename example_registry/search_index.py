@@ -0,0 +1,160 @@
+"""
+Inverted index for ranked function search
+Built once at discovery time over each function's name, description, category
+and parameter names. Query terms match whole tokens, token prefixes and (for
+terms of three or more characters) substrings via a trigram index, and
+results are ranked by field-weighted TF-IDF.
+"""
+import bisect
+import math
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+# Relative importance of a term appearing in each field
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'category': 2.0,
+    'parameters': 1.5,
+    'description': 1.0,
+}
+
+# Weaker kinds of match count for less than an exact token match
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+SUBSTRING_MATCH = 0.4
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "by", "for", "from", "in", "into", "of", "on", "or",
+    "the", "to", "with"
+})
+
+# Bound on memoized term expansions, so arbitrary queries can't grow memory
+MAX_CACHED_EXPANSIONS = 10000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split on anything that isn't a letter or digit (incl. `_`)"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """Field-weighted inverted index over discovered functions"""
+
+    def __init__(self, functions: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._categories: Dict[str, Set[str]] = {}
+        self._expansions: Dict[str, List[Tuple[str, float]]] = {}
+        self._count = 0
+        for name, info in (functions or {}).items():
+            self.add(name, info)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, name: str, info: Dict[str, Any]) -> None:
+        """Index one function (re-adding a name is not supported)"""
+        fields = {
+            'name': name,
+            'category': info['category'],
+            'parameters': " ".join(info['parameters']),
+            'description': info['description'],
+        }
+        weights: Dict[str, float] = {}
+        for field, text in fields.items():
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._vocabulary, token)
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+            postings[name] = weight
+
+        self._categories.setdefault(info['category'], set()).add(name)
+        self._count += 1
+        # Expansions depend on the vocabulary, which just changed
+        self._expansions.clear()
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """Find the indexed tokens a query term matches, with match strength"""
+        cached = self._expansions.get(term)
+        if cached is not None:
+            return cached
+
+        matches: Dict[str, float] = {}
+        if term in self._postings:
+            matches[term] = EXACT_MATCH
+
+        position = bisect.bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            matches.setdefault(self._vocabulary[position], PREFIX_MATCH)
+            position += 1
+
+        if len(term) >= 3:
+            grams = trigrams(term)
+            candidates = set.intersection(*(self._trigrams.get(gram, set()) for gram in grams))
+            for token in candidates:
+                if term in token:
+                    matches.setdefault(token, SUBSTRING_MATCH)
+
+        expansion = list(matches.items())
+        if len(self._expansions) >= MAX_CACHED_EXPANSIONS:
+            self._expansions.clear()
+        self._expansions[term] = expansion
+        return expansion
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + len(self) / len(self._postings[token]))
+
+    def search(self, query: str, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Rank functions for a query, best first
+
+        Every function matching at least one term is returned; the score is
+        scaled by the fraction of query terms matched so functions covering
+        the whole query rank first. `category` restricts results to one
+        category.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        allowed: Optional[Set[str]] = None
+        if category is not None:
+            allowed = self._categories.get(category, set())
+            if not allowed:
+                return []
+
+        scores: Dict[str, float] = {}
+        matched_terms: Dict[str, int] = {}
+        for term in terms:
+            best: Dict[str, float] = {}
+            for token, strength in self._expand(term):
+                idf = self._idf(token)
+                for name, weight in self._postings[token].items():
+                    if allowed is not None and name not in allowed:
+                        continue
+                    score = strength * weight * idf
+                    if score > best.get(name, 0.0):
+                        best[name] = score
+            for name, score in best.items():
+                scores[name] = scores.get(name, 0.0) + score
+                matched_terms[name] = matched_terms.get(name, 0) + 1
+
+        ranked = [
+            (name, score * matched_terms[name] / len(terms))
+            for name, score in scores.items()
+        ]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
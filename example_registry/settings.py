@@ -0,0 +1,64 @@
+"""
+Runtime configuration read from environment variables
+All settings have sensible defaults so the registry runs with no configuration.
+"""
+import os
+from typing import Any, Callable, Dict, List
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to the default when unset"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting, falling back to the default when unset"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean setting (1/true/yes/on are truthy)"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name: str) -> List[str]:
+    """Read a comma-separated setting into a list of non-empty strings"""
+    value = os.environ.get(name, "")
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _env_mapping(name: str, convert: Callable[[str], Any]) -> Dict[str, Any]:
+    value = os.environ.get(name, "")
+    mapping = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, number = item.partition("=")
+        mapping[key.strip()] = convert(number)
+    return mapping
+
+
+def env_int_mapping(name: str) -> Dict[str, int]:
+    """Read a `key=value,key=value` setting into a dict of ints
+
+    Example: REGISTRY_EXECUTOR_POOL_SIZES="salesforce=4,github=8"
+    """
+    return _env_mapping(name, int)
+
+
+def env_float_mapping(name: str) -> Dict[str, float]:
+    """Read a `key=value,key=value` setting into a dict of floats
+
+    Example: REGISTRY_LIMIT_RATE="github=10,slack=0.5"
+    """
+    return _env_mapping(name, float)
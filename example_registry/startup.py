@@ -0,0 +1,57 @@
+"""
+Startup timing report
+Import-time work (function imports, introspection, model building, indexing,
+route registration) is recorded per phase so it is visible where boot time
+goes. The report is logged once the app is built and served at /startup.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+logger = logging.getLogger("registry.startup")
+
+
+class StartupTimer:
+    """Accumulates wall time per named phase, plus simple counters"""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block; repeated phases with the same name add up"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self) -> None:
+        """Mark startup complete and log the report"""
+        self._finished = time.perf_counter()
+        report = self.report()
+        phases = ", ".join(f"{name}={ms:.1f}ms" for name, ms in report['phases_ms'].items())
+        logger.info("Startup took %.1fms (%s)", report['total_ms'], phases)
+
+    def report(self) -> Dict[str, Any]:
+        end = self._finished if self._finished is not None else time.perf_counter()
+        total = end - self._started
+        return {
+            "total_ms": round(total * 1000, 3),
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            # Library imports and anything else outside a named phase
+            "unaccounted_ms": round((total - sum(self.phases.values())) * 1000, 3),
+            "counters": dict(self.counters),
+            "complete": self._finished is not None
+        }
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,73 @@
+"""Regression tests for the service mocks in functions/"""
+from functions.github import (
+    github_commit_file, github_create_branch, github_create_pr, github_get_file, github_list_branches,
+    github_list_prs, github_merge_pr
+)
+from functions.google_services import google_sheets_append, google_sheets_read
+from functions.mailing_list import add_to_mailing_list, list_all_mailing_lists, remove_from_mailing_list
+from functions.salesforce import salesforce_create, salesforce_query
+from functions.slack import slack_list_messages
+
+
+def head_sha(branch: str) -> str:
+    branches = github_list_branches("myorg", "main-app")["branches"]
+    return next(b["commit"]["sha"] for b in branches if b["name"] == branch)
+
+
+def test_sheet_rows_are_returned_as_appended():
+    rows = [["a", 1], 7, "plain", {"key": "value"}]
+    google_sheets_append("test-sheet", "A1", rows)
+    assert google_sheets_read("test-sheet", "A1") == rows
+    assert google_sheets_read("test-sheet", "B1") == []
+    assert google_sheets_read("missing-sheet", "A1") == []
+
+
+def test_committed_file_is_read_back():
+    github_commit_file("myorg", "main-app", "docs/test.md", "hello", "add docs", "develop")
+    result = github_get_file("myorg", "main-app", "docs/test.md", "develop")
+    assert result["ok"] and result["content"] == "hello"
+    assert github_get_file("myorg", "main-app", "docs/test.md", "main")["error"] == "file_not_found"
+    assert github_get_file("myorg", "main-app", "README.md", "no-such-branch")["error"] == "branch_not_found"
+
+
+def test_branch_copies_the_base_files():
+    github_commit_file("myorg", "main-app", "copied.md", "copy me", "add", "main")
+    created = github_create_branch("myorg", "main-app", "test/copy", head_sha("main"))
+    assert created["ok"]
+    assert github_get_file("myorg", "main-app", "copied.md", "test/copy")["content"] == "copy me"
+    assert github_create_branch("myorg", "main-app", "test/copy", head_sha("main"))["error"] == "branch_already_exists"
+    assert "test/copy" in {b["name"] for b in github_list_branches("myorg", "main-app")["branches"]}
+
+
+def test_merge_copies_head_files_to_base():
+    github_create_branch("myorg", "main-app", "test/merge", head_sha("main"))
+    github_commit_file("myorg", "main-app", "merged.md", "merged", "add", "test/merge")
+    pr = github_create_pr("myorg", "main-app", "test merge", "test/merge", "main", "")
+    assert github_merge_pr("myorg", "main-app", pr["number"])["ok"]
+    assert github_get_file("myorg", "main-app", "merged.md", "main")["content"] == "merged"
+    assert github_merge_pr("myorg", "main-app", pr["number"])["error"] == "pull_request_not_open"
+    merged = [p for p in github_list_prs("myorg", "main-app", "closed")["pull_requests"] if p["number"] == pr["number"]]
+    assert merged and merged[0]["merged"]
+
+
+def test_mailing_list_counts():
+    for i in range(3):
+        add_to_mailing_list("test-counts", f"user{i}@example.com")
+    remove_from_mailing_list("test-counts", "user0@example.com")
+    counts = {item["name"]: item["member_count"] for item in list_all_mailing_lists()["mailing_lists"]}
+    assert counts["test-counts"] == 2
+
+
+def test_non_positive_message_limit_is_rejected():
+    assert slack_list_messages("C001", 0) == {"ok": False, "error": "invalid_limit"}
+    assert slack_list_messages("C001", -1) == {"ok": False, "error": "invalid_limit"}
+    assert len(slack_list_messages("C001", 1)["messages"]) == 1
+
+
+def test_duplicate_salesforce_id_is_rejected():
+    assert salesforce_create("TestObject", {"Id": "test-id-1", "Name": "first"})["success"]
+    duplicate = salesforce_create("TestObject", {"Id": "test-id-1", "Name": "second"})
+    assert not duplicate["success"]
+    assert duplicate["errors"][0]["statusCode"] == "DUPLICATE_VALUE"
+    records = salesforce_query("SELECT * FROM TestObject WHERE Id = 'test-id-1'")["records"]
+    assert [record["Name"] for record in records] == ["first"]
@@ -0,0 +1,128 @@
+"""Idempotency-Key replay, conflicts and lease expiry"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from idempotency import (
+    Idempotency, IdempotencyError, MemoryIdempotencyStore, SQLiteIdempotencyStore, REPLAYED_HEADER
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryIdempotencyStore()
+    return SQLiteIdempotencyStore(str(tmp_path / "idempotency.db"))
+
+
+def producer(body: bytes = b'{"ok": true}', delay: float = 0.0, succeeded: bool = True):
+    """A `produce` callable that counts its executions"""
+    async def produce():
+        produce.calls += 1
+        await asyncio.sleep(delay)
+        return 200, body, succeeded
+    produce.calls = 0
+    return produce
+
+
+def test_retry_replays_the_first_response(store):
+    idempotency = Idempotency(store)
+    produce = producer()
+
+    async def scenario():
+        first = await idempotency.run("key-1", "fingerprint", produce)
+        second = await idempotency.run("key-1", "fingerprint", produce)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == (200, b'{"ok": true}', False)
+    assert second == (200, b'{"ok": true}', True)
+    assert produce.calls == 1
+
+
+def test_concurrent_duplicates_run_once(store):
+    idempotency = Idempotency(store)
+    produce = producer(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(idempotency.run("key-1", "fingerprint", produce) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert produce.calls == 1
+    assert sorted(replayed for _, _, replayed in results) == [False, True, True, True, True]
+
+
+def test_key_reused_for_a_different_request_conflicts(store):
+    idempotency = Idempotency(store)
+
+    async def scenario():
+        await idempotency.run("key-1", "fingerprint-a", producer())
+        await idempotency.run("key-1", "fingerprint-b", producer())
+
+    with pytest.raises(IdempotencyError) as excinfo:
+        asyncio.run(scenario())
+    assert excinfo.value.status_code == 422
+    assert idempotency.conflicts == 1
+
+
+def test_failed_response_is_not_stored(store):
+    idempotency = Idempotency(store)
+    failing = producer(succeeded=False)
+
+    async def scenario():
+        await idempotency.run("key-1", "fingerprint", failing)
+        return await idempotency.run("key-1", "fingerprint", producer())
+
+    assert asyncio.run(scenario())[2] is False
+    assert failing.calls == 1
+
+
+def test_reservation_of_a_dead_worker_expires(store):
+    # A worker that reserved the key and died never completes or releases it
+    assert store.reserve("key-1", "fingerprint", 0.1) is None
+    idempotency = Idempotency(store, wait_timeout=2.0)
+    produce = producer()
+
+    started = time.monotonic()
+    status_code, _, replayed = asyncio.run(idempotency.run("key-1", "fingerprint", produce))
+    assert (status_code, replayed) == (200, False)
+    assert produce.calls == 1
+    assert time.monotonic() - started < 1.0
+
+
+def test_lease_is_renewed_while_the_call_runs(store):
+    # Two workers sharing one store; the call outlives several leases
+    owner = Idempotency(store, lease=0.1)
+    other = Idempotency(store, lease=0.1, wait_timeout=2.0)
+    produce = producer(delay=0.4)
+
+    async def scenario():
+        first = asyncio.create_task(owner.run("key-1", "fingerprint", produce))
+        await asyncio.sleep(0.2)
+        second = await other.run("key-1", "fingerprint", produce)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert produce.calls == 1
+    assert (first[2], second[2]) == (False, True)
+
+
+def test_http_replay_and_conflict():
+    import main
+
+    client = TestClient(main.app)
+    path = "/mailing_list/add_to_mailing_list"
+    headers = {"Idempotency-Key": "test-http-replay"}
+    body = {"list_name": "idempotency-test", "email": "a@example.com"}
+
+    first = client.post(path, json=body, headers=headers)
+    second = client.post(path, json=body, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert REPLAYED_HEADER not in first.headers
+    assert second.headers[REPLAYED_HEADER] == "true"
+
+    conflict = client.post(path, json={**body, "email": "b@example.com"}, headers=headers)
+    assert conflict.status_code == 422
@@ -0,0 +1,109 @@
+"""Workflow references, graph validation and execution"""
+import pytest
+from fastapi.testclient import TestClient
+
+from workflow import StepReferenceError, WorkflowError, build_graph, extract, parse_path, resolve
+
+
+def step(step_id, params=None, depends_on=()):
+    return {"id": step_id, "function_name": "get_mailing_list", "params": params or {}, "depends_on": list(depends_on)}
+
+
+def test_references_are_dependencies():
+    graph = build_graph([
+        step("a"),
+        step("b", {"list_name": {"$ref": "a", "path": "$.list_name"}}),
+        step("c", {"items": [{"$ref": "a"}, {"nested": {"$ref": "b"}}]}, depends_on=["a"]),
+    ])
+    assert graph == {"a": set(), "b": {"a"}, "c": {"a", "b"}}
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(WorkflowError, match=r"cycle through steps: \['a', 'b'\]"):
+        build_graph([
+            step("a", {"x": {"$ref": "b"}}),
+            step("b", depends_on=["a"]),
+            step("c", depends_on=["a"]),
+        ])
+
+
+def test_self_reference_is_a_cycle():
+    with pytest.raises(WorkflowError, match="cycle"):
+        build_graph([step("a", {"x": {"$ref": "a"}})])
+
+
+def test_unknown_reference_is_rejected():
+    with pytest.raises(WorkflowError, match=r"unknown steps: \['missing'\]"):
+        build_graph([step("a", {"x": {"$ref": "missing"}})])
+
+
+def test_duplicate_step_id_is_rejected():
+    with pytest.raises(WorkflowError, match="Duplicate step id 'a'"):
+        build_graph([step("a"), step("a")])
+
+
+@pytest.mark.parametrize("reference", [{"$ref": 1}, {"$ref": "a", "path": ["$"]}])
+def test_malformed_reference_is_rejected(reference):
+    with pytest.raises(WorkflowError):
+        build_graph([step("a"), step("b", {"x": reference})])
+
+
+def test_paths_resolve_into_results():
+    results = {"a": {"members": [{"e-mail": "x@example.com"}], "ok": True}}
+    assert parse_path("$.members[0]['e-mail']") == ["members", 0, "e-mail"]
+    assert extract(results["a"], "$.members[-1]['e-mail']") == "x@example.com"
+    assert resolve({"to": {"$ref": "a", "path": "$.members[0]['e-mail']"}, "keep": 1}, results) == {
+        "to": "x@example.com", "keep": 1
+    }
+    assert resolve([{"$ref": "a"}], results) == [results["a"]]
+
+
+@pytest.mark.parametrize("path", ["members", "$.missing", "$.members[5]", "$.ok.deeper", "$..x"])
+def test_unresolvable_paths_raise(path):
+    with pytest.raises(StepReferenceError):
+        extract({"members": [], "ok": True}, path)
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+    return TestClient(main.app)
+
+
+def test_workflow_passes_results_between_steps(client):
+    response = client.post("/workflow", json={"steps": [
+        {"id": "create", "function_name": "create_mailing_list", "params": {"list_name": "workflow-test"}},
+        {"id": "add", "function_name": "add_to_mailing_list", "depends_on": ["create"],
+         "params": {"list_name": "workflow-test", "email": "a@example.com"}},
+        {"id": "read", "function_name": "get_mailing_list", "depends_on": ["add"],
+         "params": {"list_name": "workflow-test"}},
+        {"id": "again", "function_name": "get_mailing_list",
+         "params": {"list_name": {"$ref": "read", "path": "$.list_name"}}},
+    ]})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["success"]
+    assert report["steps"]["read"]["result"]["members"] == ["a@example.com"]
+    assert report["steps"]["again"]["result"]["list_name"] == "workflow-test"
+
+
+def test_failed_reference_fails_the_step_and_skips_dependents(client):
+    response = client.post("/workflow", json={"steps": [
+        {"id": "read", "function_name": "get_mailing_list", "params": {"list_name": "member"}},
+        {"id": "bad", "function_name": "get_mailing_list",
+         "params": {"list_name": {"$ref": "read", "path": "$.no_such_field"}}},
+        {"id": "after", "function_name": "get_mailing_list", "params": {"list_name": {"$ref": "bad"}}},
+    ]})
+    steps = response.json()["steps"]
+    assert steps["bad"]["status"] == "failed"
+    assert "not found in result" in steps["bad"]["error"]
+    assert steps["after"]["status"] == "skipped"
+
+
+def test_invalid_graph_is_a_422(client):
+    response = client.post("/workflow", json={"steps": [
+        {"id": "a", "function_name": "get_mailing_list", "params": {"list_name": {"$ref": "b"}}},
+        {"id": "b", "function_name": "get_mailing_list", "params": {"list_name": {"$ref": "a"}}},
+    ]})
+    assert response.status_code == 422
+    assert "cycle" in response.json()["detail"]
@@ -0,0 +1,243 @@
+"""
+Server-side workflow execution
+A workflow is a DAG of steps; a step's params may reference the result of an
+earlier step, and every step whose dependencies are done runs immediately,
+so end-to-end latency follows the critical path rather than the step count.
+
+A reference is an object in place of a parameter value:
+
+    {"$ref": "invite", "path": "$.invitation_link"}
+
+`path` is a JSON path into the step's parsed result ($, .key, [index],
+['key']) and defaults to the whole result. Results that are JSON strings are
+parsed before the path is applied.
+"""
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from dispatcher import dispatch, error_envelope
+from json_codec import RawJSON, loads
+from settings import env_int
+
+
+WORKFLOW_MAX_CONCURRENCY = env_int("REGISTRY_WORKFLOW_CONCURRENCY", 16)
+WORKFLOW_MAX_STEPS = env_int("REGISTRY_WORKFLOW_MAX_STEPS", 500)
+
+_PATH_TOKEN = re.compile(r"\.([A-Za-z_][\w-]*)|\[(-?\d+)\]|\[['\"](.*?)['\"]\]")
+
+
+class WorkflowError(Exception):
+    """Raised when a workflow definition is not a valid DAG"""
+
+
+class StepReferenceError(Exception):
+    """Raised when a step reference cannot be resolved"""
+
+
+def is_reference(value: Any) -> bool:
+    return isinstance(value, dict) and "$ref" in value
+
+
+def find_references(value: Any) -> Set[str]:
+    """Collect the ids of all steps referenced anywhere inside a value"""
+    if is_reference(value):
+        if not isinstance(value["$ref"], str):
+            raise WorkflowError(f"Reference '$ref' must be a step id string, got {value['$ref']!r}")
+        if not isinstance(value.get("path", "$"), str):
+            raise WorkflowError(f"Reference path must be a string, got {value['path']!r}")
+        return {value["$ref"]}
+    if isinstance(value, dict):
+        return set().union(*(find_references(v) for v in value.values()))
+    if isinstance(value, list):
+        return set().union(*(find_references(v) for v in value))
+    return set()
+
+
+def parse_path(path: str) -> List[Any]:
+    """Split a JSON path like `$.members[0]['e-mail']` into keys and indexes"""
+    if not path.startswith("$"):
+        raise StepReferenceError(f"Path '{path}' must start with '$'")
+    tokens = []
+    position = 1
+    while position < len(path):
+        match = _PATH_TOKEN.match(path, position)
+        if not match:
+            raise StepReferenceError(f"Invalid path '{path}' at position {position}")
+        name, index, quoted = match.groups()
+        tokens.append(int(index) if index is not None else (name if name is not None else quoted))
+        position = match.end()
+    return tokens
+
+
+def parse_result(result: Any) -> Any:
+    """Parse JSON-string and pre-encoded results so paths can reach into them"""
+    if isinstance(result, RawJSON):
+        return loads(result.data)
+    if isinstance(result, str):
+        try:
+            return loads(result)
+        except ValueError:
+            return result
+    return result
+
+
+def extract(data: Any, path: str) -> Any:
+    for token in parse_path(path):
+        try:
+            data = data[token]
+        except (KeyError, IndexError, TypeError):
+            raise StepReferenceError(f"Path '{path}' not found in result")
+    return data
+
+
+def resolve(value: Any, results: Dict[str, Any]) -> Any:
+    """Replace every reference inside a value with the referenced data"""
+    if is_reference(value):
+        return extract(results[value["$ref"]], value.get("path", "$"))
+    if isinstance(value, dict):
+        return {k: resolve(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, results) for v in value]
+    return value
+
+
+def invert(dependencies: Dict[str, Set[str]]) -> Dict[str, List[str]]:
+    """Map each step id to the steps that depend on it"""
+    dependents: Dict[str, List[str]] = {step_id: [] for step_id in dependencies}
+    for step_id, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(step_id)
+    return dependents
+
+
+def build_graph(steps: List[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    """Map each step id to the ids it depends on, rejecting invalid DAGs"""
+    if len(steps) > WORKFLOW_MAX_STEPS:
+        raise WorkflowError(f"Workflow exceeds the limit of {WORKFLOW_MAX_STEPS} steps")
+
+    dependencies = {}
+    for step in steps:
+        if step['id'] in dependencies:
+            raise WorkflowError(f"Duplicate step id '{step['id']}'")
+        dependencies[step['id']] = set(step['depends_on']) | find_references(step['params'])
+
+    for step_id, deps in dependencies.items():
+        unknown = deps - dependencies.keys()
+        if unknown:
+            raise WorkflowError(f"Step '{step_id}' depends on unknown steps: {sorted(unknown)}")
+
+    # Kahn's algorithm: anything left unvisited is on or behind a cycle
+    dependents = invert(dependencies)
+    remaining = {step_id: len(deps) for step_id, deps in dependencies.items()}
+    ready = [step_id for step_id, count in remaining.items() if count == 0]
+    visited = 0
+    while ready:
+        current = ready.pop()
+        visited += 1
+        for step_id in dependents[current]:
+            remaining[step_id] -= 1
+            if remaining[step_id] == 0:
+                ready.append(step_id)
+    if visited != len(dependencies):
+        # Unvisited steps are on a cycle or downstream of one; peel off the
+        # downstream ones (no unvisited dependents) so only the cycle is named
+        blocked = {step_id for step_id, count in remaining.items() if count > 0}
+        peeled = True
+        while peeled:
+            downstream = {step_id for step_id in blocked if not blocked.intersection(dependents[step_id])}
+            blocked -= downstream
+            peeled = bool(downstream)
+        raise WorkflowError(f"Workflow contains a cycle through steps: {sorted(blocked)}")
+
+    return dependencies
+
+
+async def run_workflow(
+    steps: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """Run a workflow, scheduling every ready step concurrently
+
+    Returns a map of step id to the call envelope plus `status`
+    (succeeded/failed/skipped), `started_ms` (offset from workflow start)
+    and `duration_ms`. Steps whose dependencies failed or were skipped are
+    skipped themselves.
+    """
+    dependencies = build_graph(steps)
+    steps_by_id = {step['id']: step for step in steps}
+    dependents = invert(dependencies)
+
+    limit = min(max_concurrency or WORKFLOW_MAX_CONCURRENCY, WORKFLOW_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max(limit, 1))
+    started = time.perf_counter()
+    remaining = {step_id: len(deps) for step_id, deps in dependencies.items()}
+    parsed_results: Dict[str, Any] = {}
+    step_results: Dict[str, Dict[str, Any]] = {}
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 3)
+
+    async def run_step(step_id: str) -> Dict[str, Any]:
+        step = steps_by_id[step_id]
+        async with semaphore:
+            step_started = elapsed_ms()
+            try:
+                params = resolve(step['params'], parsed_results)
+            except StepReferenceError as e:
+                envelope = error_envelope(step['function_name'], str(e))
+            else:
+                envelope = await dispatch(step['function_name'], params)
+            return {
+                **envelope,
+                "status": "succeeded" if envelope['success'] else "failed",
+                "started_ms": step_started,
+                "duration_ms": round(elapsed_ms() - step_started, 3)
+            }
+
+    def skip(step_id: str, reason: str) -> None:
+        step_results[step_id] = {
+            **error_envelope(steps_by_id[step_id]['function_name'], reason),
+            "status": "skipped",
+            "started_ms": None,
+            "duration_ms": 0.0
+        }
+
+    def complete(step_id: str) -> List[str]:
+        """Mark a step finished and return the dependents it unblocked"""
+        unblocked = []
+        for dependent in dependents[step_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                unblocked.append(dependent)
+        return unblocked
+
+    running: Dict[asyncio.Task, str] = {}
+    ready = [step_id for step_id, count in remaining.items() if count == 0]
+
+    while ready or running:
+        while ready:
+            step_id = ready.pop()
+            failed = [dep for dep in dependencies[step_id] if step_results[dep]['status'] != "succeeded"]
+            if failed:
+                skip(step_id, f"Skipped because dependencies did not succeed: {sorted(failed)}")
+                ready.extend(complete(step_id))
+            else:
+                running[asyncio.create_task(run_step(step_id))] = step_id
+
+        if not running:
+            break
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            step_id = running.pop(task)
+            step_results[step_id] = task.result()
+            if step_results[step_id]['success']:
+                parsed_results[step_id] = parse_result(step_results[step_id]['result'])
+            ready.extend(complete(step_id))
+
+    return {
+        "steps": {step['id']: step_results[step['id']] for step in steps},
+        "success": all(result['success'] for result in step_results.values()),
+        "total_ms": elapsed_ms()
+    }